@@ -8,7 +8,6 @@ this assumption, feel free to contact us at engineering@scales-okn.org.
 """
 
 import ast
-import json
 import pickle
 import math
 import os
@@ -32,6 +31,7 @@ sys.path.append(str(Path(__file__).resolve().parents[0]))
 import utils
 from constants import SCALES, J, NC, FIPS
 sys.path.append(str(Path(__file__).resolve().parents[2]))
+from support import case_json
 from support import data_tools as dtools
 from support import entity_functions as efunc
 from support import fjc_functions as fjc
@@ -779,8 +779,7 @@ def process_case_worker(args):
                 ucid.split(":")[1].split("-")[0],
                 ucid.split(";;")[1].replace(":", "-"),
             )
-            with open(indir.rstrip("/") + f"/{court}/json/{year}/{stem}.json") as f:
-                jdata = json.load(f)
+            jdata = case_json.load(indir.rstrip("/") + f"/{court}/json/{year}/{stem}.json")
         else:
             jdata = dtools.load_case(ucid=ucid)
 
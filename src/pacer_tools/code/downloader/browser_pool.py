@@ -0,0 +1,210 @@
+'''
+File: browser_pool.py
+Description: A pool of logged-in Firefox sessions for the scraper workers, which check one out for each case.
+
+Every time a session is checked out it's health-checked: a browser that has stopped responding is replaced, and one that
+hasn't been checked in a while (or whose last case failed) has its PACER login checked with the free case number lookup,
+and is logged in again if the session has expired. Each browser is also replaced once it has loaded max_pages pages,
+since Firefox's memory grows over a long run. Each session has its own download folder (the court's _temp_/<i>), which
+the Document Scraper uses for the session's downloads.
+'''
+
+import sys
+import json
+import time
+import queue
+import logging
+import threading
+from pathlib import Path
+from collections import Counter
+
+from seleniumrequests import Firefox
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import WebDriverException
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from downloader import scraper_tools as stools
+
+MAX_PAGES = 500 # no. of pages a browser loads before it's replaced (0 for no limit)
+LOGIN_CHECK_SECONDS = 5 * 60 # how often a session's login is checked
+LOGIN_CHECK_CASE_NO = '1:00-cv-00000' # the case no. looked up to check the login (whether it exists doesn't matter)
+
+
+class PoolFirefox(Firefox):
+    ''' Firefox (with seleniumrequests) that counts the pages it's been sent to '''
+    pages = 0
+
+    def get(self, url):
+        self.pages += 1
+        return super().get(url)
+
+
+def login_browser(browser, auth, court):
+    '''
+    Log a browser in to a court, accepting the redaction agreement if it's shown (filer accounts only)
+    Inputs:
+        - browser: the selenium browser
+        - auth (dict): the login details, with 'user' and 'pass'
+        - court (str): court abbreviation
+    Output:
+        (bool) whether it logged in
+    '''
+    login_success = stools.login(browser, auth, stools.get_pacer_url(court, 'login'), logging=logging, court=court)
+    if login_success:
+        main_content = browser.find_elements(By.CSS_SELECTOR, '#cmecfMainContent')
+        if main_content and "Redaction Agreement" in main_content[0].text:
+            browser.find_element(By.CSS_SELECTOR, 'input[type="checkbox"]').click()
+            browser.find_element(By.LINK_TEXT, "Continue").click()
+    return login_success
+
+
+class BrowserSession:
+    ''' One browser of the pool, with its download folder and how much it has been used '''
+
+    def __init__(self, ind, download_dir):
+        self.ind = ind
+        self.download_dir = download_dir
+        self.browser = None
+        self.cases = 0
+        self.last_login_check = 0
+        self.check_login = False # set when a case fails, to check the login at the next checkout
+
+    def __repr__(self):
+        return f"<BrowserSession:{self.ind} ({self.pages} pages, {self.cases} cases)>"
+
+    @property
+    def pages(self):
+        return self.browser.pages if self.browser else 0
+
+    def responsive(self):
+        ''' Whether the browser is still running and answering commands '''
+        try:
+            return self.browser.execute_script('return 1') == 1
+        except WebDriverException:
+            return False
+
+    def logged_in(self, court):
+        ''' Whether the browser's PACER session is still logged in, from a (free) case number lookup '''
+        try:
+            url = stools.get_pacer_url(court, 'possible_case') + '?' + LOGIN_CHECK_CASE_NO
+            resp = self.browser.request('GET', url)
+        except Exception:
+            return False
+        return resp.status_code == 200 and 'Not logged in' not in resp.text
+
+    def close(self):
+        if self.browser:
+            try:
+                self.browser.quit()
+            except WebDriverException:
+                pass
+            self.browser = None
+
+
+class BrowserPool:
+    ''' A pool of logged-in browsers for a court, shared by the workers of a scraper sequence '''
+
+    def __init__(self, court_dir, court, auth_path, headless, size, max_pages=MAX_PAGES, login_check_seconds=LOGIN_CHECK_SECONDS):
+        '''
+        Inputs:
+            - court_dir (PacerCourtDir): the court's download folder
+            - court (str): court abbreviation
+            - auth_path (str or Path): path to the login details
+            - headless (bool): run Firefox headless
+            - size (int): no. of browsers (usually the no. of workers)
+            - max_pages (int): no. of pages a browser loads before it's replaced (0 for no limit)
+            - login_check_seconds (int): how often a session's login is checked
+        '''
+        self.court = court
+        self.auth = json.load(open(Path(auth_path).resolve(), 'r'))
+        self.headless = headless
+        self.max_pages = max_pages
+        self.login_check_seconds = login_check_seconds
+        self.events = Counter() # launches, relogins, replacements...
+        self._lock = threading.Lock()
+
+        court_dir.make_temp_subdirs(size)
+        self.sessions = [BrowserSession(i, court_dir.temp_subdir(i)) for i in range(size)]
+        self._free = queue.Queue()
+        for session in self.sessions:
+            self._free.put(session)
+
+    def __repr__(self):
+        return f"<BrowserPool: {self.court} ({len(self.sessions)} browsers)>"
+
+    def _count(self, event):
+        with self._lock:
+            self.events[event] += 1
+
+    def _launch(self, session):
+        ''' Start (or restart) a session's browser and log it in '''
+        session.close()
+        session.browser = PoolFirefox(options=stools.get_firefox_options(session.download_dir, self.headless))
+        self._count('launched')
+        if not login_browser(session.browser, self.auth, self.court):
+            session.close()
+            raise ValueError('Cannot log in to PACER')
+        session.last_login_check = time.time()
+        session.check_login = False
+
+    def _check(self, session):
+        ''' Make sure a session is ready for a case: launched, responsive, logged in and not due to be replaced '''
+        if session.browser is None:
+            return self._launch(session)
+
+        if not session.responsive():
+            logging.info(f"{self} {session} is not responding, replacing it")
+            self._count('replaced (not responding)')
+            return self._launch(session)
+
+        if self.max_pages and session.pages >= self.max_pages:
+            logging.info(f"{self} {session} has reached {self.max_pages} pages, replacing it")
+            self._count('replaced (max pages)')
+            return self._launch(session)
+
+        if session.check_login or time.time() - session.last_login_check >= self.login_check_seconds:
+            if not session.logged_in(self.court):
+                logging.info(f"{self} {session} is no longer logged in, logging in again")
+                self._count('logged in again')
+                if not login_browser(session.browser, self.auth, self.court):
+                    self._count('replaced (login failed)')
+                    return self._launch(session)
+            session.last_login_check = time.time()
+            session.check_login = False
+
+    def acquire(self):
+        '''
+        Check out a session for a case (waits for one to be free), health-checked and logged in
+        Output:
+            (BrowserSession)
+        '''
+        session = self._free.get()
+        try:
+            self._check(session)
+        except Exception:
+            session.close()
+            self._free.put(session)
+            raise
+        return session
+
+    def release(self, session, ok=True):
+        '''
+        Return a session to the pool
+        Inputs:
+            - session (BrowserSession): the session
+            - ok (bool): whether the case went through without an exception (if not, the login is checked at the next checkout)
+        '''
+        session.cases += 1
+        if not ok:
+            session.check_login = True
+        self._free.put(session)
+
+    def close(self):
+        ''' Quit all the browsers '''
+        for session in self.sessions:
+            session.close()
+
+    def summary(self):
+        ''' A line on how the pool's browsers have been used '''
+        used = ', '.join(f"{session.ind}: {session.cases} cases" for session in self.sessions)
+        return f"Browser pool ({self.court}): {used}; {dict(self.events) or 'no browsers launched'}"
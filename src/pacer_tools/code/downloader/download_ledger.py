@@ -0,0 +1,184 @@
+'''
+File: download_ledger.py
+Description: A SQLite record of everything the scrapers have downloaded for a court (dockets, summaries, member lists and
+documents), so that "do we already have this?" is an indexed lookup rather than a stat or a glob of the court's folders
+(which is slow when they're on a network filesystem).
+
+Each download is recorded with its path (relative to the court's folder), its size, a hash of its contents, its cost (where
+known) and when it was downloaded. Documents are also recorded by document id, since their filenames include the time of
+download. When a court's ledger is first created, the files already in the court's folders are recorded (without hashes),
+and a ledger can be brought back into line with the folders with rescan, if files have been added or removed by hand.
+
+The ledger is only as good as what's been recorded in it: files downloaded outside of the scrapers need a rescan.
+'''
+
+import os
+import sys
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from support import fhandle_tools as ftools
+from support import sqlite_tools
+
+LEDGER_FILENAME = 'download_ledger.db' # the default ledger, in the court's folder
+
+# The kinds of download, and the court subfolders they're in (see scrapers.PacerCourtDir)
+KIND_SUBDIRS = {'docket': 'html', 'summary': 'summaries', 'member': 'members', 'document': 'docs'}
+SUBDIR_KINDS = {subdir: kind for kind, subdir in KIND_SUBDIRS.items()}
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS downloads (
+        path TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        ucid TEXT,
+        doc_id TEXT,
+        size INTEGER,
+        hash TEXT,
+        cost REAL,
+        downloaded_at TEXT
+    );
+    CREATE INDEX IF NOT EXISTS downloads_ucid ON downloads (kind, ucid);
+    CREATE INDEX IF NOT EXISTS downloads_doc_id ON downloads (doc_id);
+'''
+
+UPSERT = '''
+    INSERT INTO downloads (path, kind, ucid, doc_id, size, hash, cost, downloaded_at) VALUES (?,?,?,?,?,?,?,?)
+    ON CONFLICT (path) DO UPDATE SET
+        kind=excluded.kind, ucid=excluded.ucid, doc_id=excluded.doc_id, size=excluded.size, hash=excluded.hash,
+        cost=COALESCE(excluded.cost, cost), downloaded_at=excluded.downloaded_at
+'''
+
+
+def content_hash(data):
+    ''' The hash recorded for a download's contents (bytes, or str as utf-8) '''
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _file_row(root, fpath, kind, court):
+    ''' A ledger row for a file already in the court's folder (no hash: reading every file back would defeat the point) '''
+    stat = fpath.stat()
+    if kind == 'document':
+        doc_data = ftools.parse_document_fname(fpath.name)
+        ucid, doc_id = doc_data.get('ucid'), doc_data.get('doc_id')
+    else:
+        ucid, doc_id = ftools.filename_to_ucid(fpath, court), None
+    downloaded_at = datetime.fromtimestamp(stat.st_mtime).isoformat(timespec='seconds')
+    return (fpath.relative_to(root).as_posix(), kind, ucid, doc_id, stat.st_size, None, None, downloaded_at)
+
+
+class DownloadLedger:
+    '''
+    The downloads of one court's folder. Safe to share between threads (each thread gets its own connection) and to pass
+    to worker processes.
+    '''
+    def __init__(self, court_dir, db_path=None, import_existing=True):
+        '''
+        Inputs:
+            - court_dir (PacerCourtDir): the court's folder
+            - db_path (str or Path): the sqlite file for the ledger, defaults to download_ledger.db in the court's folder
+                (a local disk is better if the court's folder is on a network filesystem)
+            - import_existing (bool): when the ledger is first created, record the files already in the court's folder
+        '''
+        self.court_dir = court_dir
+        self.root = Path(court_dir.root).resolve()
+        self.db_path = str(db_path or self.root / LEDGER_FILENAME)
+        self._local = threading.local()
+
+        is_new = not Path(self.db_path).exists()
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+        if is_new and import_existing:
+            self.rescan()
+
+    def __repr__(self):
+        return f"<DownloadLedger: {self.root} ({self.db_path})>"
+
+    def __getstate__(self):
+        return {'court_dir': self.court_dir, 'db_path': self.db_path}
+
+    def __setstate__(self, state):
+        self.__init__(**state, import_existing=False)
+
+    def _connect(self):
+        return sqlite_tools.connect(self.db_path)
+
+    @property
+    def conn(self):
+        ''' The connection for the current thread '''
+        if getattr(self._local, 'conn', None) is None:
+            self._local.conn = self._connect()
+        return self._local.conn
+
+    def _key(self, fpath):
+        ''' The ledger key of a path: relative to the court's folder (None for a path outside it) '''
+        try:
+            # (abspath rather than resolve, which would stat every part of the path)
+            return Path(os.path.abspath(fpath)).relative_to(self.root).as_posix()
+        except ValueError:
+            return None
+
+    def has(self, fpath):
+        ''' Whether a file has been downloaded (a path outside the court's folder is checked on disk) '''
+        key = self._key(fpath)
+        if key is None:
+            return Path(fpath).exists()
+        return self.conn.execute('SELECT 1 FROM downloads WHERE path=?', (key,)).fetchone() is not None
+
+    def has_document(self, doc_id):
+        ''' Whether a document (or attachment) has been downloaded, by its document id (see ftools.generate_document_id) '''
+        return self.conn.execute('SELECT 1 FROM downloads WHERE doc_id=? LIMIT 1', (doc_id,)).fetchone() is not None
+
+    def ucids(self, kind):
+        ''' The ucids that have at least one download of a kind (e.g. the cases that any documents have been downloaded for) '''
+        return {row[0] for row in self.conn.execute('SELECT DISTINCT ucid FROM downloads WHERE kind=?', (kind,))}
+
+    def record(self, kind, fpath, ucid=None, doc_id=None, contents=None, cost=None):
+        '''
+        Record a download
+        Inputs:
+            - kind (str): one of KIND_SUBDIRS
+            - fpath (str or Path): where it was written
+            - ucid (str): the case's ucid
+            - doc_id (str): the document id, for a document
+            - contents (str or bytes): what was written, for the hash (if None, the file is read back for it)
+            - cost (float): what it cost, if known
+        '''
+        fpath = Path(fpath)
+        if contents is None:
+            contents = fpath.read_bytes()
+        elif isinstance(contents, str):
+            contents = contents.encode('utf-8')
+        row = (self._key(fpath) or str(fpath), kind, ucid, doc_id, len(contents), content_hash(contents), cost,
+            datetime.now().isoformat(timespec='seconds'))
+        with self.conn:
+            self.conn.execute(UPSERT, row)
+
+    def rescan(self):
+        '''
+        Bring the ledger into line with the files in the court's folder: record any that aren't in it and forget any
+        that are no longer there (this is the one time the folders are walked)
+        Output:
+            (dict) the no. of files added and removed
+        '''
+        on_disk = {}
+        for kind, subdir in KIND_SUBDIRS.items():
+            pattern = '*/*.pdf' if kind == 'document' else '*/*.html'
+            for fpath in (self.root / subdir).glob(pattern):
+                on_disk[fpath.relative_to(self.root).as_posix()] = (fpath, kind)
+
+        in_ledger = {row[0] for row in self.conn.execute('SELECT path FROM downloads')}
+        added = [_file_row(self.root, fpath, kind, self.court_dir.court) for key, (fpath, kind) in on_disk.items() if key not in in_ledger]
+        removed = [(key,) for key in in_ledger if key not in on_disk]
+        with self.conn:
+            self.conn.executemany(UPSERT, added)
+            self.conn.executemany('DELETE FROM downloads WHERE path=?', removed)
+        return {'added': len(added), 'removed': len(removed)}
+
+    def counts(self):
+        ''' The no. of downloads of each kind '''
+        return dict(self.conn.execute('SELECT kind, COUNT(*) FROM downloads GROUP BY kind').fetchall())
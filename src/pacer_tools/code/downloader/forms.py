@@ -8,6 +8,7 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
+from downloader import waits
 from support.core import std_path
 
 TEMPLATE_LOGIN = {
@@ -306,19 +307,20 @@ def case_no_pre_submit(form):
 
     run_button = form.buttons['submit'].locate()
 
-    # Wait for the case lookup to run before you can 'Run Report'
-    for i in range(5):
+    def lookup_done(browser):
         if run_button.is_enabled():
-            break
+            return True
         # If the case selector appears, choose the first case (the main case)
-        elif form.browser.find_element(By.ID, 'case_number_pick_area_0').is_displayed():
+        elif browser.find_element(By.ID, 'case_number_pick_area_0').is_displayed():
             # Check if any checkbox ticked
-            docket_checkboxes = form.browser.find_elements(By.CSS_SELECTOR, '#case_number_pick_area_0 input[type="checkbox"]')
+            docket_checkboxes = browser.find_elements(By.CSS_SELECTOR, '#case_number_pick_area_0 input[type="checkbox"]')
             if not any(box.is_selected() for box in docket_checkboxes):
                 # Click the first if none pre-selected (default to main)
                 docket_checkboxes[0].click()
+        return False
 
-        time.sleep(1)
+    # Wait for the case lookup to run before you can 'Run Report'
+    waits.wait_for(form.browser, lookup_done, court=form.court, kind='lookup')
 
 
 
@@ -387,15 +389,17 @@ class FormButton:
 class FormFiller:
     ''' Object used to fill out a webpage form '''
 
-    def __init__(self, browser, template, fill_values):
+    def __init__(self, browser, template, fill_values, court=None):
         '''
         Inputs:
             - browser: selenium browser driver
             - template ('query', 'login', 'docket' or dict): gets template from get_template, or else manual input as dict
             - fill_values (dict): key-value pairs of (field name, value to fill)
+            - court (str): court abbreviation, for the latency stats of waits on the form (see waits.py)
         '''
         self.fields, self.buttons = {}, {}
         self.browser = browser
+        self.court = court
 
         self.template = get_template(template) if type(template) is str else template
         self.build(fill_values)
@@ -0,0 +1,197 @@
+'''
+File: http_docket.py
+Description: Runs PACER docket reports with plain HTTP requests, using the session of a browser that has already logged in.
+
+Once the Docket Scraper's browser has logged in, running a docket report comes down to getting the report form (for its
+one-time action url and its default values) and posting the query to it. Doing that directly with requests, with the
+browser's cookies, skips filling in the form in Firefox, the pauses around it and reading the page back out of the
+browser. The form is filled from the same template as the browser's (forms.TEMPLATE_DOCKET_SHEET), with the template's
+selectors used to find each field's name in the form that PACER serves.
+
+Anything other than a docket report coming back (the "may take a long time" page, an invalid or sealed case, the login
+page if the session has expired, a form that doesn't match the template...) is reported as such, and the scraper pulls
+that case through the browser instead (see DocketScraper.pull_case_http).
+'''
+
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from downloader import forms
+from downloader import scraper_tools as stools
+from support import fhandle_tools as ftools
+
+TIMEOUT = (30, 600) # (connect, read) seconds, the read timeout is long because big docket reports can take minutes to run
+
+# What came back from a docket report request (DOCKET_REPORT is the only one the scraper keeps)
+DOCKET_REPORT, LONGTIME, INVALID_CASE, NOT_LOGGED_IN, UNEXPECTED_FORM, UNEXPECTED_PAGE, HTTP_ERROR = \
+    'docket_report', 'longtime', 'invalid_case', 'not_logged_in', 'unexpected_form', 'unexpected_page', 'http_error'
+
+re_docket_heading = re.compile(r'<h3[^>]*>(?:(?!</h3>)[\s\S]){0,500}DOCKET FOR CASE #:', re.I)
+re_longtime = re.compile(r'report may take a long time to run')
+re_invalid_case = re.compile(r'not a valid case\. Please enter a valid value')
+re_not_logged_in = re.compile(r'Not logged in|name="login"|loginForm', re.I)
+
+
+def page_kind(html):
+    ''' Classify the page returned by a docket report request (one of the constants above) '''
+    if re_docket_heading.search(html):
+        return DOCKET_REPORT
+    elif re_longtime.search(html):
+        return LONGTIME
+    elif re_invalid_case.search(html):
+        return INVALID_CASE
+    elif re_not_logged_in.search(html):
+        return NOT_LOGGED_IN
+    return UNEXPECTED_PAGE
+
+
+def no_docketlines(html):
+    ''' Whether a docket report says that no docket lines match the query (as DocketScraper.no_docketlines, on the page html) '''
+    return bool(re.search(stools.re_no_docket, ftools.scrub_tags(html)))
+
+
+def response_text(resp):
+    ''' The text of a response, decoded as the page declares or else with the first of ftools.HTML_ENCODINGS that works '''
+    if 'charset' in resp.headers.get('content-type', '').lower():
+        return resp.text
+    for encoding in ftools.HTML_ENCODINGS[:-1]:
+        try:
+            return resp.content.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return resp.content.decode(ftools.HTML_ENCODINGS[-1], errors='replace')
+
+
+def form_values(form):
+    '''
+    The values a browser would submit for a form as it's served, before anything is filled in
+    Inputs:
+        - form (bs4.element.Tag): the form
+    Output:
+        (dict) field name -> value
+    '''
+    values = {}
+    for el in form.find_all(['input', 'select', 'textarea']):
+        name = el.get('name')
+        if not name or el.has_attr('disabled'):
+            continue
+        if el.name == 'input':
+            kind = el.get('type', 'text').lower()
+            if kind in ('submit', 'button', 'image', 'reset', 'file'):
+                continue
+            elif kind in ('checkbox', 'radio'):
+                if el.has_attr('checked'):
+                    values[name] = el.get('value', 'on')
+            else:
+                values[name] = el.get('value', '')
+        elif el.name == 'select':
+            option = el.find('option', selected=True) or el.find('option')
+            values[name] = option.get('value', option.text.strip()) if option else ''
+        else:
+            values[name] = el.text
+    return values
+
+
+def fill_form(form, fill_values, template=forms.TEMPLATE_DOCKET_SHEET):
+    '''
+    The values to submit for a form once the fill_values have been filled in, as forms.FormFiller would fill them
+    Inputs:
+        - form (bs4.element.Tag): the form
+        - fill_values (dict): key-value pairs of (template field name, value to fill)
+        - template (dict): the form template, see forms.py
+    Output:
+        (dict) field name -> value, or None if a field of the template can't be found in the form
+    '''
+    values = form_values(form)
+    for key, value in fill_values.items():
+        props = template['fields'][key]
+        els = form.select(props['selector'])
+        if not els or not els[0].get('name'):
+            return None
+        name = els[0]['name']
+
+        if props['kind'] == 'checkbox':
+            if value:
+                values[name] = els[0].get('value', 'on')
+            else:
+                values.pop(name, None)
+        elif props['kind'] == 'radio':
+            if not any(el.get('value') == value for el in els):
+                return None
+            values[name] = value
+        else:
+            values[name] = str(value)
+    return values
+
+
+class HttpDocketFetcher:
+    ''' Runs docket reports for a court with requests, with the cookies of a logged-in browser (see sync_cookies) '''
+
+    def __init__(self, court, timeout=TIMEOUT):
+        '''
+        Inputs:
+            - court (str): court abbreviation
+            - timeout (tuple): (connect, read) timeouts in seconds
+        '''
+        self.court = court
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.outcomes = Counter() # the kind of page each docket report request got back
+
+    def __repr__(self):
+        return f"<HttpDocketFetcher: {self.court}>"
+
+    def sync_cookies(self, browser):
+        ''' Take the cookies (and user agent) of a logged-in browser, replacing any the session already had '''
+        self.session.cookies.clear()
+        for cookie in browser.get_cookies():
+            self.session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+        try:
+            self.session.headers['User-Agent'] = browser.execute_script('return navigator.userAgent')
+        except Exception:
+            pass
+
+    def fetch_docket(self, fill_values, pacer_id):
+        '''
+        Run a docket report
+        Inputs:
+            - fill_values (dict): the docket report form values, as given to forms.FormFiller for the browser
+            - pacer_id (int): the case's PACER id (what the form's case number lookup would fill in)
+        Output:
+            kind (str): what came back (DOCKET_REPORT or one of the other constants above)
+            url (str): the url of the page that came back (the download url, for a docket report)
+            html (str): the page (None for HTTP_ERROR or UNEXPECTED_FORM)
+        '''
+        kind, url, html = self._fetch_docket(fill_values, pacer_id)
+        self.outcomes[kind] += 1
+        return kind, url, html
+
+    def _fetch_docket(self, fill_values, pacer_id):
+        resp = self.session.get(stools.get_pacer_url(self.court, 'docket'), timeout=self.timeout)
+        if resp.status_code != 200:
+            return HTTP_ERROR, resp.url, None
+
+        form_html = response_text(resp)
+        case_num = BeautifulSoup(form_html, 'html.parser').select_one('[name="case_num"]')
+        form = case_num.find_parent('form') if case_num else None
+        if form is None:
+            kind = page_kind(form_html)
+            return (UNEXPECTED_FORM if kind == UNEXPECTED_PAGE else kind), resp.url, None
+
+        values = fill_form(form, fill_values)
+        if values is None:
+            return UNEXPECTED_FORM, resp.url, None
+        values['all_case_ids'] = str(pacer_id)
+
+        report = self.session.post(urljoin(resp.url, form.get('action') or resp.url), data=values, timeout=self.timeout)
+        if report.status_code != 200:
+            return HTTP_ERROR, report.url, None
+        html = response_text(report)
+        return page_kind(html), report.url, html
@@ -0,0 +1,276 @@
+'''
+File: scrape_queue.py
+Description: A SQLite work queue for the scraper modules, so that a run can be picked up where it stopped and a court can be
+split between several scraper processes (or hosts, with the queue on a filesystem that supports SQLite's locking).
+
+Each item (a case for the docket/summary/member scrapers, a docket for the document scraper) is pending, in_progress, done
+or failed. A worker claims the next pending item with a lease; if the worker dies, the item can be claimed again once the
+lease has expired (or straight away, by a process on the same host, if the worker's process is no longer running). Every
+claim counts as an attempt, and the cost of each item is recorded when it's done, so that cost limits can be checked
+against the queue rather than an in-memory tally.
+
+Without a db_path the queue is held in memory, for a run that doesn't need to be resumed.
+'''
+
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import threading
+import functools
+from pathlib import Path
+from datetime import datetime
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from support import sqlite_tools
+
+PENDING, IN_PROGRESS, DONE, FAILED = 'pending', 'in_progress', 'done', 'failed'
+LEASE_SECONDS = 60 * 60 # how long a worker has to finish an item before another can claim it (long dockets can take many minutes)
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS items (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        requeued INTEGER NOT NULL DEFAULT 0,
+        module TEXT NOT NULL,
+        court TEXT NOT NULL,
+        key TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        lease_owner TEXT,
+        lease_expires REAL,
+        last_owner TEXT,
+        cost REAL NOT NULL DEFAULT 0,
+        result TEXT,
+        error TEXT,
+        updated_at TEXT,
+        UNIQUE (module, court, key)
+    );
+    CREATE INDEX IF NOT EXISTS items_status ON items (module, court, status, requeued, seq);
+'''
+
+# (a SELECT then an UPDATE in one transaction, rather than UPDATE ... RETURNING, which needs SQLite 3.35+)
+NEXT_ITEM = f'''
+    SELECT seq, key, payload, attempts FROM items
+    WHERE module=? AND court=?
+        AND ((status='{PENDING}' AND attempts < ?) OR (status='{IN_PROGRESS}' AND lease_expires < ?))
+    ORDER BY requeued, seq LIMIT 1
+'''
+CLAIM = f"UPDATE items SET status='{IN_PROGRESS}', attempts=attempts+1, lease_owner=?, lease_expires=?, updated_at=? WHERE seq=?"
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _locked(method):
+    ''' Run a method holding the queue's lock (the threads of a process take turns, other processes are kept out by SQLite) '''
+    @functools.wraps(method)
+    def inner(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return inner
+
+
+def _pid_running(pid):
+    ''' Whether a process is running on this host '''
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ScrapeQueue:
+    '''
+    The items of one scraper module for one court, in a queue that can be shared between threads, processes and hosts
+    (each thread gets its own connection, except for an in-memory queue, which has one). Items are claimed in the order they were added, after which come any that were
+    requeued (see fail).
+    '''
+    def __init__(self, module, court, db_path=None, max_attempts=1, lease_seconds=LEASE_SECONDS):
+        '''
+        Inputs:
+            - module (str): the scraper module (one of scrapers.MODULES)
+            - court (str): court abbreviation
+            - db_path (str or Path): the sqlite file for the queue, if None the queue is held in memory (for this process only)
+            - max_attempts (int): the no. of times an item can be tried before it's left as failed (see fail), an item whose
+                lease expired can always be claimed again, since its worker never got to finish it
+            - lease_seconds (int): how long a claim lasts before the item can be claimed by another worker
+        '''
+        self.module = module
+        self.court = court
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.db_path = None if db_path is None else str(db_path)
+        self._local = threading.local()
+        self._lock = threading.RLock()
+
+        # (an in-memory database only exists for its connection, so all threads share that one)
+        self._memory_conn = self._connect() if self.db_path is None else None
+        self.conn.executescript(SCHEMA)
+
+    def __repr__(self):
+        return f"<ScrapeQueue: {self.module} {self.court} ({self.db_path})>"
+
+    def _connect(self):
+        if self.db_path is None:
+            return sqlite3.connect(':memory:', isolation_level=None, check_same_thread=False)
+        return sqlite_tools.connect(self.db_path, isolation_level=None)
+
+    @property
+    def conn(self):
+        ''' The connection for the current thread (in autocommit mode: every statement is its own transaction) '''
+        if self._memory_conn is not None:
+            return self._memory_conn
+        if getattr(self._local, 'conn', None) is None:
+            self._local.conn = self._connect()
+        return self._local.conn
+
+    @staticmethod
+    def worker_id(ind=0):
+        ''' An id for a worker that's unique across hosts and processes (host:pid:index), used as the owner of its leases '''
+        return f"{ScrapeQueue.process_id()}:{ind}"
+
+    @staticmethod
+    def process_id():
+        ''' The prefix of the worker ids of this process (host:pid), e.g. for the cost of what this process has scraped '''
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    @_locked
+    def add(self, items, key_fn):
+        '''
+        Add items to the queue, in order; items already in it (by key) are left as they are, so adding the same input to
+        a queue again resumes it rather than starting it over
+        Inputs:
+            - items (list of dicts): the items (anything json-serializable)
+            - key_fn (function): gives the key that identifies an item, e.g. its ucid
+        Output:
+            (int) the no. of items that were new
+        '''
+        rows = [(self.module, self.court, key_fn(item), json.dumps(item, default=str), _now()) for item in items]
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.execute('BEGIN IMMEDIATE')
+            self.conn.executemany('INSERT OR IGNORE INTO items (module, court, key, payload, updated_at) VALUES (?,?,?,?,?)', rows)
+            return self.conn.total_changes - before
+
+    @_locked
+    def claim(self, owner):
+        '''
+        Claim the next item (the first pending one, or one whose lease has expired)
+        Inputs:
+            - owner (str): the worker claiming it, see worker_id
+        Output:
+            key (str), item (dict) and attempts (int, including this one), or None if there's nothing to claim
+        '''
+        now = time.time()
+        with self.conn:
+            # (BEGIN IMMEDIATE takes the write lock before the SELECT, so no other process can claim the same item)
+            self.conn.execute('BEGIN IMMEDIATE')
+            row = self.conn.execute(NEXT_ITEM, (self.module, self.court, self.max_attempts, now)).fetchone()
+            if row is None:
+                return None
+            seq, key, payload, attempts = row
+            self.conn.execute(CLAIM, (owner, now + self.lease_seconds, _now(), seq))
+        return key, json.loads(payload), attempts + 1
+
+    @_locked
+    def _finish(self, key, owner, status, cost=0, **fields):
+        '''
+        Update an item held by owner (an item whose lease has been taken over by another worker is left alone), adding
+        cost to what it has cost so far
+        '''
+        fields = {'status': status, 'lease_owner': None, 'lease_expires': None, 'last_owner': owner, 'updated_at': _now(), **fields}
+        sets = ', '.join(['cost=cost+?', *(f"{name}=?" for name in fields)])
+        cursor = self.conn.execute(f"UPDATE items SET {sets} WHERE module=? AND court=? AND key=? AND lease_owner=?",
+            (cost, *fields.values(), self.module, self.court, key, owner))
+        return cursor.rowcount == 1
+
+    def complete(self, key, owner, cost=0, result=None):
+        '''
+        Mark an item as done
+        Inputs:
+            - key (str), owner (str): the item and the worker that claimed it
+            - cost (float): what it cost to download (added to anything it cost in earlier attempts)
+            - result (str): the outcome, e.g. the path of the downloaded file, or 'skipped'
+        Output:
+            (bool) whether the item was still held by owner
+        '''
+        return self._finish(key, owner, DONE, cost=cost, result=None if result is None else str(result), error=None)
+
+    @_locked
+    def fail(self, key, owner, error=None, retry=False, cost=0):
+        '''
+        Mark an item as failed, or (with retry) put it back on the end of the queue if it has attempts left
+        Inputs:
+            - key (str), owner (str): the item and the worker that claimed it
+            - error (str or Exception): what went wrong
+            - retry (bool): whether to requeue it
+            - cost (float): anything it cost before it failed
+        Output:
+            (bool) whether it was requeued
+        '''
+        error = None if error is None else str(error)
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            row = self.conn.execute('SELECT attempts FROM items WHERE module=? AND court=? AND key=? AND lease_owner=?',
+                (self.module, self.court, key, owner)).fetchone()
+            if row is None:
+                return False
+            attempts, = row
+            if retry and attempts < self.max_attempts:
+                # (items are claimed in order of requeued then seq, so this puts it behind everything else in the queue)
+                requeued = self.conn.execute('SELECT MAX(requeued) + 1 FROM items WHERE module=? AND court=?',
+                    (self.module, self.court)).fetchone()[0]
+                self._finish(key, owner, PENDING, cost=cost, error=error, requeued=requeued)
+                return True
+            self._finish(key, owner, FAILED, cost=cost, error=error)
+            return False
+
+    @_locked
+    def release(self, key, owner):
+        ''' Put a claimed item back as pending without counting the attempt (e.g. when a worker stops before starting it) '''
+        return self._finish(key, owner, PENDING, attempts=self.conn.execute(
+            'SELECT MAX(attempts - 1, 0) FROM items WHERE module=? AND court=? AND key=?', (self.module, self.court, key)).fetchone()[0])
+
+    @_locked
+    def reclaim_orphans(self):
+        '''
+        Put back as pending the in-progress items whose workers ran on this host in processes that are no longer running
+        (e.g. a scraper that was killed), rather than waiting for their leases to expire
+        Output:
+            (int) the no. of items put back
+        '''
+        host = socket.gethostname()
+        rows = self.conn.execute('SELECT key, lease_owner FROM items WHERE module=? AND court=? AND status=? AND lease_owner LIKE ?',
+            (self.module, self.court, IN_PROGRESS, f"{host}:%")).fetchall()
+        orphans = [(key, owner) for key, owner in rows if not _pid_running(int(owner.split(':')[1]))]
+        for key, owner in orphans:
+            self.release(key, owner)
+        return len(orphans)
+
+    @_locked
+    def retry_failed(self):
+        ''' Put the failed items back as pending, with their attempts reset, returns the no. of items '''
+        return self.conn.execute('UPDATE items SET status=?, attempts=0, error=NULL, updated_at=? WHERE module=? AND court=? AND status=?',
+            (PENDING, _now(), self.module, self.court, FAILED)).rowcount
+
+    @_locked
+    def total_cost(self, process_id=None):
+        ''' The total cost of the items, optionally only those last held by the workers of one process (see process_id) '''
+        if process_id is None:
+            return self.conn.execute('SELECT COALESCE(SUM(cost), 0) FROM items WHERE module=? AND court=?',
+                (self.module, self.court)).fetchone()[0]
+        # (compared as a prefix of the worker ids, up to and including the ':' before the worker index, so pid 12 isn't pid 123)
+        prefix = f"{process_id}:"
+        return self.conn.execute('SELECT COALESCE(SUM(cost), 0) FROM items WHERE module=? AND court=? AND substr(last_owner, 1, ?)=?',
+            (self.module, self.court, len(prefix), prefix)).fetchone()[0]
+
+    @_locked
+    def counts(self):
+        ''' The no. of items with each status '''
+        rows = self.conn.execute('SELECT status, COUNT(*) FROM items WHERE module=? AND court=? GROUP BY status', (self.module, self.court))
+        return {PENDING: 0, IN_PROGRESS: 0, DONE: 0, FAILED: 0, **dict(rows.fetchall())}
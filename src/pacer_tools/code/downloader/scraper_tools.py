@@ -15,6 +15,7 @@ from selenium.webdriver.common.by import By
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 from downloader import forms
+from downloader import waits
 from support import settings
 from support import data_tools as dtools
 from support import fhandle_tools as ftools
@@ -84,7 +85,7 @@ def split_config(config, date_pairs, max_gap=180, chunk_size=31):
     #Else return singleton list with original config
     return [config]
 
-def login(browser, auth, login_url=None, logging=None):
+def login(browser, auth, login_url=None, logging=None, court=None):
     '''
     Method to log in to a court
     Inputs:
@@ -92,6 +93,7 @@ def login(browser, auth, login_url=None, logging=None):
         - auth_path (str or Path): path to login details
         - login_url (str): url to login page, if empty assumes browser is already there
         - logging: logging instance
+        - court (str): court abbreviation, for the latency stats of the login (see waits.py)
     '''
     if login_url:
         browser.get(login_url)
@@ -104,11 +106,11 @@ def login(browser, auth, login_url=None, logging=None):
         return True
 
     fill_values =  {'username':auth['user'], 'password':auth['pass']}
-    login_form = forms.FormFiller(browser, 'login',fill_values)
+    login_form = forms.FormFiller(browser, 'login',fill_values, court=court)
     login_form.fill()
-    time.sleep(1)
+    login_page = waits.page_root(browser)
     login_form.submit()
-    time.sleep(2)
+    waits.wait_for(browser, waits.new_page(login_page, 'body'), court=court, kind='submit')
 
     # Check if details correct
     if "Invalid username or password" in browser.page_source:
@@ -1,17 +1,18 @@
 import time
 import re
 import sys
-import csv
 import json
 import logging
 import asyncio
 import functools
+import contextlib
 from hashlib import md5
 from pathlib import Path
 from collections import Counter
 
 import click
 import xmltodict
+import requests
 import pandas as pd
 from bs4 import BeautifulSoup
 from seleniumrequests import Firefox
@@ -19,27 +20,24 @@ from selenium.webdriver.common.by import By
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 from downloader import forms
+from downloader import waits
+from downloader import http_docket
+from downloader import browser_pool
+from downloader.browser_pool import BrowserPool, login_browser
+from downloader.scrape_queue import ScrapeQueue
+from downloader.download_ledger import DownloadLedger
 from downloader import scraper_tools as stools
 
 from support import settings
 from support import data_tools as dtools
 from support import fhandle_tools as ftools
+from support.member_links import MemberLinkStore
 from support.docket_entry_identification import extract_court_caseno
 
 PACER_ERROR_WRONG_CASE = 'PACER_ERROR_WRONG_CASE'
 MAX_DOWNLOAD_ATTEMPTS = 2
-MAX_LONGTIME_ATTEMPTS = 15
 PSC_TEXT = 'PACER Service Center'
 
-PAUSE = {
-    'micro': 0.1,
-    'mini': 0.5,
-    'second': 1,
-    'moment': 5,
-    'medium': 10,
-    'mega': 30
-}
-
 N_WORKERS = 2 # No. of simultaneous scrapers to run
 DOCKET_ROW_DOCS_LIMIT = 1000
 MODULES = ['query', 'docket', 'summary', 'member','document']
@@ -155,8 +153,11 @@ class CoreScraper:
     ''' Base class that contains common methods/attributes for all scapers'''
 
     def __init__(self, court_dir, court, auth_path, headless, verbose, slabels=[], n_workers=N_WORKERS, exclusions_path=None, case_type=None,
-                 ind='#', case_limit=None, cost_limit=None, time_restriction=None, rts=None, rte=None):
+                 ind='#', case_limit=None, cost_limit=None, time_restriction=None, rts=None, rte=None, pool=None, ledger=None):
         self.browser = None
+        self.pool = pool # a BrowserPool to check browsers out from for each case (see checkout), else the scraper launches its own
+        self.ledger = ledger # a DownloadLedger to check and record downloads in (see have and record), else the filesystem is checked
+        self.session = None
         self.headless = headless
         self.verbose = verbose
         self.slabels = slabels
@@ -185,23 +186,55 @@ class CoreScraper:
         # Sets instance specific temp download folder (needed for document downloader)
         options = stools.get_firefox_options(self.dir.temp_subdir(self.ind), self.headless)
         self.browser = Firefox(options=options)
-        login_success = self.login()
-        if login_success and self.at_redaction_agreement():
-            self.browser.find_element(By.CSS_SELECTOR, 'input[type="checkbox"]').click()
-            self.browser.find_element(By.LINK_TEXT, "Continue").click()
-        return login_success
+        return login_browser(self.browser, self.auth, self.court)
 
     def close_browser(self):
-        if self.browser:
+        # (a browser checked out from the pool is the pool's to close)
+        if self.browser and not self.session:
             self.browser.quit()
 
+    @property
+    def download_dir(self):
+        ''' The folder the browser downloads to '''
+        return self.session.download_dir if self.session else self.dir.temp_subdir(self.ind)
+
+    @contextlib.asynccontextmanager
+    async def checkout(self):
+        '''
+        Check out a browser from the pool for the duration of a case, as self.browser (see browser_pool.py)
+        e.g. async with scraper.checkout(): await scraper.pull_case(...)
+        Without a pool, the scraper uses its own browser (launched by the pull methods when needed)
+        '''
+        if not self.pool:
+            yield None
+            return
+        loop = asyncio.get_running_loop()
+        self.session = await loop.run_in_executor(None, self.pool.acquire)
+        self.browser = self.session.browser
+        ok = False
+        try:
+            yield self.session
+            ok = True
+        finally:
+            self.pool.release(self.session, ok=ok)
+            self.browser, self.session = None, None
+
+    def have(self, fpath):
+        ''' Whether a file has already been downloaded (from the ledger if there is one, rather than the filesystem) '''
+        return self.ledger.has(fpath) if self.ledger else Path(fpath).exists()
+
+    def record(self, kind, fpath, **kwargs):
+        ''' Record a download in the ledger, if there is one (see DownloadLedger.record for the kwargs) '''
+        if self.ledger:
+            self.ledger.record(kind, fpath, **kwargs)
+
     def login(self):
         login_url = ftools.get_pacer_url(self.court, 'login')
-        return stools.login(self.browser, self.auth, login_url, logging=logging)
+        return stools.login(self.browser, self.auth, login_url, logging=logging, court=self.court)
 
     def logout(self):
         logout_url = ftools.get_pacer_url(self.court, 'logout')
-        self.browser.get(logout_url)
+        waits.get(self.browser, logout_url, self.court)
 
     def stamp(self, download_url=None, pacer_id=None):
         ''' Download stamp that can be added to bottom of documents as a html comment'''
@@ -228,13 +261,13 @@ class CoreScraper:
         data_str = json.dumps(data)
         return f"\n<!--{data_str}-->"
     # Misc
-    def get_caseno_info(self, case_no):
+    def get_caseno_info(self, case_no, requester=None):
         '''
         Get the info from the possible case no request_type
         Inputs:
-            - browser (Selenium browser instance)
-            - court (str): court abbreviation
             - case_no (str): pacer case no (e.g. "1:16-cv-12345")
+            - requester: what to make the request with (anything with a .request(method, url) that returns a
+                requests.Response, e.g. a requests.Session with the browser's cookies), defaults to the browser
         Output:
             - response ('missing', 'success')
             - data (list) of dicts with request_case_no and all other returned fields
@@ -243,12 +276,13 @@ class CoreScraper:
         data = []
 
         url = stools.get_pacer_url(self.court, 'possible_case') +'?' + case_no
-        response, content = get_xml_response(self.browser, url)
+        requester = requester or self.browser
+        response, content = get_xml_response(requester, url)
 
         # If login error, log in and try again
         if response=='not_logged_in':
             self.login()
-            response, content = get_xml_response(self.browser, url)
+            response, content = get_xml_response(requester, url)
 
         # Handle error
         if response in ('error', 'not_logged_in'):
@@ -267,20 +301,21 @@ class CoreScraper:
 
         return response, data
 
-    def get_caseno_info_id(self, case_no, def_no=None):
+    def get_caseno_info_id(self, case_no, def_no=None, requester=None):
         '''
         Get the info from possible case no request_type but just return the id
 
         Inputs:
             - case_no (str): a case no of the form 1:16-cv-12345
             - def_no (str or int): the defendant no. of interest, if None assumes main case
+            - requester: as for get_caseno_info
         Output:
             - pacer_id (int)
         '''
 
         pacer_id = None
         try:
-            response, data = self.get_caseno_info(case_no)
+            response, data = self.get_caseno_info(case_no, requester=requester)
         except:
             return
 
@@ -297,6 +332,23 @@ class CoreScraper:
 
         return int(pacer_id) if pacer_id else None
 
+    def wait_for(self, condition, kind='element', timeout=None):
+        ''' Wait for a condition on the browser, with this court's timeout for that kind of wait (see waits.wait_for) '''
+        return waits.wait_for(self.browser, condition, court=self.court, kind=kind, timeout=timeout)
+
+    def submit_and_wait(self, submit, kind='submit'):
+        '''
+        Do something that loads a new page (e.g. submitting a form) and wait for the new page
+        Inputs:
+            - submit (function): does it
+            - kind (str): the kind of wait (see waits.KINDS)
+        Output:
+            whether the new page loaded before the timeout
+        '''
+        old_page = waits.page_root(self.browser)
+        submit()
+        return bool(self.wait_for(waits.new_page(old_page), kind))
+
     def get_transaction_table(self):
         """ Find the transaction table element from a page, if it exists """
         cand = self.browser.find_elements(By.CSS_SELECTOR, 'table')[-1]
@@ -353,19 +405,17 @@ class QueryScraper(CoreScraper):
             #Head to query page
             try:
                 query_url = ftools.get_pacer_url(self.court, 'query')
-                self.browser.get(query_url)
+                waits.get(self.browser, query_url, self.court)
 
-                query_form = forms.FormFiller(self.browser, template='query', fill_values=config_chunk)
-                time.sleep(PAUSE['mini'])
+                query_form = forms.FormFiller(self.browser, template='query', fill_values=config_chunk, court=self.court)
+                self.wait_for(waits.element_present(forms.TEMPLATE_QUERY['buttons']['submit']))
                 query_form.fill()
-                time.sleep(PAUSE['mini'])
                 query_form.submit()
 
                 if self.submit_btn_disabled(query_form):
                     query_form.buttons['find_this_case'].locate().click()
-                    time.sleep(PAUSE['second'])
-                    query_form.submit()
-                    time.sleep(PAUSE['second'])
+                    self.wait_for(waits.element_enabled(forms.TEMPLATE_QUERY['buttons']['submit']), 'lookup')
+                    self.submit_and_wait(query_form.submit)
 
 
                 if self.results_found():
@@ -374,8 +424,7 @@ class QueryScraper(CoreScraper):
                     # Create parent directory incase prefix includes a subdirectory e.g. /{court}/queries/projectA/query__1.html
                     outpath.parent.mkdir(exist_ok=True, parents=True, mode=0o775)
 
-
-                    time.sleep(PAUSE['micro'])
+                    self.wait_for(waits.page_ready(), 'page')
                     download_url = self.browser.current_url
 
                     with open(outpath, 'w+') as wfile:
@@ -402,10 +451,13 @@ class DocketScraper(CoreScraper):
 
     re_mem = re.compile('''<a href=[\\\]{0,1}["']/cgi-bin/DktRpt.pl\?[0-9]{1,10}[\\\]{0,1}['"]>[0-9]\:[0-9][0-9]\-c[vr]-[0-9]{3,10}</a>''')
 
-    def __init__(self, core_args, show_member_list='never', docket_update=False, docket_input=None, exclude_parties=False):
+    def __init__(self, core_args, show_member_list='never', docket_update=False, docket_input=None, exclude_parties=False, use_http=False):
 
         super().__init__(**core_args)
         self.files = None
+        self.use_http = use_http
+        self.http = None # the HttpDocketFetcher, set up once the browser has logged in (if use_http)
+        self.http_browser = None # the browser whose cookies self.http has
         self.show_member_list = show_member_list
         self.docket_update = docket_update
         self.docket_input = Path(docket_input).resolve()
@@ -465,17 +517,21 @@ class DocketScraper(CoreScraper):
         Outputs:
             - outpath (str): the path to the file that was just written
             - cost (float): the cost of this download, as listed in the transaction table at the bottom of the document
+        (with use_http, the docket is first requested directly, and only pulled through the browser if that doesn't
+        return a docket report, see pull_case_http)
         '''
-        # Navigate to docket report page
         if not self.browser:
             login_success = self.launch_browser()
             if not login_success:
                 self.close_browser()
                 raise ValueError('Cannot log in to PACER')
-
-
-        docket_url = ftools.get_pacer_url(self.court, 'docket')
-        self.browser.get(docket_url)
+        if self.use_http:
+            if not self.http:
+                self.http = http_docket.HttpDocketFetcher(self.court)
+            # (take the cookies of whichever browser this case is being pulled with)
+            if self.http_browser is not self.browser:
+                self.http.sync_cookies(self.browser)
+                self.http_browser = self.browser
 
         # Build the input case no to allow for defendant no to be included, for sake of filling the form
         case_no_input = case['case_no'] + f"-{case['def_no']}" if 'def_no' in case.keys() else case['case_no']
@@ -511,19 +567,27 @@ class DocketScraper(CoreScraper):
             fill_values['include_parties'] = False
             fill_values['include_terminated'] = False
 
-        time.sleep(PAUSE['mini'])
-        docket_report_form = forms.FormFiller(self.browser, 'docket', fill_values)
+        # Initialise task line (for when in docket-update mode)
+        task_line = {k:case[k] for k in ('ucid', 'latest_date', 'previously_downloaded') if k in case}
+
+        if self.http:
+            pulled = self.pull_case_http(case, fill_values, task_line, new_member_list_seen)
+            if pulled is not None:
+                return pulled
+
+        # Navigate to docket report page
+        docket_url = ftools.get_pacer_url(self.court, 'docket')
+        waits.get(self.browser, docket_url, self.court)
+
+        self.wait_for(waits.element_present(forms.TEMPLATE_DOCKET_SHEET['fields']['case_no']['selector']))
+        docket_report_form = forms.FormFiller(self.browser, 'docket', fill_values, court=self.court)
         docket_report_form.fill()
 
         # Call the possible case no api again to get pacer_id
         pacer_id = self.get_caseno_info_id(case['case_no'], case.get('def_no'))
 
-        # Submit the form
-        docket_report_form.submit()
-        time.sleep(PAUSE['mini'])
-
-        # Initialise task line (for when in docket-update mode)
-        task_line = {k:case[k] for k in ('ucid', 'latest_date', 'previously_downloaded') if k in case}
+        # Submit the form and wait for the next page (the report, or the "may take a long time" page etc.)
+        self.submit_and_wait(docket_report_form.submit)
 
         # Checks before form submission stage complete
         if not self.at_docket_report():
@@ -533,32 +597,19 @@ class DocketScraper(CoreScraper):
 
                 initially_requested = self.browser.find_elements(By.CSS_SELECTOR, 'input[name="date_from"]')[-1]
                 initially_requested.click()
-                time.sleep(PAUSE['micro'])
 
-                logging.info(f"{self} LONGTIME: case {case['ucid']} at the 'long time' page, submitting form and pausing to let page load...")
+                logging.info(f"{self} LONGTIME: case {case['ucid']} at the 'long time' page, submitting form and waiting for the page to load...")
                 self.browser.execute_script('ProcessForm()')
-                time.sleep(PAUSE['moment'])
-
-                # For very slow loading pages, loop and check if page is fully loaded
-                longtime_attempts = 0
-                transaction_table = None
-                while longtime_attempts < MAX_LONGTIME_ATTEMPTS:
-                    print(f'LONGTIME loop {longtime_attempts=}')
-                    transaction_table = self.get_transaction_table()
-                    longtime_attempts += 1
-
-                    if transaction_table:
-                        break
-                    else:
-                        time.sleep(PAUSE['moment'])
 
-                print(f"Out of LONGTIME loop, {longtime_attempts=}")
+                # Very slow loading pages are only fully loaded once the transaction table at the bottom is there
+                start = time.perf_counter()
+                transaction_table = self.wait_for(waits.last_table_heading(PSC_TEXT), 'longtime')
+                print(f"LONGTIME page {'loaded' if transaction_table else 'not loaded'} after {time.perf_counter() - start:.1f}s")
                 if not transaction_table:
-                    print('ERROR: LONGTIME exceeded maximum attempts and page not fully loaded')
+                    print('ERROR: LONGTIME exceeded maximum wait and page not fully loaded')
                     return
             else:
-                self.browser.execute_script('ProcessForm()')
-                time.sleep(PAUSE['moment'])
+                self.submit_and_wait(lambda: self.browser.execute_script('ProcessForm()'))
 
         # Now assume form submitted correctly, check various scenarious
         if self.at_invalid_case():
@@ -590,85 +641,125 @@ class DocketScraper(CoreScraper):
                     wfile.write( json.dumps(task_line)+'\n' )
 
         elif self.at_docket_report():
+            no_docketlines = self.no_docketlines()
+            return self.save_docket(case, self.browser.page_source, self.browser.current_url, pacer_id, no_docketlines,
+                task_line, new_member_list_seen)
 
-            # Check for correct caseno and court
-            hstring_court, hstring_caseno = extract_court_caseno(self.browser.page_source)
-            hstring_caseno = ftools.clean_case_id(hstring_caseno)
+        else:
+            print(f'ERROR: <case: {case["ucid"]}> not found, reason unknown')
+            return None, 0
 
-            # Training site
-            if self.court=='psc':
-                hstring_court='psc'
+    def pull_case_http(self, case, fill_values, task_line, new_member_list_seen):
+        '''
+        Pull the docket for a case with plain HTTP requests, using the browser's session (see http_docket.py)
+        Inputs:
+            - case, new_member_list_seen: as for pull_case
+            - fill_values (dict): the docket report form values
+            - task_line (dict): the docket update task line for the case
+        Output:
+            as for pull_case, or None if PACER didn't return a docket report (the case is then pulled through the browser)
+        '''
+        pacer_id = self.get_caseno_info_id(case['case_no'], case.get('def_no'), requester=self.http.session)
+        if pacer_id:
+            try:
+                kind, download_url, page_source = self.http.fetch_docket(fill_values, pacer_id)
+            except requests.RequestException as e:
+                kind = f"{http_docket.HTTP_ERROR} ({type(e).__name__})"
+            if kind == http_docket.DOCKET_REPORT:
+                return self.save_docket(case, page_source, download_url, pacer_id, http_docket.no_docketlines(page_source),
+                    task_line, new_member_list_seen)
+        else:
+            kind = 'no pacer id'
 
-            if not (hstring_court==self.court and hstring_caseno==case['case_no']):
-                print(f"PACER_ERROR_WRONG_CASE ucid={case['ucid']} {hstring_court=} {hstring_caseno=}")
-                return PACER_ERROR_WRONG_CASE
+        logging.info(f"{self} HTTP docket request for {case['ucid']} got back: {kind}, pulling it through the browser")
+        # (the browser may have logged in again since the cookies were last taken)
+        self.http.sync_cookies(self.browser)
 
-            # Save the output by case name
-            outpath = ftools.get_expected_path(case['ucid'], subdir='html', pacer_path=self.dir.root.parent, def_no=case.get('def_no'))
+    def save_docket(self, case, page_source, download_url, pacer_id, no_docketlines, task_line, new_member_list_seen):
+        '''
+        Check that a docket report is for the right case and write it to the html directory, with the download stamp
+        Inputs:
+            - case, new_member_list_seen: as for pull_case
+            - page_source (str): the docket report html
+            - download_url (str): the url of the docket report
+            - pacer_id (int): the case's PACER id, for the stamp
+            - no_docketlines (bool): whether the report says no docket lines matched the query
+            - task_line (dict): the docket update task line for the case
+        Output:
+            as for pull_case
+        '''
+        # Check for correct caseno and court
+        hstring_court, hstring_caseno = extract_court_caseno(page_source)
+        hstring_caseno = ftools.clean_case_id(hstring_caseno)
 
-            no_docketlines = self.no_docketlines()
-            if no_docketlines:
-                logging.info(f'No new docket lines for case: {case["case_no"]}')
+        # Training site
+        if self.court=='psc':
+            hstring_court='psc'
 
-            # If necessary, create "..._n.html" etc. filename for nth update to case
-            if case.get('previously_downloaded', False):
-                ind = 0
-                while outpath.exists():
-                    ind += 1
-                    outpath = self.dir.html / ftools.generate_docket_filename(case['case_no'], case.get('def_no'), ind=ind)
+        if not (hstring_court==self.court and hstring_caseno==case['case_no']):
+            print(f"PACER_ERROR_WRONG_CASE ucid={case['ucid']} {hstring_court=} {hstring_caseno=}")
+            return PACER_ERROR_WRONG_CASE
 
-            time.sleep(PAUSE['micro'])
-            download_url = self.browser.current_url
-            page_source = self.browser.page_source
-            if self.court == 'psc':
-                cost = 0 
-            else:
-                cost = float(ftools.parse_transaction_history(page_source)['cost'])
+        # Save the output by case name
+        outpath = ftools.get_expected_path(case['ucid'], subdir='html', pacer_path=self.dir.root.parent, def_no=case.get('def_no'))
 
-            # Make sure parent directory exists, which will be the year-part
-            outpath.parent.mkdir(exist_ok=True, mode=0o775)
-            with open(outpath, "w+") as wfile:
-                # Add the stamp to the bottom of the url as it is written
-                wfile.write(page_source + self.stamp(download_url, pacer_id=pacer_id))
+        if no_docketlines:
+            logging.info(f'No new docket lines for case: {case["case_no"]}')
 
-            if self.docket_update:
-                # Get the download path relative to project root folder
-                rel_path = outpath.relative_to(self.dir.root.parents[2])
-                # Write the task line
-                task_line.update({
-                    'completed': True,
-                    'downloaded': True,
-                    'new_lines': not no_docketlines,
-                    'outpath': str(rel_path)
-                })
-                with open(self.update_task_path, 'a', encoding='utf-8') as wfile:
-                    wfile.write( json.dumps(task_line)+'\n' )
+        # If necessary, create "..._n.html" etc. filename for nth update to case
+        if case.get('previously_downloaded', False):
+            ind = 0
+            while self.have(outpath):
+                ind += 1
+                outpath = self.dir.html / ftools.generate_docket_filename(case['case_no'], case.get('def_no'), ind=ind)
 
-            #Check to see if it is a member case
-            #TODO: also for self.show_member_list=='always'?
-            if self.show_member_list=='avoid':
-                contents = open(outpath, 'rb').read()
-                found_members = self.re_mem.findall(str(contents))
-                if found_members:
-                    found_case_ids = [x.split('</a>')[0].split('>')[-1] for x in found_members]
-                    found_case_ids = [ftools.clean_case_id(x) for x in set(found_case_ids) if x not in self.member_list_seen]
-                    new_member_list_seen += found_case_ids
+        if self.court == 'psc':
+            cost = 0 
+        else:
+            cost = float(ftools.parse_transaction_history(page_source)['cost'])
 
-            return outpath, cost
+        # Make sure parent directory exists, which will be the year-part
+        outpath.parent.mkdir(exist_ok=True, mode=0o775)
+        # Add the stamp to the bottom of the url as it is written
+        contents = page_source + self.stamp(download_url, pacer_id=pacer_id)
+        with open(outpath, "w+") as wfile:
+            wfile.write(contents)
+        self.record('docket', outpath, ucid=case['ucid'], contents=contents, cost=cost)
+
+        if self.docket_update:
+            # Get the download path relative to project root folder
+            rel_path = outpath.relative_to(self.dir.root.parents[2])
+            # Write the task line
+            task_line.update({
+                'completed': True,
+                'downloaded': True,
+                'new_lines': not no_docketlines,
+                'outpath': str(rel_path)
+            })
+            with open(self.update_task_path, 'a', encoding='utf-8') as wfile:
+                wfile.write( json.dumps(task_line)+'\n' )
+
+        #Check to see if it is a member case (in what was just written, rather than reading the file back)
+        #TODO: also for self.show_member_list=='always'?
+        if self.show_member_list=='avoid':
+            found_members = self.re_mem.findall(contents)
+            if found_members:
+                found_case_ids = [x.split('</a>')[0].split('>')[-1] for x in found_members]
+                found_case_ids = [ftools.clean_case_id(x) for x in set(found_case_ids) if x not in self.member_list_seen]
+                new_member_list_seen += found_case_ids
+
+        return outpath, cost
 
-        else:
-            print(f'ERROR: <case: {case["ucid"]}> not found, reason unknown')
-            return None, 0
 ###
 # Support Functions for Docket Scraper
 ###
-def get_member_cases(court_dir, file=settings.MEM_DF):
-    ''' Get the list cases that have previously been seen listed as member cases'''
-    return pd.read_csv(Path(file)).query("court==@court_dir.court")['case_no'].tolist()
+def get_member_cases(court_dir, db_path=settings.MEMBER_LEAD_DB):
+    ''' Get the list cases that have previously been seen listed as member cases (by the scraper or the parser)'''
+    return MemberLinkStore(db_path).member_case_nos(court_dir.court)
 
 
 
-def check_exists(subdir, court=None, case_no=None, ucid=None, def_no=None, pacer_path=settings.PACER_PATH):
+def check_exists(subdir, court=None, case_no=None, ucid=None, def_no=None, pacer_path=settings.PACER_PATH, ledger=None):
     '''
     Check if a case-level file exists
 
@@ -678,6 +769,7 @@ def check_exists(subdir, court=None, case_no=None, ucid=None, def_no=None, pacer
         - ucid (str): the case ucid, if not provided will be generated from case_no, court
         - def_no (str or int): ignored if ucid provided
         - subdir ('html', 'summaries', 'members'): the subdir to look in
+        - ledger (DownloadLedger): the court's download ledger, to look the file up in rather than on the filesystem
     Output:
         (bool) whether the relevant file exists or not
     '''
@@ -689,7 +781,8 @@ def check_exists(subdir, court=None, case_no=None, ucid=None, def_no=None, pacer
             case_no = f"{case_no}-{def_no}"
             ucid = dtools.ucid(court, case_no, allow_def_stub=True)
 
-    exists = ftools.get_expected_path(ucid=ucid, subdir=subdir, pacer_path=pacer_path).exists()
+    fpath = ftools.get_expected_path(ucid=ucid, subdir=subdir, pacer_path=pacer_path)
+    exists = ledger.has(fpath) if ledger else fpath.exists()
 
     return exists
 
@@ -725,15 +818,14 @@ def _pull_summary_(ScraperInstance, case):
             raise ValueError('Cannot log in to PACER')
 
     query_url = stools.get_pacer_url(self.court, 'query')
-    self.browser.get(query_url)
+    waits.get(self.browser, query_url, self.court)
 
     fill_values = {'case_no': case['case_no']}
 
     try:
-        query_form = forms.FormFiller(self.browser, template='query', fill_values=fill_values)
-        time.sleep(PAUSE['mini'])
+        query_form = forms.FormFiller(self.browser, template='query', fill_values=fill_values, court=self.court)
+        self.wait_for(waits.element_present(forms.TEMPLATE_QUERY['buttons']['submit']))
         query_form.fill()
-        time.sleep(PAUSE['mini'])
         query_form.submit()
     except:
         logging.info(f"{self} ERROR with {case['case_no']} cannot fill out query form")
@@ -768,9 +860,11 @@ def _pull_summary_(ScraperInstance, case):
     outpath = ftools.get_expected_path(case['ucid'], subdir='summaries', pacer_path=self.dir.root.parent, def_no=case.get('def_no'))
 
     download_url = self.browser.current_url
+    # Add the stamp to the bottom of the url as it is written
+    contents = self.browser.page_source + self.stamp(download_url, pacer_id=pacer_id)
     with open(outpath, "w+") as wfile:
-        # Add the stamp to the bottom of the url as it is written
-        wfile.write(self.browser.page_source + self.stamp(download_url, pacer_id=pacer_id))
+        wfile.write(contents)
+    self.record('summary', outpath, ucid=case['ucid'], contents=contents)
 
     return outpath
 
@@ -896,10 +990,11 @@ class MemberScraper(CoreScraper):
 
             download_url = self.browser.current_url
             outpath.parent.mkdir(exist_ok=True, mode=0o775)
+            # Add the stamp to the bottom of the url as it is written
+            contents = self.browser.page_source + self.stamp_json(download_url=download_url, pacer_id=pacer_id)
             with open(outpath, "w+") as wfile:
-                # Add the stamp to the bottom of the url as it is written
-                stamp = self.stamp_json(download_url=download_url, pacer_id=pacer_id)
-                wfile.write(self.browser.page_source + stamp)
+                wfile.write(contents)
+            self.record('member', outpath, ucid=case['ucid'], contents=contents)
 
             return outpath
 
@@ -919,7 +1014,8 @@ class DocumentScraper(CoreScraper):
         super().__init__(**core_args)
         self.get_att = get_att
 
-        self.previously_downloaded_doc_ids = self.get_previously_downloaded_docs()
+        # (with a ledger, documents are looked up in it by doc_id instead)
+        self.previously_downloaded_doc_ids = set() if self.ledger else self.get_previously_downloaded_docs()
         self.doc_limit = doc_limit
 
     def __repr__(self):
@@ -927,7 +1023,11 @@ class DocumentScraper(CoreScraper):
 
     def get_previously_downloaded_docs(self):
         '''Get the doc_ids of all the previously downloaded docs in the /docs directory'''
-        return [ftools.parse_document_fname(x.name)['doc_id'] for x in self.dir.docs.glob('*/*.pdf')]
+        return {ftools.parse_document_fname(x.name)['doc_id'] for x in self.dir.docs.glob('*/*.pdf')}
+
+    def have_document(self, doc_id):
+        ''' Whether a document has already been downloaded (from the ledger if there is one) '''
+        return self.ledger.has_document(doc_id) if self.ledger else doc_id in self.previously_downloaded_doc_ids
 
     @run_in_executor
     def pull_docs(self, docket):
@@ -999,7 +1099,7 @@ class DocumentScraper(CoreScraper):
         ''' Checkf if at a "Cannot redisplay... already been shown" page '''
         # Check tabs:
         resp = False
-        time.sleep(PAUSE['mini'])
+        self.wait_for(lambda browser: len(browser.window_handles) > 1, timeout=0.5)
         tabs = self.browser.window_handles
         if len(tabs) >1:
             try:
@@ -1086,13 +1186,15 @@ class DocumentScraper(CoreScraper):
             logging.info(f"{self} downloading document: {doc_id}")
 
         # Check if previously downloaded
-        if doc_id in self.previously_downloaded_doc_ids:
+        if self.have_document(doc_id):
             # Document previously downloaded, skipping
             return None
 
         url = att['href'] if att else doc['href']
-        self.browser.get(url)
-        time.sleep(PAUSE['micro'])
+        # (anything in the download folder from before now isn't this document)
+        download_start = time.time() - 1
+        waits.get(self.browser, url, self.court)
+        transaction_data = {}
 
         if self.at_outside_warning():
             # Click continue
@@ -1128,21 +1230,20 @@ class DocumentScraper(CoreScraper):
             # Grab the first command
             go_DLS_command = on_submit_command.split(';', maxsplit=1)[0]
             self.browser.execute_script(go_DLS_command)
-            time.sleep(PAUSE['moment'])
 
         elif self.at_no_permission():
             logging.info(f"{self} ERROR (pull_doc): Do not have permission to access ({doc_id})")
             return False
 
-        # Find downloaded document in the temp folder
-        wait_time = 2 if retry_count==0 else 4
-
-        file = stools.get_recent_download(self.dir.temp_subdir(self.ind), wait_time=wait_time, time_buffer=20)
+        # Wait for the document to finish downloading to the temp folder
+        file = waits.wait_for_download(self.download_dir, download_start, court=self.court)
         if file:
             # Move file
             if fpath.exists():
                 logging.info(f'{self} File {fpath} already exists, replacing...')
             file.replace(fpath)
+            cost = float(transaction_data['cost']) if transaction_data.get('cost') else None
+            self.record('document', fpath, ucid=ucid, doc_id=doc_id, cost=cost)
 
             logging.info(f"{self} DOWNLOADED: File downloaded as {fpath.name}")
             return True
@@ -1190,15 +1291,18 @@ def generate_dockets_list(document_input, core_args, skip_seen=True, all_docs=Fa
         df = df[df.doc_no.notna()].copy()
 
     # Filter out cases we don't have htmls for
-    df['exists'] = df.ucid.apply(lambda x: ftools.get_expected_path(ucid=x, subdir='html',pacer_path=core_args['court_dir'].root.parent).exists())
+    ledger = core_args.get('ledger')
+    df['exists'] = df.ucid.apply(lambda x: check_exists(subdir='html', ucid=x, pacer_path=core_args['court_dir'].root.parent, ledger=ledger))
     df = df[df.exists].copy()
 
     # Filter out dockets that have *any* docs downloaded if skip_seen
     if skip_seen and not ('doc_no' in df.columns):
-        # Get list of ucids that have previously had docs downloaded
-        document_paths = list(core_args['court_dir'].docs.glob('*.pdf'))
-        ucid_from_fpath = lambda x: ftools.parse_document_fname(x.name)['ucid']
-        seen_ucids = set(ucid_from_fpath(x) for x in document_paths)
+        # Get list of ucids that have previously had docs downloaded (docs are in year subfolders)
+        if ledger:
+            seen_ucids = ledger.ucids('document')
+        else:
+            document_paths = core_args['court_dir'].docs.glob('*/*.pdf')
+            seen_ucids = set(ftools.parse_document_fname(x.name)['ucid'] for x in document_paths)
         # Limit df to ucids that haven't been seen
         df = df[~df.ucid.isin(seen_ucids)].copy()
 
@@ -1206,6 +1310,39 @@ def generate_dockets_list(document_input, core_args, skip_seen=True, all_docs=Fa
     return df[keepcols].to_dict('records')
 
 
+def queue_key(item, fields):
+    ''' The key of a work queue item: the values of the given fields that it has, joined with | '''
+    return '|'.join(str(item[field]) for field in fields if field in item and pd.notna(item[field]) and item[field] != '')
+
+def build_queue(module, court, items, key_fields, queue_path=None, retry_failed=False, max_attempts=1):
+    '''
+    Set up the work queue for a scraper module and add its items (see scrape_queue.py)
+
+    Inputs:
+        - module (str): the scraper module
+        - court (str): the court being scraped
+        - items (list of dicts): the cases/dockets to scrape, in order
+        - key_fields (tuple): the fields that identify an item (see queue_key)
+        - queue_path (str or Path): the sqlite file for the queue, if it exists the items in it are picked up where they were
+            left off, if None the queue is held in memory for this run only
+        - retry_failed (bool): put the items that failed in an earlier run back in the queue
+        - max_attempts (int): the no. of times an item can be tried
+    Output:
+        (ScrapeQueue)
+    '''
+    queue = ScrapeQueue(module, court, db_path=queue_path, max_attempts=max_attempts)
+
+    n_orphans = queue.reclaim_orphans()
+    if n_orphans:
+        logging.info(f"Work queue: {n_orphans:,} items left in progress by a stopped scraper put back in the queue")
+    if retry_failed:
+        logging.info(f"Work queue: {queue.retry_failed():,} failed items put back in the queue")
+
+    n_new = queue.add(items, key_fn=lambda item: queue_key(item, key_fields))
+    logging.info(f"Work queue ({queue_path or 'in memory'}): {n_new:,} new items, {queue.counts()}")
+    return queue
+
+
 ##########################################################
 ###  Sequences
 ##########################################################
@@ -1218,9 +1355,11 @@ def seq_query(core_args, config, prefix):
     results = QS.pull_queries()
     logging.info("Finished Query Scraper sequence, closing...")
     QS.close_browser()
+    logging.info(waits.court_stats(core_args['court']).summary())
     return results
 
-async def seq_docket(core_args, query_results, docket_input, docket_update, show_member_list, exclude_parties):
+async def seq_docket(core_args, query_results, docket_input, docket_update, show_member_list, exclude_parties, docket_http=False,
+                     queue_path=None, queue_retry_failed=False):
     ''' Scraper sequence that handles multiple workers for the Docket module '''
 
     async def _scraper_(args, ind):
@@ -1230,9 +1369,11 @@ async def seq_docket(core_args, query_results, docket_input, docket_update, show
             show_member_list = show_member_list,
             docket_input = docket_input,
             docket_update = docket_update,
-            exclude_parties = exclude_parties
+            exclude_parties = exclude_parties,
+            use_http = docket_http
         )
-        while len(cases):
+        worker = ScrapeQueue.worker_id(ind)
+        while True:
             # Check time restriction
             if core_args['time_restriction']:
                 if not check_time_continue(DktS.rts, DktS.rte):
@@ -1244,23 +1385,24 @@ async def seq_docket(core_args, query_results, docket_input, docket_update, show
                 logging.info(f"{DktS}: case limit ({DktS.case_limit}) reached")
                 break
 
-            # check if cost_limit reached
-            nonlocal total_cost # i've never used this before! feels ugly...but...it must've been built in for a reason
+            # check if cost_limit reached (by this process, the queue may be shared with other scrapers)
+            total_cost = queue.total_cost(ScrapeQueue.process_id())
             if DktS.cost_limit and total_cost >= DktS.cost_limit:
                 logging.info(f"{DktS}: cost limit ($%.2f) {'reached' if total_cost==DktS.cost_limit else 'exceeded'}" % DktS.cost_limit)
                 break
 
-            # Get a case from the pile
-            case = cases.pop(0)
-            if case.get('download_attempts', 0) >= MAX_DOWNLOAD_ATTEMPTS:
-                logging.info(f"{DktS} skipping {case['ucid']}, exceeded max download attempts")
-                return
+            # Get a case from the queue
+            claimed = queue.claim(worker)
+            if claimed is None:
+                break
+            key, case, attempts = claimed
 
             exists = check_exists(subdir='html', pacer_path=DktS.dir.root.parent,
-                                  ucid=case['ucid'],def_no=case.get('def_no') )
+                                  ucid=case['ucid'],def_no=case.get('def_no'), ledger=DktS.ledger )
 
             if exists and not docket_update:
                 results['skipped'].append(case['ucid'])
+                queue.complete(key, worker, result='skipped')
                 if DktS.verbose:
                     logging.info(f"{DktS} <case: {case['ucid']}> already exists, skipping")
             else:
@@ -1268,28 +1410,31 @@ async def seq_docket(core_args, query_results, docket_input, docket_update, show
 
                 # Pass the previously_downloaded status in to pull_case
                 case['previously_downloaded'] = exists
-                docket_path, cost = await DktS.pull_case(case, new_member_list_seen)
-                total_cost += cost
-
+                async with DktS.checkout():
+                    pulled = await DktS.pull_case(case, new_member_list_seen)
+                # (pull_case gives the path and cost, or just PACER_ERROR_WRONG_CASE, or None if the case couldn't be pulled)
+                docket_path, cost = pulled if type(pulled) is tuple else (pulled, 0)
 
                 if docket_path==PACER_ERROR_WRONG_CASE:
-                    logging.info(f"{DktS} PACER_ERROR_WRONG_CASE: served wrong case, pushing back onto end of queue")
-
-                    # Need to try the case again
-                    if 'download_attempts' not in case.keys():
-                        case['download_attempts'] = 0
-                    case['download_attempts'] += 1
-
-                    cases.append(case)
+                    # Need to try the case again, if it has attempts left
+                    if queue.fail(key, worker, error=PACER_ERROR_WRONG_CASE, retry=True, cost=cost):
+                        logging.info(f"{DktS} PACER_ERROR_WRONG_CASE: served wrong case, pushing back onto end of queue")
+                    else:
+                        results['failure'].append(case['ucid'])
+                        logging.info(f"{DktS} PACER_ERROR_WRONG_CASE: served wrong case, exceeded max download attempts ({attempts})")
 
                 elif docket_path:
                     results['success'].append(docket_path)
+                    queue.complete(key, worker, cost=cost, result=docket_path)
                     logging.info(f"{DktS} downloaded {case['ucid']} successfully")
                 else:
                     results['failure'].append(case['ucid'])
+                    queue.fail(key, worker, cost=cost)
                     logging.info(f"{DktS} ERROR downloading {case['ucid']}")
 
         logging.info(f"{DktS} finished scraping")
+        if DktS.http:
+            logging.info(f"{DktS} HTTP docket requests: {dict(DktS.http.outcomes)}")
         DktS.close_browser()
 
     logging.info(f"\n######\n## Docket Scraper Sequence [{core_args['court']}]\n######\n")
@@ -1308,7 +1453,7 @@ async def seq_docket(core_args, query_results, docket_input, docket_update, show
     df_cases['ucid'] = dtools.ucid(core_args['court'], df_cases['case_no'], allow_def_stub=True)
 
     prev_downloaded_map = map(
-        lambda x: check_exists(subdir='html', ucid=x, pacer_path=core_args['court_dir'].root.parent),
+        lambda x: check_exists(subdir='html', ucid=x, pacer_path=core_args['court_dir'].root.parent, ledger=core_args['ledger']),
         df_cases.ucid
     )
 
@@ -1347,10 +1492,10 @@ async def seq_docket(core_args, query_results, docket_input, docket_update, show
     del df_cases, input_data
     # logging.info(f"Docket Scraper initialised with {len(cases):,} cases.")
 
-    # Initialise lists, will be accessed by all instances of _scraper_
+    # Initialise the work queue and lists, will be accessed by all instances of _scraper_
+    queue = build_queue('docket', core_args['court'], cases, ('ucid',), queue_path, queue_retry_failed, max_attempts=MAX_DOWNLOAD_ATTEMPTS)
     results = {'success': [], 'failure':[], 'skipped':[]}
     new_member_list_seen = []
-    total_cost = 0
 
     # Initialise scrapers, run asynchronously
     scrapers = [asyncio.create_task(_scraper_(args=core_args, ind=i)) for i in range(core_args['n_workers'])]
@@ -1360,29 +1505,31 @@ async def seq_docket(core_args, query_results, docket_input, docket_update, show
     logging.info(f'\nDocket Scraper sequence terminated successfully')
     results_tally = {k: f"{len(v):,}" for k,v in results.items()}
     logging.info(str(results_tally))
-    logging.info(f'Total cost: $%.2f' % total_cost)
+    logging.info(f'Total cost: $%.2f' % queue.total_cost(ScrapeQueue.process_id()))
+    logging.info(waits.court_stats(core_args['court']).summary())
+    if queue_path:
+        logging.info(f"Work queue: {queue.counts()}")
 
 
-    # When finished scraping, add new_member_list_seen to the member_list file
+    # When finished scraping, add new_member_list_seen to the member link store
     if len(new_member_list_seen):
         new_member_list_seen=list(set(new_member_list_seen)) #covering greg's bases (even if I missed something, this much redundancy can't hurt)
-        with open(settings.MEM_DF, 'a', encoding='utf-8', newline='\n') as wfile:
-            rows = ( (core_args['court'], x) for x in new_member_list_seen)
-            csv.writer(wfile).writerows(rows)
+        MemberLinkStore().add_scraped_members(core_args['court'], new_member_list_seen)
 
         logging.info(f"Added {len(new_member_list_seen)} new member cases to members list")
 
     return results
 
-async def seq_summary(core_args, summary_input):
+async def seq_summary(core_args, summary_input, queue_path=None, queue_retry_failed=False):
 
     async def _scraper_(args,ind):
         ''' Sequence for single instance of Summary Scraper'''
         SS = SummaryScraper(
             core_args = {**core_args, 'ind':ind }
         )
+        worker = ScrapeQueue.worker_id(ind)
 
-        while len(cases):
+        while True:
             # Check time restriction
             if core_args['time_restriction']:
                 if not check_time_continue(core_args['rts'], core_args['rte']):
@@ -1394,27 +1541,34 @@ async def seq_summary(core_args, summary_input):
                 logging.info(f"{SS}: case limit ({core_args['case_limit']}) reached")
                 break
 
-            case = cases.pop(0)
+            claimed = queue.claim(worker)
+            if claimed is None:
+                break
+            key, case, _ = claimed
 
             exists = check_exists(subdir='summaries', pacer_path=core_args['court_dir'].root.parent,
-                                    ucid=case['ucid'], def_no=case.get('def_no') )
+                                    ucid=case['ucid'], def_no=case.get('def_no'), ledger=core_args['ledger'] )
             if exists:
                 logging.debug(f"{SS} <case: {case['ucid']}> already exists, skipping")
                 results['skipped'].append(case['ucid'])
+                queue.complete(key, worker, result='skipped')
 
             else:
 
                 logging.info(f"{SS} taking {case['case_no']}")
                 try:
-                    summary_path = await SS.pull_summary(case)
+                    async with SS.checkout():
+                        summary_path = await SS.pull_summary(case)
                 except:
                     summary_path = None
 
                 if summary_path:
                     results['success'].append(summary_path)
+                    queue.complete(key, worker, result=summary_path)
                     logging.info(f"{SS} downloaded {case['ucid']} summary successfully")
                 else:
                     results['failure'].append(case['ucid'])
+                    queue.fail(key, worker)
                     logging.info(f"{SS} ERROR downloading {case['ucid']} summary")
 
         logging.info(f"{SS} finished scraping")
@@ -1449,7 +1603,8 @@ async def seq_summary(core_args, summary_input):
 
     logging.info(f"Summary Scraper initialised with {len(cases):,} cases.")
 
-    # Initilise lists, will be accessed by all instances of _scraper_
+    # Initilise the work queue and lists, will be accessed by all instances of _scraper_
+    queue = build_queue('summary', core_args['court'], cases, ('ucid', 'def_no'), queue_path, queue_retry_failed)
     results = {'success':[], 'failure':[], 'skipped':[]}
 
     # Initialise scrapers, run asynchronously
@@ -1460,28 +1615,34 @@ async def seq_summary(core_args, summary_input):
     logging.info(f'\nSummary Scraper sequence terminated successfully')
     results_tally = {k: f"{len(v):,}" for k,v in results.items()}
     logging.info(str(results_tally))
+    logging.info(waits.court_stats(core_args['court']).summary())
 
     return results
 
-async def seq_member(core_args, member_input):
+async def seq_member(core_args, member_input, queue_path=None, queue_retry_failed=False):
 
     async def _scraper_(args, ind):
         ''' Sequence for single instance of Member Scraper'''
         MS = MemberScraper(
             core_args = {**core_args, 'ind':ind }
         )
+        worker = ScrapeQueue.worker_id(ind)
 
-        while len(cases):
+        while True:
             # Check time restriction
             if core_args['time_restriction']:
                 if not check_time_continue(core_args['rts'], core_args['rte']):
                     MS.close_browser()
                     break
 
-            case = cases.pop(0)
+            claimed = queue.claim(worker)
+            if claimed is None:
+                break
+            key, case, _ = claimed
             logging.info(f"{MS} taking case: {case}")
             try:
-                member_path = await MS.pull_members(case)
+                async with MS.checkout():
+                    member_path = await MS.pull_members(case)
             except:
                 member_path = None
 
@@ -1491,8 +1652,10 @@ async def seq_member(core_args, member_input):
                     case['ucid'] = dtools.ucid(core_args['court'], case_no)
 
                 results.append(member_path)
+                queue.complete(key, worker, result=member_path)
                 logging.info(f"{MS} downloaded {case['ucid']} member list successfully")
             else:
+                queue.fail(key, worker)
                 logging.info(f"{MS} ERROR downloading member list for {case}")
 
         logging.info(f"{MS} finished scraping")
@@ -1512,17 +1675,20 @@ async def seq_member(core_args, member_input):
 
     logging.info(f"Member Scraper initialised with {len(cases):,} cases.")
 
-    # Initilise results list, will be accessed by all instances of _scraper_
+    # Initilise the work queue and results list, will be accessed by all instances of _scraper_
+    queue = build_queue('member', core_args['court'], cases, ('ucid', 'case_no', 'pacer_id'), queue_path, queue_retry_failed)
     results = []
 
     # Initialise scrapers, run asynchronously
     scrapers = [asyncio.create_task(_scraper_(args=core_args, ind=i)) for i in range(core_args['n_workers'])]
     await asyncio.gather(*scrapers)
     logging.info(f'\nMember Scraper sequence terminated successfully')
+    logging.info(waits.court_stats(core_args['court']).summary())
 
     return results
 
-async def seq_document(core_args, new_dockets, document_input, document_att, skip_seen, document_limit, all_docs):
+async def seq_document(core_args, new_dockets, document_input, document_att, skip_seen, document_limit, all_docs,
+                       queue_path=None, queue_retry_failed=False):
     ''' Scraper sequence that handles multiple workers for the Document Scraper module '''
 
     async def _scraper_(args, ind):
@@ -1532,20 +1698,27 @@ async def seq_document(core_args, new_dockets, document_input, document_att, ski
             get_att = document_att,
             doc_limit = document_limit
         )
-        while len(dockets):
+        worker = ScrapeQueue.worker_id(ind)
+        while True:
             # Check time restriction
             if core_args['time_restriction']:
                 if not check_time_continue(core_args['rts'], core_args['rte']):
                     DocS.close_browser()
                     break
-            # Pop a case off the dockets list
+            # Claim a case from the queue
+            claimed = queue.claim(worker)
+            if claimed is None:
+                break
+            key, docket, _ = claimed
 
-            docket = dockets.pop(0)
             logging.info(f"{DocS} taking case {docket['ucid']}")
             try:
-                await DocS.pull_docs(docket)
-            except:
-                logging.info(f'{DocS} Error downloading documents from {file.name}')
+                async with DocS.checkout():
+                    await DocS.pull_docs(docket)
+                queue.complete(key, worker)
+            except Exception as e:
+                queue.fail(key, worker, error=e)
+                logging.info(f"{DocS} Error downloading documents from {docket['ucid']}")
 
         logging.info(f"{DocS} finished scraping")
         DocS.close_browser()
@@ -1560,7 +1733,8 @@ async def seq_document(core_args, new_dockets, document_input, document_att, ski
     stools.clean_temp_download_folders(core_args['court_dir'])
 
     # Generate list of dockets
-    dockets = [{'fpath':x} for x in new_dockets] or generate_dockets_list(document_input, core_args, skip_seen, all_docs)
+    dockets = [{'fpath':str(x), 'ucid':ftools.filename_to_ucid(x, core_args['court'])} for x in new_dockets] \
+        or generate_dockets_list(document_input, core_args, skip_seen, all_docs)
 
     # Deal with no. of cases and case limit
     logging.info(f"Document Scraper initialised with {len(dockets)} case dockets.")
@@ -1568,6 +1742,7 @@ async def seq_document(core_args, new_dockets, document_input, document_att, ski
         dockets = dockets[:core_args['case_limit']]
         logging.info(f"Applying case limit({core_args['case_limit']}): {len(dockets)} case dockets will be included in Document Scraper")
     logging.info(f"Document Limit of {document_limit:,} will be applied. Any individual case with more than {document_limit:,} documents will be skipped.\n")
+    queue = build_queue('document', core_args['court'], dockets, ('ucid', 'doc_no'), queue_path, queue_retry_failed)
 
     # Create scraper instances and await completion
     scrapers = [asyncio.create_task(_scraper_(args=core_args, ind=i)) for i in range(core_args['n_workers'])]
@@ -1578,6 +1753,7 @@ async def seq_document(core_args, new_dockets, document_input, document_att, ski
     stools.clean_temp_download_folders(core_args['court_dir'])
 
     logging.info(f'Document Scraper sequence terminated successfully')
+    logging.info(waits.court_stats(core_args['court']).summary())
 
 
 @click.command()
@@ -1602,6 +1778,17 @@ async def seq_document(core_args, new_dockets, document_input, document_att, ski
 @click.option('--case-limit','-cl', default=None,
                help='Sets limit on no. of cases to process, enter "false" for no limit')
 @click.option('--cost-limit', type=float, default=None)
+@click.option('--queue', 'queue_path', default=None,
+              help="A sqlite file to keep the work queue in, so that a run can be resumed (by running the same command again) and a court "+
+                    "can be split between scrapers run with the same queue. If not given, the queue is held in memory for this run only")
+@click.option('--queue-retry-failed', default=False, is_flag=True, show_default=True,
+              help="Put the cases that failed in an earlier run with the same --queue back in the queue")
+@click.option('--browser-max-pages', type=int, default=browser_pool.MAX_PAGES, show_default=True,
+              help="No. of pages each browser loads before it's replaced with a new one (0 for no limit)")
+@click.option('--ledger', 'ledger_path', default=None,
+              help="The sqlite file of the court's download ledger (default: download_ledger.db in the court folder), e.g. on a local disk if the court folder is on a network filesystem")
+@click.option('--ledger-rescan', default=False, is_flag=True, show_default=True,
+              help="Bring the download ledger into line with the court folder before scraping (after files have been added or removed by hand)")
 @click.option('--headless', '-h', default=False, is_flag=True,
                help='Runs selenium in headless mode if true')
 @click.option('--verbose', '-v', default=False, is_flag=True,
@@ -1628,6 +1815,9 @@ async def seq_document(core_args, new_dockets, document_input, document_att, ski
               help="Path to files to exclude (csv with a ucid column)")
 @click.option('--docket-update', default=False, show_default=True, is_flag=True,
               help="Check for new docket lines in existing cases")
+@click.option('--docket-http', default=False, show_default=True, is_flag=True,
+              help="Docket Scraper: request docket reports directly with the browser's login session, rather than through the browser's form "+
+                    "(falls back to the browser for any case that doesn't come back as a docket report)")
 
 # Summary Options
 @click.option('--summary-input', default=None,
@@ -1648,9 +1838,10 @@ async def seq_document(core_args, new_dockets, document_input, document_att, ski
                help="Document Scraper: Skip seen cases, ignore any cases where we have previously downloaded any documents")
 @click.option('--document-limit', default=DOCKET_ROW_DOCS_LIMIT, show_default=True,
                help="Document Scraper: skip cases that have more documents than document_limit")
-def scraper(inpath, mode, n_workers, court, case_type, auth_path, override_time, runtime_start, runtime_end, case_limit, cost_limit, headless, verbose, slabels,
+def scraper(inpath, mode, n_workers, court, case_type, auth_path, override_time, runtime_start, runtime_end, case_limit, cost_limit,
+         queue_path, queue_retry_failed, browser_max_pages, ledger_path, ledger_rescan, headless, verbose, slabels,
          query_conf, query_prefix,
-         docket_input, docket_mem_list, docket_exclusions, docket_update, docket_exclude_parties,
+         docket_input, docket_mem_list, docket_exclusions, docket_update, docket_exclude_parties, docket_http,
          summary_input,
          member_input,
          document_input, document_att, document_skip_seen, document_limit, document_all_docs):
@@ -1696,7 +1887,19 @@ def scraper(inpath, mode, n_workers, court, case_type, auth_path, override_time,
         'rts': runtime_start,
         'rte': runtime_end,
         'n_workers': n_workers,
-        'exclusions_path': Path(docket_exclusions).resolve() if docket_exclusions else None
+        'exclusions_path': Path(docket_exclusions).resolve() if docket_exclusions else None,
+        # The browsers for the docket, summary, member and document scrapers' workers
+        'pool': BrowserPool(court_dir, court, auth_path, headless, size=n_workers, max_pages=browser_max_pages),
+        # What has already been downloaded for the court, checked instead of the court folder
+        'ledger': DownloadLedger(court_dir, db_path=Path(ledger_path).resolve() if ledger_path else None)
+    }
+    if ledger_rescan:
+        logging.info(f"Download ledger rescanned: {core_args['ledger'].rescan()}")
+    logging.info(f"Download ledger ({core_args['ledger'].db_path}): {core_args['ledger'].counts()}")
+
+    queue_args = {
+        'queue_path': Path(queue_path).resolve() if queue_path else None,
+        'queue_retry_failed': queue_retry_failed
     }
 
     # Create the run schedule of which modules to run
@@ -1738,7 +1941,9 @@ def scraper(inpath, mode, n_workers, court, case_type, auth_path, override_time,
                 docket_input = docket_input,
                 docket_update = docket_update,
                 show_member_list = docket_mem_list,
-                exclude_parties = docket_exclude_parties
+                exclude_parties = docket_exclude_parties,
+                docket_http = docket_http,
+                **queue_args
             )
         )
 
@@ -1746,14 +1951,14 @@ def scraper(inpath, mode, n_workers, court, case_type, auth_path, override_time,
     if run_module['summary']:
         summary_input = Path(summary_input).resolve() if summary_input else None
         docket_results = asyncio.run(
-            seq_summary(core_args, summary_input = summary_input)
+            seq_summary(core_args, summary_input = summary_input, **queue_args)
         )
 
     # Member Scraper run sequence
     if run_module['member']:
         member_input = Path(member_input).resolve()
         docket_results = asyncio.run(
-            seq_member(core_args, member_input=member_input)
+            seq_member(core_args, member_input=member_input, **queue_args)
         )
 
     # Document Scraper run sequence
@@ -1763,8 +1968,10 @@ def scraper(inpath, mode, n_workers, court, case_type, auth_path, override_time,
         new_dockets = docket_results if run_module['docket'] else []
 
         asyncio.run(seq_document(core_args, new_dockets, document_input,
-                                document_att, document_skip_seen, document_limit, document_all_docs))
+                                document_att, document_skip_seen, document_limit, document_all_docs, **queue_args))
 
+    core_args['pool'].close()
+    logging.info(core_args['pool'].summary())
 
     term_time = stools.get_time_central(as_string=True)
     logging.info(f"\nScraping session terminated at {term_time}")
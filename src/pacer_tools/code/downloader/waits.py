@@ -0,0 +1,224 @@
+'''
+File: waits.py
+Description: Waiting on the browser for something to happen (a page to load, an element to appear, a download to finish)
+instead of sleeping for a fixed time, so that the scrapers move on as soon as PACER has responded.
+
+Every wait is timed and recorded against its court and kind (see KINDS) in a LatencyStats, which keeps a histogram of how
+long each kind of wait has taken. Once a court has enough recent samples for a kind of wait, the timeout for the next
+one is a multiple of the slowest of them (the 95th percentile), rather than the fixed default: a court that responds
+quickly gives up quickly on a page that isn't coming, and a slow court is given longer. A wait that times out counts as a
+sample of its full timeout, so timeouts grow again if a court slows down.
+'''
+
+import time
+import math
+import threading
+from pathlib import Path
+from collections import Counter, deque, defaultdict
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
+
+POLL = 0.1 # seconds between checks of a condition
+
+# The kinds of wait: (the timeout used until a court has MIN_SAMPLES of them, the least and the most it can become)
+KINDS = {
+    'page': (30, 5, 120),           # a page to finish loading
+    'element': (10, 2, 60),         # an element of a page that has loaded
+    'lookup': (5, 2, 30),           # the case number lookup on a form
+    'submit': (60, 15, 180),        # the page after a form is submitted (e.g. a docket report, which can be large)
+    'longtime': (80, 30, 600),      # a docket report after the "may take a long time" page
+    'download': (30, 10, 300),      # a document download to finish
+}
+MIN_SAMPLES = 20 # no. of recent samples before a court's timeouts are based on them
+RECENT = 200 # no. of recent samples kept for each kind, for the timeout
+TIMEOUT_FACTOR = 3 # the timeout is this multiple of the 95th percentile of the recent samples
+
+# Upper bounds (seconds) of the histogram buckets
+BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120, math.inf)
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def bucket_label(upper):
+    ''' The label of a histogram bucket, e.g. '<=0.5s' (or '>120s' for the last one) '''
+    return f"<={upper:g}s" if upper != math.inf else f">{BUCKETS[-2]:g}s"
+
+
+class LatencyStats:
+    ''' How long each kind of wait has taken for one court (shared by all of a process's scrapers for that court) '''
+
+    def __init__(self, court):
+        self.court = court
+        self._lock = threading.Lock()
+        self.recent = defaultdict(lambda: deque(maxlen=RECENT))
+        self.buckets = defaultdict(Counter)
+        self.timeouts = Counter()
+
+    def __repr__(self):
+        return f"<LatencyStats: {self.court}>"
+
+    def observe(self, kind, seconds, timed_out=False):
+        ''' Record how long a wait took '''
+        upper = next(upper for upper in BUCKETS if seconds <= upper)
+        with self._lock:
+            self.recent[kind].append(seconds)
+            self.buckets[kind][upper] += 1
+            if timed_out:
+                self.timeouts[kind] += 1
+
+    def quantile(self, kind, q=0.95):
+        ''' A quantile of the recent samples of a kind of wait (None if there are none) '''
+        with self._lock:
+            samples = sorted(self.recent[kind])
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def timeout(self, kind):
+        ''' The timeout for the next wait of a kind (see the module docstring) '''
+        default, least, most = KINDS[kind]
+        if len(self.recent[kind]) < MIN_SAMPLES:
+            return default
+        return min(most, max(least, TIMEOUT_FACTOR * self.quantile(kind)))
+
+    def histogram(self):
+        ''' The no. of waits of each kind in each bucket, as {kind: {bucket label: count}} '''
+        with self._lock:
+            return {kind: {bucket_label(upper): counts[upper] for upper in BUCKETS if counts[upper]}
+                    for kind, counts in self.buckets.items()}
+
+    def summary(self):
+        ''' A line per kind of wait: the no. of waits, the median and 95th percentile, timeouts and the histogram '''
+        lines = [f"Latency ({self.court}):"]
+        for kind, hist in self.histogram().items():
+            n = sum(hist.values())
+            lines.append(f"  {kind}: n={n:,}, p50={self.quantile(kind, 0.5):.2f}s, p95={self.quantile(kind):.2f}s, "
+                f"timeouts={self.timeouts[kind]:,}, next timeout={self.timeout(kind):.1f}s | " +
+                ' '.join(f"{label}:{count}" for label, count in hist.items()))
+        return '\n'.join(lines)
+
+
+def court_stats(court):
+    ''' The LatencyStats for a court (None for an unknown court gives stats that are shared by all such waits) '''
+    with _stats_lock:
+        if court not in _stats:
+            _stats[court] = LatencyStats(court)
+        return _stats[court]
+
+
+def wait_for(browser, condition, court=None, kind='element', timeout=None):
+    '''
+    Wait for a condition, recording how long it took
+    Inputs:
+        - browser: the selenium browser
+        - condition (function): takes the browser and returns something truthy once it's met (e.g. an expected_condition)
+        - court (str): court abbreviation, for the latency stats and the timeout
+        - kind (str): the kind of wait (one of KINDS)
+        - timeout (float): overrides the court's timeout for this kind of wait (a wait with its own timeout that times out
+            isn't recorded, e.g. a short check for something that usually doesn't happen)
+    Output:
+        what condition returned, or None if it wasn't met before the timeout
+    '''
+    stats = court_stats(court)
+    own_timeout = timeout is not None
+    timeout = timeout or stats.timeout(kind)
+    start = time.perf_counter()
+    try:
+        result = WebDriverWait(browser, timeout, poll_frequency=POLL,
+            ignored_exceptions=(NoSuchElementException, StaleElementReferenceException, IndexError)).until(condition)
+    except TimeoutException:
+        if not own_timeout:
+            stats.observe(kind, time.perf_counter() - start, timed_out=True)
+        return None
+    stats.observe(kind, time.perf_counter() - start)
+    return result
+
+
+def get(browser, url, court=None):
+    ''' browser.get (which returns once the page has loaded), recording how long it took '''
+    start = time.perf_counter()
+    browser.get(url)
+    court_stats(court).observe('page', time.perf_counter() - start)
+
+
+###
+# Conditions
+###
+
+def element_present(selector):
+    ''' An element is on the page (selector can be a CSS selector or a list of them, any of which will do) '''
+    selectors = selector if type(selector) is list else [selector]
+    return EC.any_of(*(EC.presence_of_element_located((By.CSS_SELECTOR, sel)) for sel in selectors))
+
+
+def element_enabled(selector):
+    ''' An element is on the page, displayed and enabled (e.g. a form button once its case lookup has run) '''
+    return EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
+
+
+def page_root(browser):
+    ''' The root element of the current page, to pass to new_page before doing something that loads another one '''
+    return browser.find_element(By.TAG_NAME, 'html')
+
+
+def new_page(old_root, selector='#cmecfMainContent'):
+    ''' The page whose root was old_root has been replaced, and the new page has an element matching selector '''
+    present = EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+    def condition(browser):
+        return EC.staleness_of(old_root)(browser) and present(browser)
+    return condition
+
+
+def page_ready():
+    ''' The current page has finished loading '''
+    return lambda browser: browser.execute_script('return document.readyState') == 'complete'
+
+
+def last_table_heading(text):
+    ''' The heading of the last table on the page is text (e.g. the transaction receipt at the end of a docket report) '''
+    def condition(browser):
+        table = browser.find_elements(By.CSS_SELECTOR, 'table')[-1]
+        return table if table.find_element(By.CSS_SELECTOR, 'tr th').text == text else False
+    return condition
+
+
+###
+# Downloads
+###
+
+def finished_download(dir, since):
+    '''
+    The most recent file in a download directory that was created after since and has finished downloading (it's
+    non-empty and the browser's partial file for it has gone)
+    Inputs:
+        - dir (str or Path): the download directory
+        - since (float): a time.time() timestamp
+    Output:
+        Path, or None
+    '''
+    files = [fpath for fpath in Path(dir).iterdir() if fpath.is_file()]
+    partial = {fpath.with_suffix('') for fpath in files if fpath.suffix == '.part'}
+    candidates = [fpath for fpath in files if fpath.suffix != '.part' and fpath not in partial and fpath.lstat().st_ctime >= since]
+    if not candidates:
+        return None
+    candidate = max(candidates, key=lambda fpath: fpath.lstat().st_ctime)
+    return candidate if candidate.lstat().st_size > 0 else None
+
+
+def wait_for_download(dir, since, court=None, timeout=None):
+    '''
+    Wait for a download to finish in a download directory, recording how long it took
+    Inputs:
+        - dir (str or Path): the download directory
+        - since (float): a time.time() timestamp from before the download was started
+        - court (str): court abbreviation, for the latency stats and the timeout
+        - timeout (float): overrides the court's download timeout
+    Output:
+        Path of the downloaded file, or None if it hadn't finished before the timeout
+    '''
+    # (selenium's wait just calls the condition with whatever it's given, here the directory rather than a browser)
+    return wait_for(dir, lambda dir: finished_download(dir, since), court=court, kind='download', timeout=timeout)
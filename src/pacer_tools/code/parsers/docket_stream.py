@@ -0,0 +1,153 @@
+'''
+File: docket_stream.py
+Description: Bounded-memory reading of very long docket htmls (MDL lead cases, long criminal dockets) for parse_pacer.py
+
+Rather than reading the whole file into a string and building a tree of the whole page, the file is read in chunks and
+split into the part before the docket table (the header, member list and party tables), the docket table itself and the
+part after it (the transaction receipt and scraper stamp). Only the parts before and after the table are kept as text;
+the rows of the docket table are parsed straight from the file with an lxml pull parser, one <tr> at a time, and each
+row is discarded once it has been handed over (see parse_pacer.parse_docket_stream).
+'''
+
+import re
+
+import lxml.html
+from lxml import etree
+
+from support import fhandle_tools as ftools
+
+CHUNK_SIZE = 1 << 20 # no. of characters read from the file at a time
+DOCKET_HEADING = 'Docket Text' # (the same marker parse_pacer.process_html_file splits the header off on)
+BACKWARDS_MARKER = 'BACKWARDS_DOCKET'
+CARRY = 32 # no. of characters carried over between chunks, so that markers split across chunks are still found
+
+
+class StreamedDocket:
+    ''' A docket html split around its docket table, with the table's rows available as a stream '''
+
+    def __init__(self, fpath, encoding, head, table_prefix, tail, table_start, table_end, backwards, chunk_size=CHUNK_SIZE):
+        '''
+        Inputs:
+            - fpath (Path): the docket html
+            - encoding (str): the encoding the file was read with
+            - head (str): the text before the docket table
+            - table_prefix (str): the text from the start of the docket table up to its 'Docket Text' heading
+                (so head + table_prefix is the same as html_text.split('Docket Text')[0])
+            - tail (str): the text after the end of the docket table
+            - table_start, table_end (int): the character offsets of the docket table in the file
+            - backwards (bool): whether the file is marked as a backwards docket
+            - chunk_size (int): no. of characters to read at a time
+        '''
+        self.fpath = fpath
+        self.encoding = encoding
+        self.head = head
+        self.table_prefix = table_prefix
+        self.tail = tail
+        self.table_start = table_start
+        self.table_end = table_end
+        self.backwards = backwards
+        self.chunk_size = chunk_size
+
+    def rows(self):
+        '''
+        Stream the <tr> elements of the docket table, in document order (including the heading row), re-reading the file.
+        Each row is cleared and dropped from the tree once the next one is asked for, so hold on to anything needed from it
+        Output:
+            (generator) of lxml elements
+        '''
+        parser = etree.HTMLPullParser(events=('end',), tag='tr', encoding='utf-8')
+        parser.set_element_class_lookup(lxml.html.HtmlElementClassLookup()) # (so the rows work with the lxml_backend helpers)
+
+        def _drain():
+            for _, tr in parser.read_events():
+                yield tr
+                tr.clear()
+                while tr.getprevious() is not None:
+                    del tr.getparent()[0]
+
+        with open(self.fpath, 'r', encoding=self.encoding) as rfile:
+            pos = 0
+            while pos < self.table_end:
+                chunk = rfile.read(self.chunk_size)
+                if not chunk:
+                    break
+                lo, hi = max(self.table_start - pos, 0), min(self.table_end - pos, len(chunk))
+                pos += len(chunk)
+                if lo < hi:
+                    parser.feed(chunk[lo:hi].encode('utf-8'))
+                    yield from _drain()
+        parser.close()
+        yield from _drain()
+
+
+def _is_docket_heading(table_prefix):
+    ''' Whether the start of a table is the 'Date Filed | # | Docket Text' heading of a docket table '''
+    return ' '.join(re.sub(r'<[^>]*>', ' ', table_prefix).split()).lower().startswith('date filed')
+
+
+def _split(fpath, encoding, chunk_size):
+    with open(fpath, 'r', encoding=encoding) as rfile:
+        # Read up to the docket table's heading, keeping everything
+        buffer = ''
+        while True:
+            chunk = rfile.read(chunk_size)
+            if not chunk:
+                return None
+            search_from = max(0, len(buffer) - len(DOCKET_HEADING) + 1)
+            buffer += chunk
+            heading = buffer.find(DOCKET_HEADING, search_from)
+            if heading != -1:
+                break
+
+        table_start = buffer.lower().rfind('<table', 0, heading)
+        if table_start == -1 or not _is_docket_heading(buffer[table_start:heading]):
+            return None
+        head, table_prefix = buffer[:table_start], buffer[table_start:heading]
+        backwards = BACKWARDS_MARKER in head
+
+        # Scan through the docket table for its end, only keeping a few characters between chunks
+        window, window_start = buffer[heading:], heading
+        del buffer
+        while True:
+            low = window.lower()
+            close = low.find('</table')
+            close_end = low.find('>', close) if close != -1 else -1
+            if '<table' in (low[:close] if close != -1 else low):
+                return None # a table nested in the docket table, leave this file to the full parse
+            if close_end != -1:
+                break
+            backwards = backwards or BACKWARDS_MARKER in window
+            chunk = rfile.read(chunk_size)
+            if not chunk:
+                return None
+            carry = window[-CARRY:]
+            window_start += len(window) - len(carry)
+            window = carry + chunk
+
+        backwards = backwards or BACKWARDS_MARKER in window[:close_end+1]
+        table_end = window_start + close_end + 1
+        tail = window[close_end+1:] + rfile.read()
+        backwards = backwards or BACKWARDS_MARKER in tail
+        if DOCKET_HEADING in tail:
+            return None # more than one docket table, leave this file to the full parse
+
+    return StreamedDocket(fpath, encoding, head, table_prefix, tail, table_start, table_end, backwards, chunk_size)
+
+
+def split_docket_file(fpath, chunk_size=CHUNK_SIZE):
+    '''
+    Split a docket html around its docket table without reading the table into memory
+    Inputs:
+        - fpath (Path): the docket html
+        - chunk_size (int): no. of characters to read at a time
+    Output:
+        (StreamedDocket) or None if the file has no docket table that can be streamed (no 'Docket Text' heading, a table
+        nested inside the docket table, etc.), in which case it should just be parsed in full
+    '''
+    # Same encoding fallback as process_html_file
+    for encoding in ftools.HTML_ENCODINGS:
+        try:
+            return _split(fpath, encoding, chunk_size)
+        except UnicodeDecodeError:
+            continue
+    return None
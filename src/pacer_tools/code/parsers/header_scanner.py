@@ -0,0 +1,138 @@
+'''
+File: header_scanner.py
+Description: Anchored extraction of the docket header fields for parse_pacer.py
+
+Several of the header regexes can't use a literal prefix, so re.search retries them at every '>', ')', '<br>' etc.
+in the header (which includes the party tables), with a lot of backtracking each time. Every one of those fields
+hangs off a literal label though ('Cases:', 'Case in other court', 'DOCKET FOR CASE', 'error'...), so the scanner
+finds the labels with plain substring searches and only tries each field's regex at the few positions where a match
+could start relative to one of them. Every field keeps its original regex, so the scanner returns exactly the match
+that regex.search(header) would, and HeaderScanner.verify checks this against the per-field searches
+(see tasks/verify_header_scanner.py).
+'''
+
+import heapq
+
+
+class HeaderField:
+    ''' A header field, the regex that extracts it, and the label(s) that any match of that regex must contain '''
+
+    def __init__(self, name, pattern, anchors=None, back=(0,0), start_chars=None, mode='window', ignore_case=False):
+        '''
+        Inputs:
+            - name (str): the field name
+            - pattern (compiled regex): the regex for the field (what re.search would be called with)
+            - anchors (list of str): literal labels, at least one of which every match of pattern contains (if None,
+                the field is found with a plain pattern.search, which is already fast for regexes that start with a literal)
+            - back (tuple of int): (min, max) distance from the start of a match back from the start of the anchor it contains
+            - start_chars (str): if given, a match can only start on one of these characters
+            - mode (str): how to use the anchors:
+                'window': try pattern.match at each position that is within `back` of an anchor
+                'gate': only run pattern.search if one of the anchors is present at all
+                'endpos': the match ends with an anchor, so search up to each anchor in turn
+            - ignore_case (bool): whether the anchors should be matched case-insensitively (they should be given in lower case)
+        '''
+        self.name = name
+        self.pattern = pattern
+        self.anchors = anchors
+        self.back = back
+        self.start_chars = start_chars
+        self.mode = mode
+        self.ignore_case = ignore_case
+
+
+class HeaderScanner:
+    ''' Extracts all of the header fields from the header of a docket, using the labels in the header to anchor each field's regex '''
+
+    def __init__(self, fields):
+        '''
+        Inputs:
+            - fields (list of HeaderField)
+        '''
+        self.fields = fields
+
+    @staticmethod
+    def _find_all(text, anchor):
+        ''' The (ascending) start positions of all occurrences of an anchor in the text '''
+        positions = []
+        pos = text.find(anchor)
+        while pos != -1:
+            positions.append(pos)
+            pos = text.find(anchor, pos + 1)
+        return positions
+
+    def _anchor_starts(self, field, text, cache):
+        ''' The sorted start positions of all of a field's anchors, or None if they can't be found by substring search '''
+        if field.ignore_case:
+            # Lower-casing is only position-preserving (and only agrees with re.IGNORECASE) for ascii text
+            if not text.isascii():
+                return None
+            if 'lower' not in cache:
+                cache['lower'] = text.lower()
+            haystack, key = cache['lower'], 'lower:'
+        else:
+            haystack, key = text, ''
+
+        for anchor in field.anchors:
+            if key+anchor not in cache:
+                cache[key+anchor] = self._find_all(haystack, anchor)
+        return list(heapq.merge(*(cache[key+anchor] for anchor in field.anchors)))
+
+    def _match_field(self, field, text, cache):
+        if field.anchors is None:
+            return field.pattern.search(text)
+
+        anchor_starts = self._anchor_starts(field, text, cache)
+        if anchor_starts is None:
+            return field.pattern.search(text)
+        elif not anchor_starts:
+            return None
+
+        if field.mode == 'gate':
+            return field.pattern.search(text)
+
+        elif field.mode == 'endpos':
+            anchor_len = len(field.anchors[0])
+            for pos in anchor_starts:
+                match = field.pattern.search(text, 0, pos + anchor_len)
+                if match:
+                    return match
+            return None
+
+        # Windowed mode: try each candidate start in ascending order, so that the first match found is the leftmost
+        tried_upto = -1
+        back_min, back_max = field.back
+        for pos in anchor_starts:
+            for start in range(max(pos - back_max, tried_upto + 1, 0), pos - back_min + 1):
+                if field.start_chars and text[start] not in field.start_chars:
+                    continue
+                match = field.pattern.match(text, start)
+                if match:
+                    return match
+            tried_upto = max(tried_upto, pos - back_min)
+        return None
+
+    def scan(self, text):
+        '''
+        Extract all of the header fields
+        Inputs:
+            - text (str): the non-docket part of the docket html
+        Output:
+            (dict) of field name -> match object (or None), the same as field.pattern.search(text) for each field
+        '''
+        cache = {} # anchor positions, shared between fields
+        return {field.name: self._match_field(field, text, cache) for field in self.fields}
+
+    def verify(self, text):
+        '''
+        Check the scanner against running each field's regex over the whole text
+        Output:
+            (list) the names of any fields where the scanner disagrees with the field's regex
+        '''
+        scanned = self.scan(text)
+        mismatches = []
+        for field in self.fields:
+            expected, found = field.pattern.search(text), scanned[field.name]
+            if (expected and expected.span()) != (found and found.span()):
+                mismatches.append(field.name)
+        return mismatches
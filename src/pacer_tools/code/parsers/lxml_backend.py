@@ -0,0 +1,170 @@
+'''
+File: lxml_backend.py
+Description: lxml-based tree helpers for parse_pacer.py (an alternative to building a full BeautifulSoup tree for each docket)
+
+The helpers here mirror the bs4 calls made by the parser (soup.select, tag.text, str(tag)...), so that the
+lxml backend produces the same JSON as the bs4 backend. Use tasks/compare_parser_backends.py to check that on a golden corpus.
+'''
+
+import re
+import lxml.html
+from lxml import etree
+
+HTML_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+# Elements that bs4 writes out as self-closing (e.g. '<br/>')
+VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem', 'meta', 'param',
+    'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex', 'nextid', 'spacer'
+}
+# Attributes that bs4 treats as whitespace-separated lists (and so normalises the whitespace of on output)
+LIST_ATTRIBUTES = {
+    '*': {'class', 'accesskey', 'dropzone'},
+    'a': {'rel', 'rev'},
+    'link': {'rel', 'rev'},
+    'td': {'headers'},
+    'th': {'headers'},
+    'form': {'accept-charset'},
+    'object': {'archive'},
+    'area': {'rel'},
+    'icon': {'sizes'},
+    'iframe': {'sandbox'},
+    'output': {'for'},
+}
+
+
+def build_tree(html_text):
+    '''
+    Build an lxml tree from the text of a docket html (the equivalent of bs(html_text, 'html.parser'))
+    Inputs:
+        - html_text (str): the html text for the page
+    Output:
+        (lxml.html.HtmlElement) the root of the document
+    '''
+    # Parse from bytes so that any encoding declaration in the page doesn't trip up lxml
+    return lxml.html.document_fromstring(html_text.encode('utf-8'), parser=HTML_PARSER)
+
+
+def text(el):
+    ''' The text of an element, including all of its descendants (the equivalent of bs4's tag.text) '''
+    return el.text_content()
+
+
+def string(el):
+    '''
+    The equivalent of bs4's tag.string: the text of an element if it only contains text, otherwise
+    the .string of its only child (and None if it has more than one child)
+    '''
+    children = list(el)
+    if not children:
+        return el.text
+    elif len(children) == 1 and not el.text and not children[0].tail:
+        return children[0].text if children[0].tag is etree.Comment else string(children[0])
+    else:
+        return None
+
+
+def _escape(value):
+    ''' Minimal entity substitution, as done by bs4's 'minimal' formatter '''
+    return value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _quote_attribute(value):
+    ''' Quote an attribute value the same way bs4 does '''
+    value = _escape(value)
+    if '"' in value:
+        if "'" in value:
+            return '"' + value.replace('"', '&quot;') + '"'
+        return "'" + value + "'"
+    return '"' + value + '"'
+
+
+def _serialize(el, out):
+    if el.tag is etree.Comment:
+        out.append(f"<!--{el.text or ''}-->")
+    elif isinstance(el.tag, str):
+        list_attributes = LIST_ATTRIBUTES['*'] | LIST_ATTRIBUTES.get(el.tag, set())
+        attrs = ''
+        for key, value in el.attrib.items():
+            if key in list_attributes:
+                value = ' '.join(value.split())
+            attrs += f" {key}={_quote_attribute(value)}"
+
+        if el.tag in VOID_ELEMENTS:
+            out.append(f"<{el.tag}{attrs}/>")
+        else:
+            out.append(f"<{el.tag}{attrs}>")
+            if el.text:
+                out.append(_escape(el.text))
+            for child in el:
+                _serialize(child, out)
+                if child.tail:
+                    out.append(_escape(child.tail))
+            out.append(f"</{el.tag}>")
+
+
+def to_string(el):
+    ''' Serialize an element (without its tail) the same way bs4's str(tag) does '''
+    out = []
+    _serialize(el, out)
+    return ''.join(out)
+
+
+def select_party_tables(root):
+    ''' The equivalent of soup.select('div > table[cellspacing="5"]'), as serialized strings '''
+    return [to_string(table) for table in root.xpath('//div/table[@cellspacing="5"]')]
+
+
+def has_no_docket_header(root, re_no_docket):
+    ''' Whether any h2 in the page matches the 'no docket' language (see ftools.re_no_docket) '''
+    return any(re.search(re_no_docket, text(h2)) for h2 in root.iter('h2'))
+
+
+def identify_docket_table(root, re_no_docket):
+    '''
+    Identify which table in a docket report is the docket sheet table (see dei.identify_docket_table)
+    Inputs:
+        - root (lxml.html.HtmlElement): the root of the docket sheet html
+        - re_no_docket (str): the pattern for the 'no docket' language
+    Output:
+        (lxml.html.HtmlElement) The docket table, or None if no docket found
+    '''
+    if has_no_docket_header(root, re_no_docket):
+        return None
+
+    # Iterate in reverse over all tables
+    for table in reversed(list(root.iter('table'))):
+        first_cell = next(iter(table.xpath('.//*[self::td or self::th]')), None)
+
+        # Catch for if table has no cells
+        if first_cell is None:
+            continue
+        elif text(first_cell).lower().strip() == 'date filed':
+            return table
+
+
+def second_column_cells(table):
+    '''
+    The equivalent of table.select('tr td:nth-of-type(2)'): every td inside a tr in the table that is the second td of its parent
+    (done by walking the tree, since the XPath version of this, './/tr//td[2]', is quadratic in libxml2 on long dockets)
+    '''
+    cells = []
+    for td in table.iter('td'):
+        parent = td.getparent()
+        if [child for child in parent if child.tag=='td'][1:2] != [td]:
+            continue
+        # Check the td is inside a tr that is itself inside the table
+        for ancestor in td.iterancestors():
+            if ancestor is table:
+                break
+            elif ancestor.tag == 'tr':
+                cells.append(td)
+                break
+    return cells
+
+
+def set_string(el, value):
+    ''' The equivalent of bs4's tag.string = value (replaces all of the element's contents with a single string) '''
+    for child in list(el):
+        el.remove(child) # (the child's tail goes with it, which is what we want since the tail is inside el)
+    el.text = value
@@ -0,0 +1,173 @@
+'''
+File: metadata_scan.py
+Description: Case-level metadata straight from docket htmls, for jobs that don't need the parties or the docket itself
+(e.g. building the unique filepaths table, or finding the latest docket date before a docket update)
+
+Only the head of the file (up to the docket table's 'Docket Text' heading) and its tail (the last docket rows, the
+transaction receipt and the scraper stamp) are read, and nothing is built into a tree: the header fields come from the
+same header scan parse_pacer.py uses (parse_pacer.parse_header_fields) and the receipt and stamp from the same helpers,
+so every field matches what a full parse would give. The latest docket date is the latest of the dates of the first and
+last rows of the docket table (dockets are in date order, forwards or backwards).
+'''
+
+import os
+import re
+from pathlib import Path
+
+from support import data_tools as dtools
+from support import fhandle_tools as ftools
+from parsers import parse_pacer
+
+HEAD_CHUNK = 1 << 16 # no. of bytes read at a time from the start of the file, looking for the docket table
+TAIL_BYTES = 1 << 15 # no. of bytes read from the end of the file
+DOCKET_HEADING = b'Docket Text'
+re_row_date = re.compile(r'<tr[^>]*>\s*<td[^>]*>\s*(\d{2})/(\d{2})/(\d{4})\s*<')
+re_update_suffix = re.compile(r'_\d+$')
+re_receipt = re.compile(r'Transaction Receipt', re.I)
+
+
+def _decode(*parts):
+    ''' Decode byte strings with the first of ftools.HTML_ENCODINGS that works for all of them (newlines normalised as in ftools.read_html_text) '''
+    for i, encoding in enumerate(ftools.HTML_ENCODINGS):
+        try:
+            texts = [part.decode(encoding) for part in parts]
+            break
+        except UnicodeDecodeError:
+            if i == len(ftools.HTML_ENCODINGS) - 1:
+                raise
+    return [text.replace('\r\n', '\n').replace('\r', '\n') if '\r' in text else text for text in texts], encoding
+
+
+def read_head_and_tail(fpath, head_chunk=HEAD_CHUNK, tail_bytes=TAIL_BYTES):
+    '''
+    Read the parts of a docket html around its docket table, without reading the table itself (unless the file is small)
+    Inputs:
+        - fpath (str or Path): the docket html
+        - head_chunk (int): no. of bytes to read at a time from the start of the file
+        - tail_bytes (int): no. of bytes to read from the end of the file
+    Output:
+        head (str): the text before the 'Docket Text' heading (the whole file if there's no docket table)
+        rows (str): the text after the heading that was read along with the head (the first rows of the docket table)
+        tail (str): the end of the file (empty if it was all read as part of head/rows)
+        encoding (str): the encoding the text was decoded with
+    '''
+    with open(fpath, 'rb') as rfile:
+        size = os.fstat(rfile.fileno()).st_size
+        data, heading = b'', -1
+        while heading == -1:
+            chunk = rfile.read(head_chunk)
+            if not chunk:
+                break
+            search_from = max(0, len(data) - len(DOCKET_HEADING) + 1)
+            data += chunk
+            heading = data.find(DOCKET_HEADING, search_from)
+
+        if heading == -1:
+            tail_data = b''
+        elif size - len(data) <= tail_bytes:
+            data, tail_data = data + rfile.read(), b''
+        else:
+            rfile.seek(size - tail_bytes)
+            tail_data = rfile.read().lstrip(bytes(range(0x80, 0xc0))) # (skip the rest of any utf-8 character cut in two)
+
+    if heading == -1:
+        (head,), encoding = _decode(data)
+        return head, '', '', encoding
+    (head, rows, tail), encoding = _decode(data[:heading], data[heading:], tail_data)
+    return head, rows, tail, encoding
+
+
+def latest_row_date(*texts):
+    ''' The latest docket row date found in some stretches of a docket table, as MM/DD/YYYY (or None) '''
+    dates = [(y, m, d) for text in texts for m, d, y in re_row_date.findall(text.split('Transaction Receipt')[0])]
+    if not dates:
+        return None
+    y, m, d = max(dates)
+    return f"{m}/{d}/{y}"
+
+
+def scan_docket_file(fpath, court=None):
+    '''
+    Get the case-level metadata of a single docket html from its header, transaction receipt and scraper stamp
+    Inputs:
+        - fpath (str or Path): the docket html (the data directory layout, court/html/year/file.html, is assumed
+            if court isn't given)
+        - court (str): court abbreviation, if none infers from filepath
+    Output:
+        (dict) with the case_id, case_type, court and ucid, the header fields (as in parse_pacer.parse_header_fields),
+        case_name, mdl_code, mdl_id_source, is_mdl, is_multi, billable_pages, cost, download_timestamp, html_encoding,
+        download_url, case_pacer_id, is_stub, is_private, scraper_labels, docket_available and latest_docket_date
+    '''
+    fpath = Path(fpath)
+    head, rows, tail, encoding = read_head_and_tail(fpath)
+
+    case_data = {}
+    case_data['case_id'] = ftools.colonize(re_update_suffix.sub('', fpath.stem))
+    case_data['case_type'] = ftools.decompose_caseno(case_data['case_id']).get('case_type')
+    case_data['court'] = court or fpath.parents[2].name
+    case_data['ucid'] = dtools.ucid(case_data['court'], case_data['case_id'])
+    case_data.update(parse_pacer.parse_header_fields(head, case_data['case_type']))
+
+    title_regex = parse_pacer.re_cr_title.search(head) if case_data['case_type'] == 'cr' else parse_pacer.re_cv_title.search(head)
+    case_data['case_name'] = dtools.line_cleaner(parse_pacer.generic_re_existence_helper(title_regex, 'Case title: ', -1))
+
+    case_data['mdl_code'], case_data['mdl_id_source'] = parse_pacer.get_mdl_code(case_data)
+    case_data['is_mdl'] = bool(case_data['mdl_code']) or any(f.lower().startswith('mdl') for f in case_data['case_flags'])
+    member_cases_found = bool(ftools.get_member_list_span(head)[0])
+    case_data['is_multi'] = any( (case_data['is_mdl'], case_data['lead_case_id'], member_cases_found, case_data['other_courts']) )
+
+    end_text = tail or rows or head
+    receipt = re_receipt.search(end_text) # (only the receipt onwards needs its tags scrubbed)
+    transaction_data = ftools.parse_transaction_history(end_text[receipt.start():] if receipt else end_text)
+    case_data['billable_pages'] = int(transaction_data['billable_pages']) if 'billable_pages' in transaction_data else None
+    case_data['cost'] = float(transaction_data['cost']) if 'cost' in transaction_data else None
+    case_data['download_timestamp'] = transaction_data.get('timestamp')
+    case_data['html_encoding'] = encoding
+
+    stamp_data = dtools.parse_stamp(end_text)
+    case_data['download_url'] = stamp_data.get('download_url')
+    case_data['case_pacer_id'] = stamp_data.get('pacer_id')
+    slabels = stamp_data.get('slabels','').split(',')
+    case_data['is_stub'] = 'stub' in slabels
+    case_data['is_private'] = 'private' in slabels
+    case_data['scraper_labels'] = slabels
+
+    case_data['docket_available'] = bool(rows)
+    case_data['latest_docket_date'] = latest_row_date(rows, tail) if rows else None
+    return case_data
+
+
+def scan_case(case, court=None):
+    '''
+    Get the case-level metadata of a case from its docket htmls (the original docket and any updates)
+    Inputs:
+        - case (dict): a case as grouped by dtools.iter_case_groups/group_dockets, with 'docket_paths' in chronological order
+        - court (str): court abbreviation, if none infers from filepath
+    Output:
+        (dict) as for scan_docket_file, with the header, receipt and stamp fields from the newest docket (as in a full parse
+        of the aggregated docket), latest_docket_date across all of them and n_docket_reports
+    '''
+    scans = [scan_docket_file(fpath, court=court) for fpath in case['docket_paths']]
+    case_data = scans[-1]
+    case_data['case_id'] = scans[0]['case_id']
+    case_data['ucid'] = scans[0]['ucid']
+    case_data['docket_available'] = any(scan['docket_available'] for scan in scans)
+    case_data['html_encoding'] = ','.join(dict.fromkeys(scan['html_encoding'] for scan in scans))
+    dates = [scan['latest_docket_date'] for scan in scans if scan['latest_docket_date']]
+    case_data['latest_docket_date'] = max(dates, key=lambda date: (date[6:], date[:5])) if dates else None
+    case_data['n_docket_reports'] = len(case['docket_paths'])
+    return case_data
+
+
+def scan_court(html_dir, court=None, use_ucids=None):
+    '''
+    Scan every case in a court's html directory
+    Inputs:
+        - html_dir (str or Path): the court's html directory
+        - court (str): court abbreviation, if none infers from filepath
+        - use_ucids (list-like): only scan these cases
+    Output:
+        a generator of scan_case dicts
+    '''
+    for case in dtools.iter_case_groups(html_dir, court=court, use_ucids=use_ucids):
+        yield scan_case(case, court=court)
@@ -0,0 +1,131 @@
+'''
+File: parse_journal.py
+Description: A SQLite journal of a parse_pacer.py run, recording the outcome of every case (parsed, skipped or failed, with
+the exception type) and which courts the run has finished, so that an interrupted run (e.g. an all-courts run) can be
+picked up where it stopped (--resume) and the failures of a run can be reparsed on their own (--retry-failed)
+'''
+
+import sys
+import threading
+from pathlib import Path
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from support import sqlite_tools
+
+JOURNAL_FNAME = 'parse_journal.db'
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS cases (
+        ucid TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        error_type TEXT,
+        error TEXT,
+        attempts INTEGER NOT NULL DEFAULT 1,
+        updated_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS run (
+        court TEXT PRIMARY KEY,
+        started_at TEXT NOT NULL,
+        finished_at TEXT
+    );
+'''
+
+UPSERT_CASE = '''
+    INSERT INTO cases (ucid, status, error_type, error, updated_at) VALUES (?,?,?,?,?)
+    ON CONFLICT (ucid) DO UPDATE SET
+        status = excluded.status,
+        error_type = excluded.error_type,
+        error = excluded.error,
+        attempts = attempts + 1,
+        updated_at = excluded.updated_at
+'''
+
+PARSED, SKIPPED, FAILED = 'parsed', 'skipped', 'failed'
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class ParseJournal:
+    '''
+    The outcome of each case in the current (or last) parse run, and the courts it has started and finished.
+    Safe to share between threads (each thread gets its own connection) and to pass to worker processes.
+    '''
+    def __init__(self, db_path):
+        '''
+        Inputs:
+            - db_path (str or Path): the sqlite file for the journal (by default in the output directory of the run, i.e. the
+                parent of the court directories for an all-courts run, or see --journal)
+        '''
+        self.db_path = str(db_path)
+        self._local = threading.local()
+
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def __getstate__(self):
+        return {'db_path': self.db_path}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _connect(self):
+        return sqlite_tools.connect(self.db_path)
+
+    @property
+    def conn(self):
+        ''' The connection for the current thread '''
+        if getattr(self._local, 'conn', None) is None:
+            self._local.conn = self._connect()
+        return self._local.conn
+
+    def reset(self):
+        ''' Clear the journal of the previous run, at the start of a new one (i.e. one that isn't resuming or retrying failures) '''
+        with self.conn:
+            self.conn.execute('DELETE FROM cases')
+            self.conn.execute('DELETE FROM run')
+
+    def start(self, court):
+        ''' Mark the start of the run over a court '''
+        with self.conn:
+            self.conn.execute('INSERT INTO run (court, started_at) VALUES (?,?) ON CONFLICT (court) DO UPDATE SET finished_at=NULL',
+                (court, _now()))
+
+    def finish(self, court):
+        ''' Mark the run over a court as having got to the end of its cases '''
+        with self.conn:
+            self.conn.execute('UPDATE run SET finished_at=? WHERE court=?', (_now(), court))
+
+    def is_finished(self, court):
+        ''' Whether the run has got to the end of a court's cases '''
+        row = self.conn.execute('SELECT finished_at FROM run WHERE court=?', (court,)).fetchone()
+        return bool(row and row[0])
+
+    def record(self, ucid, status, error=None, error_type=None):
+        '''
+        Record the outcome of a case
+        Inputs:
+            - ucid (str): the case's ucid
+            - status (str): PARSED, SKIPPED or FAILED
+            - error (Exception or str): for failures, the exception raised (or a description, if nothing was raised)
+            - error_type (str): for failures, the kind of error (defaults to the exception's class name)
+        '''
+        if error_type is None and isinstance(error, BaseException):
+            error_type = type(error).__name__
+        with self.conn:
+            self.conn.execute(UPSERT_CASE, (ucid, status, error_type, str(error) if error is not None else None, _now()))
+
+    def ucids(self, court=None, status=None):
+        ''' The ucids with an outcome recorded in this run (optionally only those in one court, and/or with the given status) '''
+        query = 'SELECT ucid FROM cases WHERE ucid LIKE ?' + (' AND status=?' if status else '')
+        params = (f'{court};;%' if court else '%',) + ((status,) if status else ())
+        return {row[0] for row in self.conn.execute(query, params)}
+
+    def failures(self, court=None):
+        ''' The failed cases (optionally only those in one court), as a dataframe of ucid, error_type, error, attempts and updated_at '''
+        query = "SELECT ucid, error_type, error, attempts, updated_at FROM cases WHERE status=? AND ucid LIKE ? ORDER BY ucid"
+        return pd.read_sql_query(query, self.conn, params=(FAILED, f'{court};;%' if court else '%'))
@@ -0,0 +1,174 @@
+'''
+File: parse_manifest.py
+Description: A per-court SQLite manifest of what has been parsed, so that incremental runs of parse_pacer.py
+only reparse cases whose input files (dockets, updates, summary) or parser version have changed
+'''
+
+import os
+import sys
+import json
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from support import sqlite_tools
+
+MANIFEST_FNAME = 'parse_manifest.db'
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS parsed (
+        ucid TEXT PRIMARY KEY,
+        input_stats TEXT NOT NULL,
+        input_hash TEXT NOT NULL,
+        parser_version TEXT NOT NULL,
+        parsed_at TEXT NOT NULL
+    )
+'''
+
+
+def case_input_paths(case):
+    ''' All of the input files for a case (as grouped by dtools.group_dockets), in a stable order '''
+    paths = [str(p) for p in case['docket_paths']]
+    if not pd.isna(case.get('summary_path')):
+        paths.append(str(case['summary_path']))
+    return paths
+
+
+def stat_signature(paths):
+    ''' A cheap signature of a set of files, from their paths, sizes and mtimes '''
+    signature = []
+    for path in paths:
+        st = os.stat(path)
+        signature.append([path, st.st_size, st.st_mtime_ns])
+    return json.dumps(signature)
+
+
+def content_hash(paths):
+    ''' A hash of the contents of a set of files (only computed when the stat signature has changed) '''
+    hasher = hashlib.md5()
+    for path in paths:
+        with open(path, 'rb') as rfile:
+            for block in iter(lambda: rfile.read(1 << 20), b''):
+                hasher.update(block)
+        hasher.update(b'\0')
+    return hasher.hexdigest()
+
+
+class ParseManifest:
+    '''
+    Records, for each ucid, the signature and hash of its input files and the parser version that parsed it.
+    Safe to share between threads (each thread gets its own connection) and to pass to worker processes.
+    '''
+    def __init__(self, db_path, parser_version):
+        '''
+        Inputs:
+            - db_path (str or Path): the sqlite file for the manifest (by default one per court, in the court's json directory,
+                but cases are keyed by ucid so one file can be shared by every court, see --manifest)
+            - parser_version (str): the current parser version (see parse_pacer.PARSER_VERSION)
+        '''
+        self.db_path = str(db_path)
+        self.parser_version = parser_version
+        self._local = threading.local()
+
+        with self._connect() as conn:
+            conn.execute(SCHEMA)
+
+    def __getstate__(self):
+        return {'db_path': self.db_path, 'parser_version': self.parser_version}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _connect(self):
+        return sqlite_tools.connect(self.db_path)
+
+    @property
+    def conn(self):
+        ''' The connection for the current thread '''
+        if getattr(self._local, 'conn', None) is None:
+            self._local.conn = self._connect()
+        return self._local.conn
+
+    def check(self, case):
+        '''
+        Check whether a case needs to be (re)parsed
+        Inputs:
+            - case (dict): a case as grouped by dtools.group_dockets
+        Outputs:
+            - is_stale (bool): True if the case has never been parsed, its inputs have changed, or the parser version has changed
+            - state (dict): the current state of the inputs, to be passed to record() once the case is parsed
+        '''
+        paths = case_input_paths(case)
+        state = {'input_stats': stat_signature(paths), 'input_hash': None}
+
+        row = self.conn.execute('SELECT input_stats, input_hash, parser_version FROM parsed WHERE ucid=?', (case['ucid'],)).fetchone()
+        if row is None:
+            return True, state
+
+        input_stats, input_hash, parser_version = row
+        if parser_version != self.parser_version:
+            return True, state
+        elif input_stats == state['input_stats']:
+            state['input_hash'] = input_hash
+            return False, state
+
+        # The files have been touched, so check whether their contents have actually changed
+        state['input_hash'] = content_hash(paths)
+        if state['input_hash'] != input_hash:
+            return True, state
+
+        # Same contents, so just bring the stats up to date (saves rehashing next time)
+        with self.conn:
+            self.conn.execute('UPDATE parsed SET input_stats=? WHERE ucid=?', (state['input_stats'], case['ucid']))
+        return False, state
+
+    def new_update_paths(self, case):
+        '''
+        Check whether the only change to a case since it was last parsed is new docket update htmls added after
+        the dockets that were already parsed (e.g. from a daily docket-update run)
+        Inputs:
+            - case (dict): a case as grouped by dtools.group_dockets
+        Output:
+            (list) the paths of the new update htmls, in order, or None if the case needs a full parse
+        '''
+        row = self.conn.execute('SELECT input_stats, parser_version FROM parsed WHERE ucid=?', (case['ucid'],)).fetchone()
+        if row is None or row[1] != self.parser_version:
+            return None
+
+        docket_paths = [str(p) for p in case['docket_paths']]
+        summary_path = None if pd.isna(case.get('summary_path')) else str(case['summary_path'])
+        prev_signature = json.loads(row[0])
+        prev_dockets = [sig for sig in prev_signature if sig[0] != summary_path]
+        n_prev = len(prev_dockets)
+
+        if n_prev == 0 or n_prev >= len(docket_paths) or [sig[0] for sig in prev_dockets] != docket_paths[:n_prev]:
+            return None
+        # (RECAP input goes through the aggregator, so needs a full parse)
+        elif any(not p.endswith('.html') for p in docket_paths):
+            return None
+        # The dockets that were already parsed must be untouched
+        elif json.loads(stat_signature(docket_paths[:n_prev])) != prev_dockets:
+            return None
+
+        return docket_paths[n_prev:]
+
+    def record(self, case, state=None):
+        '''
+        Record that a case has been parsed with the current parser version
+        Inputs:
+            - case (dict): a case as grouped by dtools.group_dockets
+            - state (dict): the output of check(), if it has already been called for this case
+        '''
+        paths = case_input_paths(case)
+        state = state or {'input_stats': stat_signature(paths), 'input_hash': None}
+        input_hash = state['input_hash'] or content_hash(paths)
+
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO parsed (ucid, input_stats, input_hash, parser_version, parsed_at) VALUES (?,?,?,?,?)',
+                (case['ucid'], state['input_stats'], input_hash, self.parser_version, datetime.now().isoformat(timespec='seconds'))
+            )
@@ -6,6 +6,7 @@ Description: Parses HTMLs downloaded using the SCALES Pacer scraper
 
 # Standard path imports
 from __future__ import division, print_function
+import os
 import glob
 import json
 import re
@@ -13,13 +14,17 @@ import csv
 import sys
 import string
 import asyncio
+import functools
+import itertools
+import threading
+from collections import Counter, defaultdict, deque
 import pandas as pd
 from bs4 import BeautifulSoup as bs
 from pathlib import Path
 
 # Non-standard imports
 import click
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
 # SCALES modules
 sys.path.append(str(Path(__file__).resolve().parents[1]))
@@ -29,8 +34,26 @@ import support.settings as settings
 import support.fhandle_tools as ftools
 from support.court_functions import COURTS_94
 from parsers.parse_summary import SummaryPipeline
+from parsers import lxml_backend
+from parsers import docket_stream
+from parsers.header_scanner import HeaderScanner, HeaderField
+from parsers.parse_manifest import ParseManifest, MANIFEST_FNAME
+from parsers import parse_journal
+from parsers.parse_journal import ParseJournal, JOURNAL_FNAME
+from parsers import schema_validation
+from parsers import stage_timing
+from parsers.stage_timing import stage_timer
+from support import case_json
+from support import shard_store
+from support.shard_store import ShardSink
+from support.member_links import MemberLinkStore
 
 LOG_DIR = Path(__file__).parent/'logs'
+PARSER_VERSION = '3' # bump this whenever a change to the parser alters its output, so that --incremental runs reparse everything
+PROCESS_CHUNKSIZE = 50 # no. of cases handed to a worker process at a time when running with engine='process'
+MAX_PENDING_PER_WORKER = 4 # no. of cases (or chunks, for engine='process') queued per worker, so cases are read in as they're needed
+COUNT_KEYS = ('parsed', 'written', 'unchanged', 'skipped', 'failed') # the tally kept by case_runner (parsed = written + unchanged)
+LINK_OPEN, LINK_CLOSE = '\ue000', '\ue001' # (private-use) sentinels wrapped around link labels in docket entries, see split_docket_text
 
 # Global regex variables
 nbsp = '(?:&nbsp;|\xa0)'
@@ -59,6 +82,33 @@ re_appeals_court = re.compile('Appeals{0}court{0}case{0}numbers?:{0}[A-Za-z0-9 :
 re_role = re.compile('<b><u>([A-Za-z0-9\-\/\,\.\(\) ]{1,100})</u')
 re_header_case_id = re.compile('DOCKET FOR CASE #: [A-Za-z0-9 :\-]{1,100}')
 re_filed_in_error_text = re.compile(f'(?i)(?:{br_tag}|\))(?:{re_cv_base}|{re_cr_base})?(?:error|filing error|filed in error|opened in error|not used|case number not used|incorrectly filed|do not docket)')
+re_city = re.compile(r"\((?P<city>[^\)]+)\)[^\(]+?DOCKET FOR CASE")
+
+# All of the header fields, so the header can be scanned in one go (see header_scanner.py). The regexes that start with a
+# literal are already fast, but the others are anchored on a label that any match must contain: 'back' is how far before
+# the label a match can start, e.g. for re_related '>' + up to 25 chars + any_sp before 'Case', and for re_filed_in_error_text
+# '<br />' + a case title of up to 405 chars + up to 12 chars of the keyword before the anchored part ('case number not used')
+HEADER_SCANNER = HeaderScanner([
+    HeaderField('city', re_city, ['DOCKET FOR CASE'], mode='endpos'),
+    HeaderField('header_case_id', re_header_case_id),
+    HeaderField('filing_date', re_fdate),
+    HeaderField('terminating_date', re_tdate),
+    HeaderField('nature_suit', re_nature),
+    HeaderField('jury_demand', re_jury),
+    HeaderField('cause', re_cause),
+    HeaderField('jurisdiction', re_jurisdiction),
+    HeaderField('monetary_demand', re_demand),
+    HeaderField('lead_case', re_lead_case_id),
+    HeaderField('related_cases', re_related, ['Case'], back=(2,32), start_chars='>'),
+    HeaderField('other_courts', re_other_court, ['Case', 'Other']),
+    HeaderField('magistrate_case_ids', re_mag_judge),
+    HeaderField('filed_in_error_text', re_filed_in_error_text, ['error', 'not used', 'incorrectly filed', 'do not docket'],
+        back=(0,423), start_chars='<)', ignore_case=True),
+    HeaderField('case_flags', dei.re_flag_line, ['<td align="right">'], mode='gate'),
+    HeaderField('judge', re_judge),
+    HeaderField('referred_judges', re_referred_judge),
+    HeaderField('appeals_case_ids', re_appeals_court),
+])
 
 
 
@@ -82,6 +132,64 @@ def re_existence_helper(obj):
         return None
 
 
+def parse_header_fields(html_non_docket, case_type):
+    '''
+    Extract the case-level fields from the docket header (city, dates, nature of suit, lead case, flags, judge...)
+    Inputs:
+        - html_non_docket (str): the html before the docket table (html_text.split('Docket Text')[0])
+        - case_type (str): the case type, e.g. 'cv' or 'cr' (the judge fields are left empty for criminal cases)
+    Output:
+        (dict) the header fields, in the order they appear in the case json
+    '''
+    header = HEADER_SCANNER.scan(html_non_docket)
+    case_data = {}
+
+    case_data['city'] = city_from_match(header['city'])
+    case_data['header_case_id'] = re_existence_helper( header['header_case_id'] )
+    case_data['filing_date'] = re_existence_helper( header['filing_date'] )
+    case_data['terminating_date'] = re_existence_helper( header['terminating_date'] )
+    if case_data['terminating_date'] == None:
+        case_data['case_status'] = 'open'
+    else:
+        case_data['case_status'] = 'closed'
+
+    # Use nos_matcher to try to match nature of suit based on code (or fuzzy match text)
+    nature_suit_raw = generic_re_existence_helper( header['nature_suit'], 'Suit: ', -1, maxsplit=1)
+    nature_suit_matched = dei.nos_matcher(nature_suit_raw, short_hand=True)
+    # Use the matched code if found, otherwise keep the raw string
+    case_data['nature_suit'] = nature_suit_matched or nature_suit_raw
+
+    case_data['jury_demand'] = generic_re_existence_helper( header['jury_demand'], 'Jury Demand: ', -1)
+    case_data['cause'] = generic_re_existence_helper( header['cause'], 'Cause: ', -1)
+    case_data['jurisdiction'] = generic_re_existence_helper( header['jurisdiction'], 'Jurisdiction: ', -1)
+    case_data['monetary_demand'] = generic_re_existence_helper( header['monetary_demand'], 'Demand: ', -1)
+
+    lead_case_pacer_id, lead_case_id = lead_case_from_match(header['lead_case'])
+    case_data['lead_case_pacer_id'] = lead_case_pacer_id
+    case_data['lead_case_id'] = lead_case_id
+
+    related_cases = generic_re_existence_helper( header['related_cases'], ':', -1, maxsplit=1)
+    case_data['related_cases'] = list(map(dtools.line_cleaner, related_cases.split('\n'))) if related_cases else []
+    other_court = generic_re_existence_helper( header['other_courts'], ':', -1, maxsplit=1)
+    case_data['other_courts'] = list(map(dtools.line_cleaner, other_court.split('\n'))) if other_court else []
+    mag_case_ids = generic_re_existence_helper( header['magistrate_case_ids'], ':', -1, maxsplit=1)
+    case_data['magistrate_case_ids'] = list(map(dtools.line_cleaner, mag_case_ids.split('\n'))) if mag_case_ids else []
+    # judge_panel = generic_re_existence_helper( re_judge_panel.search(html_non_docket), 'Panel:', -1)
+    # case_data['judge_panel'] = list(map(dtools.line_cleaner, judge_panel.split('\n'))) if judge_panel else []
+    filed_in_error_text = header['filed_in_error_text']
+    case_data['filed_in_error_text'] = dtools.line_detagger(filed_in_error_text.group()) if filed_in_error_text else None
+    case_flags = dei.case_flags_from_line(header['case_flags'])
+    case_data['case_flags'] = case_flags.split(",") if case_flags else []
+
+    # zero out these fields for criminal cases, since they appear on a per-defendant basis in those cases
+    if case_type == 'cv':
+        case_data['judge'], case_data['referred_judges'], case_data['appeals_case_ids'] = process_defendant_header_fields(html_non_docket, header)
+    else:
+        case_data['judge'], case_data['referred_judges'], case_data['appeals_case_ids'] = None, [], []
+
+    return case_data
+
+
 
 
 #############################################
@@ -112,6 +220,105 @@ def split_on_multiple_separators(text, separators):
     return splits
 
 
+# Red herrings among the bolded/underlined words of a party table (e.g. words from the crim-counts section)
+ROLE_TERMS_TO_EXCLUDE = ['pending counts', 'terminated counts', 'terminated)', 'offense', 'disposition', 'complaints',
+                         'order', 'rule', 'judgment', 'revocation', 'sentencing', 'contempt', '/19', '/20']
+
+# Parties listed without a role heading, and the regex for the detailed roleless-party check - apologies for the ugliness!
+# (I feel like this edge case isn't worth more elegance)
+ROLELESS_PARTIES = ['service list', 'serivce list', 'sevice list', 'svc lst', 'list service', 'prisoner correspondence']
+_prefix1 = '<td valign=\"top\" width=\"40%\">'
+_prefix2 = f'{_prefix1}\n'
+_represented1 = 'represented&nbsp;by</td>'
+_represented2 = _represented1.replace('&nbsp;', '(?:\xa0| )')
+_exclude1 = f'(?<!{_represented1})(?<!{_represented2})'
+_exclude2 = f'(?<!{_represented1}{_prefix1})(?<!{_represented1}{_prefix2})(?<!{_represented2}{_prefix1})(?<!{_represented2}{_prefix2})'
+re_roleless_party = re.compile(f"(?i)(?:{_exclude1}(?:{_prefix1}|{_prefix2}))?{_exclude2}<b>(?:{'|'.join(ROLELESS_PARTIES)})<\/b>")
+re_defendant_id = re.compile('\((\d+)')
+
+
+@functools.lru_cache(maxsize=4096)
+def role_splitter(roles):
+    '''
+    Compile the pattern that splits a party table on its role headings (equivalent to split_on_multiple_separators with
+    the tagged role titles, since no heading can occur inside another, but done in one pass over the table)
+    Inputs:
+        - roles (frozenset): the role titles found in the table
+    Output:
+        (compiled regex) with the heading as its one group, for use with re.split
+    '''
+    headings = sorted(('<b><u>'+x+'</u></b>' for x in roles), key=len, reverse=True) # add tags to weed out, e.g., 'Defendant' in disp text
+    return re.compile('(' + '|'.join(map(re.escape, headings)) + ')')
+
+
+class PartyParserContext:
+    '''
+    Per-process state for process_parties_and_counts: the role mappings (read once, rather than for every case) and a
+    tally of the role titles that are missing from them, which parse() reports once at the end of a run instead of
+    printing a warning for every case. Safe to share between threads.
+    '''
+    def __init__(self, role_mappings_path=settings.ROLE_MAPPINGS):
+        '''
+        Inputs:
+            - role_mappings_path (str or Path): the role mappings json (role title -> {'title', 'type'})
+        '''
+        self.role_mappings_path = role_mappings_path
+        with open(role_mappings_path, 'r') as f:
+            self.mappings = json.load(f)
+        self.unknown_roles = Counter()
+        self._lock = threading.Lock()
+
+    def role_info(self, role):
+        ''' The standardised (title, type) of a cleaned role title (roles that aren't in the mappings get spoofed as 'misc') '''
+        mapping = self.mappings.get(role)
+        return (mapping['title'], mapping['type']) if mapping else (role, 'misc')
+
+    def note_unknown_roles(self, roles):
+        ''' Tally the cleaned role titles in a case that aren't in the mappings '''
+        unknown = {role for role in roles if role and role not in self.mappings}
+        if unknown:
+            with self._lock:
+                self.unknown_roles.update(unknown)
+
+    def add_unknown_roles(self, unknown_roles):
+        ''' Merge in another tally (e.g. one returned by a worker process) '''
+        with self._lock:
+            self.unknown_roles.update(unknown_roles)
+
+    def pop_unknown_roles(self):
+        ''' Return the tally of unknown role titles (title -> no. of cases) and reset it '''
+        with self._lock:
+            unknown_roles, self.unknown_roles = self.unknown_roles, Counter()
+        return unknown_roles
+
+
+_party_context = None
+_party_context_lock = threading.Lock()
+
+def get_party_context():
+    ''' The PartyParserContext of this process (created on first use) '''
+    global _party_context
+    if _party_context is None:
+        with _party_context_lock:
+            if _party_context is None:
+                _party_context = PartyParserContext()
+    return _party_context
+
+
+def report_unknown_roles(unknown_roles, role_mappings_path=settings.ROLE_MAPPINGS):
+    '''
+    Print the role titles that weren't found in the role mappings over a run, most common first
+    Inputs:
+        - unknown_roles (Counter): role title -> no. of cases it appeared in, from PartyParserContext.pop_unknown_roles
+        - role_mappings_path (str or Path): the role mappings json, for the message
+    '''
+    if not unknown_roles:
+        return
+    print(f"WARNING: {len(unknown_roles):,} role title(s) not found in {role_mappings_path} (parsed with party_type 'misc'):")
+    for role, n_cases in unknown_roles.most_common():
+        print(f' - "{role}": {n_cases:,} case(s)')
+
+
 def process_entity_and_lawyers(chunk):
     '''
     Parse information about a party's representation (e.g. lawyer name, office, lead attorney status...)
@@ -229,21 +436,26 @@ def process_criminal_counts(chunk, count_type):
     return counts
 
 
-def process_defendant_header_fields(text):
+def process_defendant_header_fields(text, header=None):
     '''
     Parse header information that pertains to the defendants, which will occur multiple times on a per-defendant basis in criminal cases
     Inputs:
         - text (str): the text to be searched for defendant fields
+        - header (dict): the output of HEADER_SCANNER.scan(text), if the text has already been scanned
     Outputs:
         - judge, referred_judges, appeals_case_ids: the defendant fields in question
     '''
-    judge_prelim = dtools.line_cleaner(re_existence_helper(re_judge.search(text)))
+    if header is None:
+        header = {'judge': re_judge.search(text), 'referred_judges': re_referred_judge.search(text),
+            'appeals_case_ids': re_appeals_court.search(text)}
+
+    judge_prelim = dtools.line_cleaner(re_existence_helper(header['judge']))
     judge = None if judge_prelim=='Unassigned' else judge_prelim
 
-    referred_judges_raw = dtools.line_cleaner(re_existence_helper(re_referred_judge.search(text)))
+    referred_judges_raw = dtools.line_cleaner(re_existence_helper(header['referred_judges']))
     referred_judges = list(map(dtools.line_cleaner, referred_judges_raw.split('\n'))) if referred_judges_raw else []
 
-    appeals_case_ids_prelim = re_existence_helper(re_appeals_court.search(text))
+    appeals_case_ids_prelim = re_existence_helper(header['appeals_case_ids'])
     appeals_case_ids = appeals_case_ids_prelim.split(', ') if appeals_case_ids_prelim else []
 
     return judge, referred_judges, appeals_case_ids
@@ -262,44 +474,33 @@ def process_parties_and_counts(text, is_cr):
         detagged = dtools.line_detagger(role)
         return detagged.split('(')[0].strip() if detagged else None
 
+    context = get_party_context()
+
     # identify party roles (i.e. bolded/underlined words - Dft, Plaintiff, etc) & throw out red herrings (e.g. words from the crim-counts section)
     roles = set()
-    terms_to_exclude = ['pending counts', 'terminated counts', 'terminated)', 'offense', 'disposition', 'complaints',
-                        'order', 'rule', 'judgment', 'revocation', 'sentencing', 'contempt', '/19', '/20']
     for role_candidate in re_role.findall(text):
-        if all(x not in role_candidate.lower() for x in terms_to_exclude):
+        if all(x not in role_candidate.lower() for x in ROLE_TERMS_TO_EXCLUDE):
             roles.add(role_candidate)
 
-    # get additional info from the role-mappings JSON about the roles we found
-    with open(settings.ROLE_MAPPINGS, 'r') as f:
-        mappings = json.load(f)
-    for role in roles:
-        role_clean = _clean_role(role)
-        if role_clean and role_clean not in mappings.keys():
-            mappings[role_clean] = {'title':role_clean, 'type':'misc'} # this role isn't in the dict, so spoof an entry for it
-            print(f'WARNING: role title "{role_clean}" not found')
+    # note any roles we found that aren't in the role mappings (they get spoofed as 'misc', see PartyParserContext.role_info)
+    context.note_unknown_roles({_clean_role(role) for role in roles})
 
     # split on role headings to create party chunks
     parties = []
-    split = split_on_multiple_separators(text, ['<b><u>'+x+'</u></b>' for x in roles]) # add tags to weed out, e.g., 'Defendant' in disp text
+    if roles:
+        pieces = role_splitter(frozenset(roles)).split(text)
+        split = [(None, pieces[0])] + list(zip(pieces[1::2], pieces[2::2]))
+    else:
+        split = [(None, text)]
 
     # check for roleless parties
     split_final = split
-    potential_roleless = ['service list', 'serivce list', 'sevice list', 'svc lst', 'list service', 'prisoner correspondence']
-    if any(('<b>'+x+'</b>' in text.lower() for x in potential_roleless)): # preliminary check
+    if any(('<b>'+x+'</b>' in text.lower() for x in ROLELESS_PARTIES)): # preliminary check
         for i in range(1,len(split)):
             chunk, indices_in_chunk = split[i][1], [None] # set up variables
             insert_point = split_final.index(split[i]) # decide where we should insert the results in the final split list
 
-            # regexes for the detailed roleless-party check - apologies for the ugliness! (I feel like this edge case isn't worth more elegance)
-            prefix1 = '<td valign=\"top\" width=\"40%\">'
-            prefix2 = f'{prefix1}\n'
-            represented1 = 'represented&nbsp;by</td>'
-            represented2 = represented1.replace('&nbsp;', '(?:\xa0| )')
-            exclude1 = f'(?<!{represented1})(?<!{represented2})'
-            exclude2 = f'(?<!{represented1}{prefix1})(?<!{represented1}{prefix2})(?<!{represented2}{prefix1})(?<!{represented2}{prefix2})'
-
-            for match in re.finditer(f"(?i)(?:{exclude1}(?:{prefix1}|{prefix2}))?{exclude2}<b>(?:{'|'.join(potential_roleless)})<\/b>", chunk):
+            for match in re_roleless_party.finditer(chunk):
                 indices_in_chunk.append(match.start()) # store the index of this missing party
 
             # add any roleless parties to the list of chunks
@@ -324,12 +525,12 @@ def process_parties_and_counts(text, is_cr):
         if not new_party:
             print(f"WARNING: no party info found in '{role}' block")
         else:
-            new_party['role'], new_party['party_type'] = (mappings[role]['title'], mappings[role]['type']) if role else (None, None)
+            new_party['role'], new_party['party_type'] = context.role_info(role) if role else (None, None)
 
             # parse info pertaining to criminal proceedings (e.g. criminal counts)
             new_party['pacer_id'] = None
             if is_cr:
-                defendant_id = re.search('\((\d+)', raw_role)
+                defendant_id = re_defendant_id.search(raw_role)
 
                  # parse per-defendant header fields
                 if new_party['role'] == 'Defendant':
@@ -405,59 +606,26 @@ def get_member_cases(member_block_string, court):
 
 def read_member_lead_df():
     '''
-    Read the member-lead dataframe and map it to a dictionary
+    Open the member-lead link store
 
     Outputs:
-        - member_cases (dict): a dictionary that maps leads to member list (all in ucids)
-        e.x. {lead1: [mem1_1, mem1_2], lead2: [mem2_1], ...}
+        - member_cases (MemberLinkStore): the store of lead->member links (all in ucids), which supports `lead in member_cases`
     '''
-    # Load member case info
-    df = pd.read_json(settings.MEMBER_LEAD_LINKS, lines=True)
-    if not len(df):
-        return {}
-
-    member_cases_series = df.groupby('lead').member.agg(list)
-    member_cases = dict(member_cases_series.iteritems())
-    return member_cases
+    return MemberLinkStore()
 
 
 def update_member_cases(lead_case, lead_case_pacer_id, new_members_list, member_cases, court):
-    ''' Update the in-memory and file-stored members lists for a new (lead, member_list) pair
+    ''' Store the members list for a new (lead, member_list) pair
 
     Inputs:
         - lead_case (str): ucid of lead case
         - lead_case_pacer_id (str): pacer id of lead case
-        - new_members_list (list): a list of new member cases ucids
-        - member_cases (dict): the in-memory mapping of leads to members
+        - new_members_list (list): a list of new member cases, as from get_member_cases
+        - member_cases (MemberLinkStore): the store of leads to members
         - court (str): the current court
     '''
-    # Update the member_cases dict
-    member_cases[lead_case] = new_members_list
-
     print(f"Updating member cases for <lead:{lead_case}> with {len(new_members_list):,} member cases")
-
-    # Add in extra details for writing out to jsonl
-    it = (
-        {**mem, 'court': court, 'lead':lead_case, 'lead_case_id': lead_case_pacer_id}
-        for mem in new_members_list
-    )
-    # Append to the file
-    with open(settings.MEMBER_LEAD_LINKS, 'a', encoding='utf-8') as rfile:
-        rfile.writelines( json.dumps(mem)+'\n' for mem in it)
-
-
-def tidy_member_cases_df():
-    ''' Remove any duplicates from member cases file '''
-
-    df = pd.read_json(settings.MEMBER_LEAD_LINKS, lines=True)
-    if not len(df):
-        return
-
-    df.drop_duplicates(subset=('member', 'lead'), inplace=True)
-
-    with open(settings.MEMBER_LEAD_LINKS, 'w') as wfile:
-        for row_dict in df.fillna('').to_dict(orient='records'):
-            wfile.write( json.dumps(row_dict)+'\n')
+    member_cases.add_links(lead_case, lead_case_pacer_id, new_members_list, court)
 
 
 #############################
@@ -491,139 +659,392 @@ def get_mdl_code(case_data):
     return (None,None)
 
 
-def parse_docket(docket_table, reverse_docket=False):
+def link_info(url, label, line_doc_map):
+    '''
+    Work out what a digit link in a docket entry points to
+    Inputs:
+        - url (str): the href of the <a> tag
+        - label (str): the string of the <a> tag (e.g. '3')
+        - line_doc_map (dict): map of document id to scales index for the line documents in the docket
+    Output:
+        (tuple) link_type ('ref' for a reference to another entry, 'att' for an attachment), encoded_info (the scales index or url), label
+    '''
+    doc_id = url.split('/')[-1]
+
+    # Reference/Edge, encode the scales index
+    if doc_id in line_doc_map:
+        return 'ref', line_doc_map[doc_id], label
+    # For attachments, encode the url
+    else:
+        return 'att', url, label
+
+
+def encode_link(link):
+    '''
+    Encode link info into a string that can replace the tag's string and pass through the .text of the cell.
+    Solves the chicken-egg problem of:
+    1) We need the spans of the links i.e. start and end indexes of text of the atags, RELATIVE to the whole docket text
+    2) We must convert the td cell to text/string to see what these spans are
+    3) Once we collapse to string we have lost the url information
+
+    This is the general fallback, decoded by decode_docket_text; links that pass is_plain_link just have their label
+    wrapped in sentinels (wrap_link) and the info kept alongside, which is much cheaper to decode (split_docket_text)
+    '''
+    link_type, encoded_info, label = link
+    return f"###{link_type}_{encoded_info}_{label}###"
+
+
+def wrap_link(link):
+    ''' The sentinel-delimited label of a link, split out by split_docket_text '''
+    return LINK_OPEN + link[2] + LINK_CLOSE
+
+
+def is_plain_link(link):
+    '''
+    Whether a link will come out of split_docket_text the same as it would from the ###..### encoding, i.e. its label is
+    all digits (so decode_docket_text can decode it) and its url wouldn't be altered by dtools.line_cleaner
+    '''
+    link_type, encoded_info, label = link
+    if not (label and label.isdecimal()):
+        return False
+    elif link_type == 'att':
+        return bool(encoded_info) and not any(x in encoded_info for x in ('#', '&amp;', '&nbsp;', '\\', '  '))
+    return True
+
+
+def split_docket_text(docket_text_pre, links, scales_ind, documents, edges):
+    '''
+    Build the clean docket text, documents and edges from the text of a docket entry cell in which each link's label has
+    been wrapped by wrap_link (same output as decode_docket_text, but a single split and join instead of a regex pass and
+    repeated string concatenation)
+    Inputs:
+        - docket_text_pre (str): the cleaned text of the docket entry cell, including the LINK_OPEN/LINK_CLOSE sentinels
+        - links (list): the (link_type, encoded_info, label) of each wrapped link, in document order
+        - scales_ind, documents, edges: as for decode_docket_text
+    Output:
+        docket_text_post (str): the clean docket text, or None if the text can't be split (e.g. it contains a stray
+            sentinel or a ###, so could be read differently by decode_docket_text)
+    '''
+    if docket_text_pre is None or '###' in docket_text_pre:
+        return None
+    pieces = docket_text_pre.split(LINK_OPEN)
+    if len(pieces) != len(links)+1 or docket_text_pre.count(LINK_CLOSE) != len(links):
+        return None
+    pieces = [pieces[0]] + [piece.split(LINK_CLOSE) for piece in pieces[1:]]
+    if any(len(piece)!=2 or piece[0]!=link[2] for piece,link in zip(pieces[1:], links)):
+        return None
+
+    text_parts = [pieces[0]]
+    length = len(pieces[0])
+    for (link_type, encoded_info, label), (_, rest) in zip(links, pieces[1:]):
+        span = {'start':length, 'end': length + len(label)}
+        if link_type=='ref':
+            edges.append( [scales_ind, int(encoded_info), span] )
+        elif link_type=='att':
+            documents[label] = {'url':encoded_info, 'span': span}
+
+        text_parts.extend((label, rest))
+        length += len(label) + len(rest)
+
+    return ''.join(text_parts)
+
+
+def decode_docket_text(docket_text_pre, scales_ind, documents, edges):
+    '''
+    Decode the ###...### tags left in a docket entry's text by the tag encoding in parse_docket/parse_docket_lxml
+    Inputs:
+        - docket_text_pre (str): the cleaned text of the docket entry cell, still including the ###..###
+        - scales_ind (int): the index of this docket entry
+        - documents (dict): the documents for this entry, attachments are added to it in place
+        - edges (list): the edges for this entry, references are added to it in place
+    Output:
+        docket_text_post (str): the clean docket text, with each ###..### replaced by the label of its link
+    '''
+    # Buld docket_text iteratively through string addition, parse edges and documents on-the-fly
+    # This will be the output clean json text
+    docket_text_post = ''
+    # Pointer to keep track of place within docket_text_pre
+    pointer = 0
+
+    # Pattern for regex to decode what was encoded in _encode_tags_
+    re_encoded_tag = r"###(?P<link_type>ref|att)_(?P<encoded_info>[\s\S]+?)_(?P<label>\d+)###"
+
+    # Iterate through all tags that have been encoded as ###...###
+    for match in re.finditer(re_encoded_tag, docket_text_pre):
+        # Get the start and end index of the match relative to docket_text_pre
+        start, end = match.span()
+
+        # Add text up until this match
+        docket_text_post += docket_text_pre[pointer : start]
+
+        # Decode info
+        link_type, encoded_info, label = match.groups()
+        # Build the span
+        span = {'start':len(docket_text_post), 'end': len(docket_text_post) + len(label)}
+        # Add the label to the text (what was previously inside the a tag)
+        docket_text_post += label
+
+        # Add to documents or edges
+        if link_type=='ref':
+            edges.append( [scales_ind, int(encoded_info), span] )
+        elif link_type=='att':
+            documents[label] = {'url':encoded_info, 'span': span}
+
+        pointer = end
+
+    # Make sure to get the last bit of text
+    docket_text_post += docket_text_pre[pointer: ]
+
+    return docket_text_post
+
+
+def parse_docket(docket_table, reverse_docket=False, encode_links=False, prior_line_docs=None, ind_offset=0):
     '''
     Get data from docket_table.
-    NOTE: this method will modify docket_table in place in the process of creating the output data_rows.
+    NOTE: this method may modify docket_table in place in the process of creating the output data_rows.
     This is a useful efficiency for the parser but if you are using calling this method elsewhere and
     need docket_table to stay unmodified you should parse a copy of it (using `copy.copy(docket_table)``)
     Inputs:
         - docket_table (WebElement): the docket report main table
         - reverse_docket (bool): when True, reverse the order of docket entries (used for fixing backwards dockets from IASD)
+        - encode_links (bool): when True, always use the ###..### link encoding rather than the sentinel split (for benchmarking/checking)
+        - prior_line_docs (dict): map of document id to scales index for line documents in rows that come before this table
+            (when merging a docket update into an existing docket, see merge_docket_rows)
+        - ind_offset (int): the scales index of the first row of this table
     Output:
         data_rows (list): list of dicts with 5 entries (date_filed(str), ind(str), docket_text(str), documents(dict), edges(list of tuples))
     '''
 
     def _get_doc_id_(td):
         ''' Gets the id from an atag within a 2nd column td, returns None if td is empty'''
-        atag = td.select_one('a')
+        atag = td.find('a')
         return atag.attrs.get('href').split('/')[-1] if atag else None
 
-    def _encode_tags_(atag):
-        '''
-        Encode tag info into the string of a tag so it can pass through bs4 .text method.
-        Solves the chicken-egg problem of:
-        1) We need the spans of the links i.e. start and end indexes of text of the atags, RELATIVE to the whole docket text
-        2) We must convert the td cell to text/string to see what these spans are
-        3) Once we collapse to string we have lost the url information
-
-        So this method: encodes info about the tag (most importantly the url) in the text,
-        then iterates through to parse that info and decode it back to just the text of the atag e.g. "3"
-        (There are other ways of iterating with bs4 through the td tag's children
-        but it's hard to get the spans of these child tags relative to the 'docket text')
-
-        Input:
-            - atag (bs4 tag): a bs4 <a> tag
-        Output:
-            No output, this alters the atag.string property in place
-        '''
-        url = atag.attrs.get('href')
-        doc_id = url.split('/')[-1]
-
-        # Reference/Edge, encode the scales index
-        if doc_id in line_doc_map.keys():
-            scales_ind = line_doc_map[doc_id]
-            encoded_info = scales_ind
-            link_type = 'ref'
-
-        # For attachment atags, encode the url
-        else:
-            encoded_info = url
-            link_type = 'att'
-
-        label = atag.string
-        atag.string = f"###{link_type}_{encoded_info}_{label}###"
-
     # Get td tags from second column and map them to ids
     col2 =  docket_table.select('tr td:nth-of-type(2)')[1:]
     col2_ids = map(_get_doc_id_, col2)
 
     # Map document id to locational index
-    line_doc_map = {doc_id:scales_ind for scales_ind,doc_id in enumerate(col2_ids) if doc_id }
+    line_doc_map = dict(prior_line_docs or {})
+    line_doc_map.update({doc_id:scales_ind for scales_ind,doc_id in enumerate(col2_ids, ind_offset) if doc_id })
 
     out_rows = []
-    in_rows = docket_table.select('tr')[1:]
+    in_rows = docket_table.find_all('tr')[1:]
     if reverse_docket:
         in_rows.reverse()
 
-    for scales_ind, row in enumerate(in_rows):
+    for scales_ind, row in enumerate(in_rows, ind_offset):
         documents, edges = {}, []
 
-        cells = row.select('td')
+        cells = row.find_all('td')
         td_date, td_ind, td_entry = cells
 
         # Get line doc link
-        if td_ind.select('a'):
-            documents['0'] = {'url': td_ind.select_one('a').attrs.get('href'),'span': {} }
+        ind_atag = td_ind.find('a')
+        if ind_atag:
+            documents['0'] = {'url': ind_atag.attrs.get('href'),'span': {} }
 
         # Get all atags
-        atags = td_entry.select('a')
+        atags = td_entry.find_all('a')
         # Filter out external links (by only using digit links)
         atags = [a for a in atags if a.text.strip().isdigit()]
 
-        # Encode the tags
-        list(map(_encode_tags_, atags))
+        # Walk the strings of the entry cell, swapping in the label of each link wrapped in sentinels, so their spans
+        # can be recovered from the flattened text
+        links = [link_info(a.attrs.get('href'), a.string, line_doc_map) for a in atags]
+        docket_text_post = None
+        if not encode_links and all(map(is_plain_link, links)):
+            wrapped = {id(atag.string): wrap_link(link) for atag, link in zip(atags, links)}
+            entry_text = ''.join(wrapped.get(id(x), x) for x in td_entry.strings)
+            date_filed, ind = (dtools.line_cleaner(x.text.strip()) for x in (td_date, td_ind))
+            docket_text_pre = dtools.line_cleaner(entry_text.strip())
+            docket_text_post = split_docket_text(docket_text_pre, links, scales_ind, documents, edges)
+
+        if docket_text_post is None:
+            # Fall back to encoding the link info into the tags' strings (see encode_link)
+            for atag, link in zip(atags, links):
+                atag.string = encode_link(link)
+            date_filed, ind, docket_text_pre = tuple(dtools.line_cleaner(x.text.strip()) for x in cells)
+            docket_text_post = decode_docket_text(docket_text_pre, scales_ind, documents, edges)
+
+        out_row = {
+            'date_filed': date_filed or None,
+            'ind': ind or None,
+            'docket_text': docket_text_post or None,
+            'documents': documents,
+            'edges': edges
+        }
+        out_rows.append(out_row)
+
+    return out_rows
 
-        # Convert html to clean text, docket_text_pre is pre the decoding process (includes the ###..###)
-        date_filed, ind, docket_text_pre = tuple(dtools.line_cleaner(x.text.strip()) for x in cells)
 
-        # Buld docket_text iteratively through string addition, parse edges and documents on-the-fly
-        # This will be the output clean json text
-        docket_text_post = ''
-        # Pointer to keep track of place within docket_text_pre
-        pointer = 0
+def parse_docket_lxml(docket_table, reverse_docket=False, encode_links=False, prior_line_docs=None, ind_offset=0):
+    '''
+    Get data from docket_table when using the lxml backend (same i/o as parse_docket, and also modifies docket_table in place)
+    Inputs:
+        - docket_table (lxml.html.HtmlElement): the docket report main table
+        - reverse_docket (bool): when True, reverse the order of docket entries (used for fixing backwards dockets from IASD)
+        - encode_links (bool): when True, always use the ###..### link encoding rather than the sentinel split (for benchmarking/checking)
+        - prior_line_docs (dict): map of document id to scales index for line documents in rows that come before this table
+            (when merging a docket update into an existing docket, see merge_docket_rows)
+        - ind_offset (int): the scales index of the first row of this table
+    Output:
+        data_rows (list): list of dicts with 5 entries (date_filed(str), ind(str), docket_text(str), documents(dict), edges(list of tuples))
+    '''
 
-        # Pattern for regex to decode what was encoded in _encode_tags_
-        re_encoded_tag = r"###(?P<link_type>ref|att)_(?P<encoded_info>[\s\S]+?)_(?P<label>\d+)###"
+    def _get_doc_id_(td):
+        ''' Gets the id from an atag within a 2nd column td, returns None if td is empty'''
+        atags = td.xpath('.//a')
+        return atags[0].get('href').split('/')[-1] if atags else None
+
+    # Get td tags from second column and map them to ids
+    col2 = lxml_backend.second_column_cells(docket_table)[1:]
+    col2_ids = map(_get_doc_id_, col2)
 
-        # Iterate through all tags that have been encoded as ###...###
-        for match in re.finditer(re_encoded_tag, docket_text_pre):
-            # Get the start and end index of the match relative to docket_text_pre
-            start, end = match.span()
+    # Map document id to locational index
+    line_doc_map = dict(prior_line_docs or {})
+    line_doc_map.update({doc_id:scales_ind for scales_ind,doc_id in enumerate(col2_ids, ind_offset) if doc_id })
 
-            # Add text up until this match
-            docket_text_post += docket_text_pre[pointer : start]
+    in_rows = docket_table.xpath('.//tr')[1:]
+    if reverse_docket:
+        in_rows.reverse()
 
-            # Decode info
-            link_type, encoded_info, label = match.groups()
-            # Build the span
-            span = {'start':len(docket_text_post), 'end': len(docket_text_post) + len(label)}
-            # Add the label to the text (what was previously inside the a tag)
-            docket_text_post += label
+    return [parse_docket_row_lxml(row, scales_ind, line_doc_map, encode_links) for scales_ind, row in enumerate(in_rows, ind_offset)]
 
-            # Add to documents or edges
-            if link_type=='ref':
-                edges.append( [scales_ind, int(encoded_info), span] )
-            elif link_type=='att':
-                documents[label] = {'url':encoded_info, 'span': span}
 
-            pointer = end
+def parse_docket_row_lxml(row, scales_ind, line_doc_map, encode_links=False):
+    '''
+    Parse a single row of a docket table with the lxml backend (modifies the row in place)
+    Inputs:
+        - row (lxml.html.HtmlElement): the <tr> of the docket entry
+        - scales_ind (int): the scales index of the entry
+        - line_doc_map (dict): map of document id to scales index for the line documents of the docket
+        - encode_links (bool): as for parse_docket_lxml
+    Output:
+        (dict) the docket entry, as in the output of parse_docket_lxml
+    '''
+    documents, edges = {}, []
+
+    cells = row.xpath('.//td')
+    td_date, td_ind, td_entry = cells
+
+    # Get line doc link
+    ind_atags = td_ind.xpath('.//a')
+    if ind_atags:
+        documents['0'] = {'url': ind_atags[0].get('href'),'span': {} }
+
+    # Get all atags, filtering out external links (by only using digit links)
+    atags = [a for a in td_entry.xpath('.//a') if lxml_backend.text(a).strip().isdigit()]
+
+    # Wrap the label of each link in sentinels, so their spans can be recovered once the cell is flattened to text
+    links = [link_info(a.get('href'), lxml_backend.string(a), line_doc_map) for a in atags]
+    docket_text_post = None
+    if not encode_links and all(map(is_plain_link, links)):
+        for atag, link in zip(atags, links):
+            lxml_backend.set_string(atag, wrap_link(link))
+        date_filed, ind, docket_text_pre = tuple(dtools.line_cleaner(lxml_backend.text(x).strip()) for x in cells)
+        docket_text_post = split_docket_text(docket_text_pre, links, scales_ind, documents, edges)
+
+    if docket_text_post is None:
+        # Fall back to encoding the link info into the tags' strings (see encode_link)
+        for atag, link in zip(atags, links):
+            lxml_backend.set_string(atag, encode_link(link))
+        date_filed, ind, docket_text_pre = tuple(dtools.line_cleaner(lxml_backend.text(x).strip()) for x in cells)
+        docket_text_post = decode_docket_text(docket_text_pre, scales_ind, documents, edges)
+
+    return {
+        'date_filed': date_filed or None,
+        'ind': ind or None,
+        'docket_text': docket_text_post or None,
+        'documents': documents,
+        'edges': edges
+    }
 
-        # Make sure to get the last bit of text
-        docket_text_post += docket_text_pre[pointer: ]
 
-        out_row = {
-            'date_filed': date_filed or None,
-            'ind': ind or None,
-            'docket_text': docket_text_post or None,
-            'documents': documents,
-            'edges': edges
-        }
-        out_rows.append(out_row)
+def parse_docket_stream(streamed, reverse_docket=False, encode_links=False, prior_line_docs=None, ind_offset=0):
+    '''
+    Get data from the docket table of a StreamedDocket, reading the table from the file a row at a time rather than
+    building a tree of it (same output as parse_docket_lxml, but memory doesn't grow with the size of the table beyond the output itself)
+    Inputs:
+        - streamed (docket_stream.StreamedDocket): the split docket html
+        - reverse_docket, encode_links, prior_line_docs, ind_offset: as for parse_docket_lxml
+    Output:
+        data_rows (list): as for parse_docket_lxml
+    '''
+    def _col2_ids(tr):
+        ''' The document ids of the second-column td(s) of a row (see lxml_backend.second_column_cells) '''
+        ids = []
+        for td in tr.iter('td'):
+            if [child for child in td.getparent() if child.tag=='td'][1:2] == [td]:
+                atags = td.xpath('.//a')
+                ids.append(atags[0].get('href').split('/')[-1] if atags else None)
+        return ids
+
+    # First pass over the table: map document id to locational index, which needs every row (a reference can point forwards)
+    col2_ids, n_rows = [], -1 # (not counting the heading row)
+    for tr in streamed.rows():
+        col2_ids.extend(_col2_ids(tr))
+        n_rows += 1
+    line_doc_map = dict(prior_line_docs or {})
+    line_doc_map.update({doc_id:scales_ind for scales_ind,doc_id in enumerate(col2_ids[1:], ind_offset) if doc_id })
+
+    # Second pass: parse each row as it is read (giving reversed rows the same indices as parse_docket_lxml does)
+    rows = streamed.rows()
+    next(rows, None) # (the heading row)
+    out_rows = []
+    for pos, row in enumerate(rows):
+        scales_ind = ind_offset + (n_rows-1-pos if reverse_docket else pos)
+        out_rows.append(parse_docket_row_lxml(row, scales_ind, line_doc_map, encode_links))
+    if reverse_docket:
+        out_rows.reverse()
 
     return out_rows
 
 
+def docket_row_key(row):
+    ''' The key used to match up docket rows across docket reports (see ftools.docket_row_key) '''
+    return ftools.docket_row_key(row['date_filed'], row['ind'], row['docket_text'])
+
+
+def line_docs_from_docket(docket):
+    ''' Map document id to scales index for the line documents of an already-parsed docket (the parsed equivalent of line_doc_map) '''
+    return {row['documents']['0']['url'].split('/')[-1]:scales_ind for scales_ind,row in enumerate(docket) if '0' in row['documents']}
+
+
+def merge_docket_rows(prior_docket, new_rows):
+    '''
+    Merge the rows parsed from a docket update into an existing docket, the same way the docket aggregator combines tables:
+    the existing rows are kept as they are, and the update's rows that aren't already in the docket are appended
+    Inputs:
+        - prior_docket (list): the existing docket rows
+        - new_rows (list): the rows parsed from the update, with prior_line_docs=line_docs_from_docket(prior_docket)
+            and ind_offset=len(prior_docket) (so their edges already point at the right prior rows)
+    Output:
+        (list) the merged docket rows, with the scales indices in the new rows' edges renumbered
+    '''
+    # Rows are matched as a multiset, so that e.g. two unnumbered minute entries on the same day with the same
+    # opening text are only both dropped if both were already in the docket
+    prior_inds = defaultdict(deque)
+    for scales_ind, row in enumerate(prior_docket):
+        prior_inds[docket_row_key(row)].append(scales_ind)
+
+    n_prior = len(prior_docket)
+    kept_rows, ind_map = [], {}
+    for provisional_ind, row in enumerate(new_rows, n_prior):
+        key = docket_row_key(row)
+        if prior_inds[key]:
+            ind_map[provisional_ind] = prior_inds[key].popleft()
+        else:
+            ind_map[provisional_ind] = n_prior + len(kept_rows)
+            kept_rows.append(row)
+
+    for row in kept_rows:
+        row['edges'] = [[ind_map.get(src, src), ind_map.get(dst, dst), span] for src,dst,span in row['edges']]
+
+    return prior_docket + kept_rows
+
+
 def get_city(html_text):
     '''
     Get the case city from the header (in parenthesis after court name)
@@ -635,8 +1056,11 @@ def get_city(html_text):
     Output:
         (str)
     '''
-    re_city = r"\((?P<city>[^\)]+)\)[^\(]+?DOCKET FOR CASE"
-    match = re.search(re_city, html_text)
+    return city_from_match(re_city.search(html_text))
+
+
+def city_from_match(match):
+    ''' Get the case city from a re_city match (or None) '''
     return match.groupdict()['city'] if match else None
 
 
@@ -648,7 +1072,11 @@ def get_lead_case(html_text):
         - pacer_id (str): the pacer internal id for the lead case (from the href)
         - case_id (str): the case id
     '''
-    match = re_lead_case_id.search(html_text)
+    return lead_case_from_match(re_lead_case_id.search(html_text))
+
+
+def lead_case_from_match(match):
+    ''' Get the lead case pacer_id and case_id from a re_lead_case_id match (or None), see get_lead_case '''
     if match:
         case_id = match.groupdict().get('case_id').strip()
         href = match.groupdict().get('href')
@@ -666,23 +1094,32 @@ def get_lead_case(html_text):
 ##################################################################
 
 
-def process_html_file(case, member_cases, court=None):
+def process_html_file(case, member_cases, court=None, backend='bs4', prior_case=None, timings=None, stream_min_bytes=None):
     '''
     Processes a html Pacer file, returns a dictionary object to be saved as JSON
 
     Inputs:
         - case (dict) - dict with 'docket_paths':tuple, 'summary_path':Path
-        - member_cases (dict): map of lead cases to member lists (in ucids)
+        - member_cases (MemberLinkStore): the store of lead cases to member lists (in ucids), see support/member_links.py
         - court (str): court abbrev, if none infers from filepath
+        - backend ('bs4' or 'lxml'): the library used to build the tree for the party and docket tables
+        - prior_case (dict): the already-parsed data for this case, if case is a docket update to be merged into it
+            (see process_docket_updates)
+        - timings (dict): if given, the time spent in each stage is added to it, along with the input size and docket length
+            (see stage_timing.py)
+        - stream_min_bytes (int): if given, single-html dockets at least this big have their docket table parsed a row at
+            a time straight from the file, rather than reading the whole file and building a tree of it (see docket_stream.py)
     Output:
         case_data - dictionary
     '''
+    timer = stage_timer(timings)
+
     # Use the first file to pull the case name etc
     fname = case['docket_paths'][0]
 
     #Get the basic case info
     case_data = {}
-    case_data['case_id'] = ftools.colonize(fname.stem)
+    case_data['case_id'] = prior_case['case_id'] if prior_case else ftools.colonize(fname.stem) # (update filenames have an _{ind} suffix)
     case_data['case_type'] = ftools.decompose_caseno(case_data['case_id']).get('case_type')
 
     dlcourt = fname.parents[2].name
@@ -693,22 +1130,29 @@ def process_html_file(case, member_cases, court=None):
     case_data['ucid'] = dtools.ucid(case_data['court'], case_data['case_id'])
 
     #Read the html page data
+    streamed = None
     if len(case['docket_paths']) == 1:
         extra_case_data = {}
         try:
-            try:
-                html_text = open(fname, 'r', encoding='utf-8').read()
-            except:
-                html_text = open(fname, 'r', encoding='windows-1252').read()
+            if stream_min_bytes is not None and fname.stat().st_size >= stream_min_bytes:
+                streamed = docket_stream.split_docket_file(fname)
+            if streamed:
+                # Leave the docket table out of the text and the tree, its rows are read from the file by parse_docket_stream
+                html_text = streamed.head + streamed.tail
+                html_encodings = [streamed.encoding]
+            else:
+                html_text, encoding = ftools.read_html_text(fname)
+                html_encodings = [encoding]
 
             # chop off the member cases list
             mem_beg,mem_end = ftools.get_member_list_span(html_text)
             if mem_beg:
                 member_cases_found = True
-                soup = bs(html_text[:mem_beg]+html_text[mem_end:], 'html.parser')
+                tree_text = html_text[:mem_beg]+html_text[mem_end:]
             else:
                 member_cases_found = False
-                soup = bs(html_text, 'html.parser')
+                tree_text = html_text
+            soup = lxml_backend.build_tree(tree_text) if backend=='lxml' else bs(tree_text, 'html.parser')
 
         except: # this used to catch UnicodeDecodeErrors, but that was solved with the alternate windows-1252 encoding
             member_cases_found = False
@@ -718,58 +1162,29 @@ def process_html_file(case, member_cases, court=None):
     else:
         # When there are case updates or recap input
         soup, extra_case_data = ftools.docket_aggregator(case['docket_paths'])
+        html_encodings = extra_case_data['html_encodings']
         html_text = soup.decode(formatter='html')
+        if backend=='lxml':
+            soup = lxml_backend.build_tree(html_text)
         if 'Member cases:' in html_text:
             member_cases_found = True
             mem_beg,mem_end = ftools.get_member_list_span(html_text)
         else:
             member_cases_found = False
 
-    # prevent erroneous matches in the docket text
-    html_non_docket = html_text.split('Docket Text')[0] if 'Docket Text' in html_text else html_text
+    if timings is not None:
+        timings['input_bytes'] = timings.get('input_bytes', 0) + sum(Path(fpath).stat().st_size for fpath in case['docket_paths'])
+    timer.lap('read')
 
-    case_data['city'] = get_city(html_non_docket)
-    case_data['header_case_id'] = re_existence_helper( re_header_case_id.search(html_non_docket) )
-    case_data['filing_date'] = re_existence_helper( re_fdate.search(html_non_docket) )
-    case_data['terminating_date'] = re_existence_helper( re_tdate.search(html_non_docket) )
-    if case_data['terminating_date'] == None:
-        case_data['case_status'] = 'open'
+    # prevent erroneous matches in the docket text
+    if streamed:
+        html_non_docket = streamed.head + streamed.table_prefix
     else:
-        case_data['case_status'] = 'closed'
-
-    # Use nos_matcher to try to match nature of suit based on code (or fuzzy match text)
-    nature_suit_raw = generic_re_existence_helper( re_nature.search(html_non_docket), 'Suit: ', -1, maxsplit=1)
-    nature_suit_matched = dei.nos_matcher(nature_suit_raw, short_hand=True)
-    # Use the matched code if found, otherwise keep the raw string
-    case_data['nature_suit'] = nature_suit_matched or nature_suit_raw
+        html_non_docket = html_text.split('Docket Text')[0] if 'Docket Text' in html_text else html_text
+    # find all of the header fields in one pass
+    case_data.update(parse_header_fields(html_non_docket, case_data['case_type']))
 
-    case_data['jury_demand'] = generic_re_existence_helper( re_jury.search(html_non_docket), 'Jury Demand: ', -1)
-    case_data['cause'] = generic_re_existence_helper( re_cause.search(html_non_docket), 'Cause: ', -1)
-    case_data['jurisdiction'] = generic_re_existence_helper( re_jurisdiction.search(html_non_docket), 'Jurisdiction: ', -1)
-    case_data['monetary_demand'] = generic_re_existence_helper( re_demand.search(html_non_docket), 'Demand: ', -1)
-
-    lead_case_pacer_id, lead_case_id = get_lead_case(html_non_docket)
-    case_data['lead_case_pacer_id'] = lead_case_pacer_id
-    case_data['lead_case_id'] = lead_case_id
-
-    related_cases = generic_re_existence_helper( re_related.search(html_non_docket), ':', -1, maxsplit=1)
-    case_data['related_cases'] = list(map(dtools.line_cleaner, related_cases.split('\n'))) if related_cases else []
-    other_court = generic_re_existence_helper( re_other_court.search(html_non_docket), ':', -1, maxsplit=1)
-    case_data['other_courts'] = list(map(dtools.line_cleaner, other_court.split('\n'))) if other_court else []
-    mag_case_ids = generic_re_existence_helper( re_mag_judge.search(html_non_docket), ':', -1, maxsplit=1)
-    case_data['magistrate_case_ids'] = list(map(dtools.line_cleaner, mag_case_ids.split('\n'))) if mag_case_ids else []
-    # judge_panel = generic_re_existence_helper( re_judge_panel.search(html_non_docket), 'Panel:', -1)
-    # case_data['judge_panel'] = list(map(dtools.line_cleaner, judge_panel.split('\n'))) if judge_panel else []
-    filed_in_error_text = re_filed_in_error_text.search(html_non_docket)
-    case_data['filed_in_error_text'] = dtools.line_detagger(filed_in_error_text.group()) if filed_in_error_text else None
-    case_flags = dei.get_case_flags(html_non_docket)
-    case_data['case_flags'] = case_flags.split(",") if case_flags else []
-
-    # zero out these fields for criminal cases, since they appear on a per-defendant basis in those cases
-    if case_data['case_type'] == 'cv':
-        case_data['judge'], case_data['referred_judges'], case_data['appeals_case_ids'] = process_defendant_header_fields(html_non_docket)
-    else:
-        case_data['judge'], case_data['referred_judges'], case_data['appeals_case_ids'] = None, [], []
+    timer.lap('header')
 
     # Other fields depend on case type (case name, parties, counts...)
     if case_data['case_type'] != 'cr' and case_data['case_type'] != 'cv':
@@ -780,7 +1195,10 @@ def process_html_file(case, member_cases, court=None):
         is_cr = bool(case_data['case_type'] == 'cr')
         title_regex = re_cr_title.search(html_non_docket) if is_cr else re_cv_title.search(html_non_docket)
         try:
-            tables = soup.select('div > table[cellspacing="5"]')
+            if backend=='lxml':
+                tables = lxml_backend.select_party_tables(soup)
+            else:
+                tables = soup.select('div > table[cellspacing="5"]')
             party_table = ''.join([str(x) for x in tables[1:]]) if is_cr else str(tables[1]) # crim cases have more tables
         except: # when this happens, it's usually on a docket that was opened in error & that reads 'Sorry, no party found'
             if 'no party found' not in html_text: # but if that's not the case, print some info; otherwise, fail silently
@@ -788,17 +1206,41 @@ def process_html_file(case, member_cases, court=None):
             party_table = None
         case_data['parties'] = [] if party_table is None else process_parties_and_counts(party_table, is_cr)
     case_data['case_name'] = dtools.line_cleaner(generic_re_existence_helper( title_regex, 'Case title: ', -1 ))
+    timer.lap('parties')
 
     # Now the docket
     case_data['docket'], case_data['docket_available'] = [], False
-    no_docket_headers = [x for x in soup.find_all('h2') if re.search(ftools.re_no_docket, x.text)]
-    if not no_docket_headers:
-        docket_table = dei.identify_docket_table(soup)
-        if docket_table:
-            case_data['docket'] = parse_docket(docket_table, 'BACKWARDS_DOCKET' in html_text and len(case['docket_paths'])==1)
+    reverse_docket = (streamed.backwards if streamed else 'BACKWARDS_DOCKET' in html_text) and len(case['docket_paths'])==1
+    docket_kwargs = {}
+    if prior_case:
+        docket_kwargs = {'prior_line_docs': line_docs_from_docket(prior_case['docket']), 'ind_offset': len(prior_case['docket'])}
+    if streamed:
+        no_docket = lxml_backend.has_no_docket_header(soup, ftools.re_no_docket) if backend=='lxml' else \
+            any(re.search(ftools.re_no_docket, x.text) for x in soup.find_all('h2'))
+        if not no_docket:
+            case_data['docket'] = parse_docket_stream(streamed, reverse_docket, **docket_kwargs)
             case_data['docket_available'] = True
-
-    ### Store member cases in a csv
+    elif backend=='lxml':
+        docket_table = lxml_backend.identify_docket_table(soup, ftools.re_no_docket)
+        if docket_table is not None:
+            case_data['docket'] = parse_docket_lxml(docket_table, reverse_docket, **docket_kwargs)
+            case_data['docket_available'] = True
+    else:
+        no_docket_headers = [x for x in soup.find_all('h2') if re.search(ftools.re_no_docket, x.text)]
+        if not no_docket_headers:
+            docket_table = dei.identify_docket_table(soup)
+            if docket_table:
+                case_data['docket'] = parse_docket(docket_table, reverse_docket, **docket_kwargs)
+                case_data['docket_available'] = True
+    if prior_case:
+        case_data['docket'] = merge_docket_rows(prior_case['docket'], case_data['docket'])
+        case_data['docket_available'] = case_data['docket_available'] or prior_case['docket_available']
+
+    if timings is not None:
+        timings['n_docket_entries'] = len(case_data['docket'])
+    timer.lap('docket')
+
+    ### Store member cases in the member link store
     if member_cases_found:
         if case_data['lead_case_id']:
             case_data['member_case_key'] = dtools.ucid(case_data['court'], case_data['lead_case_id'])
@@ -806,7 +1248,7 @@ def process_html_file(case, member_cases, court=None):
             # If member case list but no lead case listed, this case must be the lead case
             case_data['member_case_key'] = case_data['ucid']
 
-        if case_data['member_case_key'] not in member_cases.keys():
+        if case_data['member_case_key'] not in member_cases:
             # If we haven't seen this lead case before, we need to store it
             new_members_list = get_member_cases(html_text[mem_beg:mem_end], case_data['court'])
             if new_members_list:
@@ -816,6 +1258,8 @@ def process_html_file(case, member_cases, court=None):
     else:
         case_data['member_case_key'] = None
 
+    timer.lap('members')
+
     ### MDL/MULTI
     case_data['mdl_code'] , case_data['mdl_id_source'] = get_mdl_code(case_data)
     # Is an mdl if we have a code OR if an 'MDL' or 'MDL_<description>' flag exists
@@ -835,6 +1279,11 @@ def process_html_file(case, member_cases, court=None):
     case_data['source'] = 'pacer'
     case_data['recap_id'] = None
 
+    # The encoding(s) the docket html(s) were read with (see ftools.read_html_text), e.g. 'utf-8' or 'utf-8,windows-1252'
+    if prior_case and prior_case.get('html_encoding'):
+        html_encodings = prior_case['html_encoding'].split(',') + html_encodings
+    case_data['html_encoding'] = ','.join(dict.fromkeys(html_encodings))
+
     # Scraper stamp data
     stamp_data = dtools.parse_stamp(html_text)
     case_data['download_url'] = stamp_data.get('download_url')
@@ -854,15 +1303,46 @@ def process_html_file(case, member_cases, court=None):
             case_data['source'] = 'pacer,recap'
             case_data['recap_id'] = extra_case_data.get('recap_id')
 
+    timer.lap('other')
+
     # Get summary data if available
     if pd.isna(case['summary_path']):
         case_data['summary'] = {}
     else:
-        summary_html = open(case['summary_path']).read()
+        summary_html, _ = ftools.read_html_text(case['summary_path'])
         summary_data = {}
         d, summary_data = SummaryPipeline.process(summary_html, summary_data)
         case_data['summary'] = summary_data
+    timer.lap('summary')
+
+    return case_data
+
+
 
+
+def process_docket_updates(case, update_paths, prior_case, member_cases, court=None, backend='bs4', timings=None, stream_min_bytes=None):
+    '''
+    Parse only the new docket update htmls for a case and merge their docket rows into the case's existing data,
+    rather than re-aggregating and reparsing every docket report for the case
+    (the header fields, transaction data etc. come from the newest update, as they would from the aggregated docket)
+
+    Inputs:
+        - case (dict): dict with 'docket_paths':tuple (all of the case's dockets), 'summary_path':Path
+        - update_paths (list): the new update htmls (the end of case['docket_paths']), see ParseManifest.new_update_paths
+        - prior_case (dict): the case data from the last parse of the case
+        - member_cases, court, backend, timings, stream_min_bytes: as for process_html_file
+    Output:
+        case_data - dictionary, or None if an update couldn't be read
+    '''
+    case_data = prior_case
+    for update_path in update_paths:
+        update_case = {**case, 'docket_paths': (Path(update_path),)}
+        case_data = process_html_file(update_case, member_cases, court=court, backend=backend, prior_case=case_data, timings=timings,
+            stream_min_bytes=stream_min_bytes)
+        if case_data is None:
+            return None
+
+    case_data['n_docket_reports'] = len(case['docket_paths'])
     return case_data
 
 
@@ -873,24 +1353,85 @@ def process_html_file(case, member_cases, court=None):
 ####################
 
 
-def case_runner(case, output_dir, court, debug, force_rerun, count, member_df, log_parsed):
+def load_prior_case(ucid, outname, sink=None):
+    ''' Load the existing parsed data for a case (from the shards if a ShardSink is in use), returns None if it can't be read '''
+    try:
+        json_text = shard_store.load_json_text(ucid, sink.shard_dir) if sink else open(outname, 'rb').read()
+        return case_json.loads(json_text) if json_text else None
+    except (OSError, ValueError):
+        return None
+
+
+def case_runner(case, output_dir, court, debug, force_rerun, count, member_df, log_parsed, backend='bs4', manifest=None, sink=None,
+    merge_updates=False, timings_path=None, stream_min_bytes=None, journal=None, violations_path=None):
     '''
     Case parser management
+    (if a ParseManifest is supplied, cases whose inputs and parser version haven't changed since their last parse are skipped,
+    and if a ShardSink is supplied, cases are appended to its shards rather than written to their own json files;
+    with merge_updates, cases whose only change is new docket updates just have those updates merged into their existing data;
+    with a timings_path, the time spent in each stage of each parsed case is appended to that csv, see stage_timing.py;
+    dockets of at least stream_min_bytes are parsed in bounded memory, see docket_stream.py;
+    if a ParseJournal is supplied, the outcome of the case is recorded in it, see parse_journal.py;
+    with a violations_path, the case is validated against the case schema and any violations are appended to that csv, see schema_validation.py)
+    A parsed case is only written if its output has changed (so a forced rerun doesn't touch the files, or mtimes, of cases whose
+    output is the same), and json files are written atomically; the parsed cases are counted as written or unchanged accordingly
+    A case that raises an exception or can't be read is counted as failed and nothing is written for it (in debug mode, the
+    exception is re-raised once it has been recorded)
     '''
+    def _fail(error, error_type=None, message=None):
+        count['failed'] +=1
+        print(message or f"ERROR: failed to parse {case['ucid']} ({error_type or type(error).__name__}: {error})")
+        if journal:
+            journal.record(case['ucid'], parse_journal.FAILED, error, error_type=error_type)
+
     # Get the output path
     case_fname = Path(case['docket_paths'][0]).stem
     outname = ftools.get_expected_path(ucid=case['ucid'], manual_subdir_path=output_dir)
+    is_stale, manifest_state = manifest.check(case) if manifest else (False, None)
+    exists = sink.contains(case['ucid']) if sink else outname.exists()
 
-    if force_rerun or not outname.exists(): # Check whether the output file exists already
-        case_data = process_html_file(case, member_df, court = court)
+    if force_rerun or is_stale or not exists: # Check whether the output file exists already
+        update_paths = manifest.new_update_paths(case) if (merge_updates and is_stale and exists and not force_rerun) else None
+        prior_case = load_prior_case(case['ucid'], outname, sink) if update_paths else None
+        timings = {} if timings_path else None
         try:
-            outname.parent.mkdir(exist_ok=True)
-            with open(Path(outname).resolve(), 'w+') as outfile:
-                json.dump(case_data, outfile)
-        except: # occasionally getting a permissions error while writing, although this should be fixed now
-            print(f"ERROR: couldn't write json for case {case_fname} ({sys.exc_info()[0]})")
+            if prior_case:
+                case_data = process_docket_updates(case, update_paths, prior_case, member_df, court = court, backend = backend, timings = timings,
+                    stream_min_bytes = stream_min_bytes)
+            else:
+                case_data = process_html_file(case, member_df, court = court, backend = backend, timings = timings, stream_min_bytes = stream_min_bytes)
+        except Exception as e:
+            _fail(e)
+            if debug:
+                raise
+            return
+        if case_data is None: # (the reason has already been printed by process_html_file)
+            _fail('the html could not be read', error_type='NoCaseData')
+            return
+
+        timer = stage_timer(timings)
+        if violations_path:
+            schema_validation.append_violations(violations_path, case['ucid'], schema_validation.get_validator().validate(case_data))
+            timer.lap('validate')
+        try:
+            if sink:
+                outname, written = sink.write(case['ucid'], case_data, skip_unchanged=True)
+            else:
+                outname.parent.mkdir(exist_ok=True)
+                written = case_json.dump(case_data, Path(outname).resolve(), skip_unchanged=True)
+            if manifest:
+                manifest.record(case, manifest_state)
+        except Exception as e: # occasionally getting a permissions error while writing, although this should be fixed now
+            _fail(e, message=f"ERROR: couldn't write json for case {case_fname} ({type(e)})")
+            return
+        if timings_path:
+            timer.lap('write')
+            stage_timing.append_timings(timings_path, case['ucid'], timings)
         count['parsed'] +=1
-        print(f"Parsed: {outname}")
+        count['written' if written else 'unchanged'] +=1
+        if journal:
+            journal.record(case['ucid'], parse_journal.PARSED)
+        print(f"Parsed: {outname}" + ('' if written else ' (unchanged)'))
 
         if log_parsed:
 
@@ -916,55 +1457,205 @@ def case_runner(case, output_dir, court, debug, force_rerun, count, member_df, l
                 writer.writerow(log_line)
     else:
         if debug:
-            case_data = process_html_file(case, member_df, court = court)
+            case_data = process_html_file(case, member_df, court = court, backend = backend)
         count['skipped'] +=1
+        if journal:
+            journal.record(case['ucid'], parse_journal.SKIPPED)
         print(f"Skipped: {outname}")
 
 
-async def parse_async(n_workers, cases, output_dir, court, debug, force_rerun, count, member_df, log_parsed):
-    ''' Run parsing asynchronously'''
-
+async def parse_async(n_workers, cases, output_dir, court, debug, force_rerun, count, member_df, log_parsed, **runner_kwargs):
+    '''
+    Run parsing asynchronously (runner_kwargs are passed through to case_runner)
+    cases can be any iterable (e.g. the generator from dtools.iter_case_groups): cases are only taken from it as workers
+    free up, with at most MAX_PENDING_PER_WORKER per worker queued at a time
+    '''
     with ThreadPoolExecutor(max_workers=n_workers) as executor:
         loop = asyncio.get_running_loop()
-        tasks = (
-            loop.run_in_executor(executor, case_runner, *(case, output_dir, court, debug, force_rerun, count, member_df, log_parsed))
-            for case in cases
-        )
-        asyncio.gather(*tasks)
+        pending = set()
+        for case in cases:
+            if len(pending) >= n_workers * MAX_PENDING_PER_WORKER:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+            pending.add(loop.run_in_executor(executor, functools.partial(case_runner,
+                case, output_dir, court, debug, force_rerun, count, member_df, log_parsed, **runner_kwargs)))
+        await asyncio.gather(*pending)
+
+
+def chunk_runner(chunk, output_dir, court, debug, force_rerun, member_df, log_parsed, **runner_kwargs):
+    '''
+    Run case_runner over a chunk of cases inside a worker process
+    Output:
+        count (dict): the tally for this chunk (see COUNT_KEYS), to be summed up by the parent process
+        unknown_roles (Counter): the role titles this chunk found that aren't in the role mappings, see PartyParserContext
+    '''
+    count = dict.fromkeys(COUNT_KEYS, 0)
+    for case in chunk:
+        case_runner(case, output_dir, court, debug, force_rerun, count, member_df, log_parsed, **runner_kwargs)
+    return count, get_party_context().pop_unknown_roles()
+
+
+def parse_multiprocess(n_workers, cases, output_dir, court, debug, force_rerun, count, member_df, log_parsed, **runner_kwargs):
+    '''
+    Run parsing across a pool of processes (sidesteps the GIL, since parsing is mostly CPU-bound soup/regex work)
+    The member link store is passed to each worker (which opens its own connection to it), and each worker returns its own tally,
+    which is merged into count as chunks complete (and its unknown role titles, which are merged into this process's PartyParserContext)
+    cases can be any iterable: chunks are only taken from it as workers free up, as with parse_async
+    '''
+    def _merge(futures):
+        for future in futures:
+            chunk_count, unknown_roles = future.result()
+            for k,v in chunk_count.items():
+                count[k] += v
+            get_party_context().add_unknown_roles(unknown_roles)
+
+    cases = iter(cases)
+    chunks = iter(lambda: list(itertools.islice(cases, PROCESS_CHUNKSIZE)), [])
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        pending = set()
+        for chunk in chunks:
+            if len(pending) >= n_workers * MAX_PENDING_PER_WORKER:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                _merge(done)
+            pending.add(executor.submit(chunk_runner, chunk, output_dir, court, debug, force_rerun, member_df, log_parsed, **runner_kwargs))
+        _merge(wait(pending).done)
+
+
+def case_size(case):
+    ''' The total size in bytes of a case's docket files (used to schedule the longest dockets first) '''
+    size = 0
+    for fpath in case['docket_paths']:
+        try:
+            size += os.stat(fpath).st_size
+        except OSError:
+            pass
+    return size
+
+
+_court_runs = {} # the per-court settings of a scheduled run (see parse_scheduled), set in each worker by _init_scheduled_worker
+
+def _init_scheduled_worker(court_runs):
+    global _court_runs
+    _court_runs = court_runs
+
+
+def scheduled_case_runner(court_key, case, debug, member_df):
+    '''
+    Run case_runner on one case of a scheduled run, with the settings of its court
+    Output:
+        court_key (str), count (dict): the court and its tally for this case (see COUNT_KEYS)
+        unknown_roles (Counter): the role titles found that aren't in the role mappings, see PartyParserContext
+    '''
+    run = _court_runs[court_key]
+    count = dict.fromkeys(COUNT_KEYS, 0)
+    case_runner(case, run['output_dir'], run['court'], debug, run['force_rerun'], count, member_df, run['log_parsed'], **run['runner_kwargs'])
+    return court_key, count, get_party_context().pop_unknown_roles()
+
+
+def parse_scheduled(n_workers, engine, court_runs, member_df, debug, on_court_done):
+    '''
+    Run the cases of many courts through a single pool of workers, longest dockets first, rather than court by court
+    (so that the big courts are started straight away and the small ones fill in around them, with no workers left idle
+    at the end of each court)
+    Inputs:
+        - n_workers (int): the size of the pool, shared by all of the courts
+        - engine ('thread' or 'process'): whether the workers are threads or processes
+        - court_runs (dict): court key -> the court's settings and cases, as from parse's _prepare_court (each court's
+            'count' is updated as its cases complete)
+        - member_df (MemberLinkStore): the member link store
+        - debug (bool): passed through to case_runner
+        - on_court_done (function): called with each court key once all of the court's cases have completed
+    '''
+    settings_keys = ('court', 'output_dir', 'force_rerun', 'log_parsed', 'runner_kwargs')
+    worker_runs = {key: {k: run[k] for k in settings_keys} for key,run in court_runs.items()} # (the cases aren't needed by the workers)
+
+    # (ordering by size needs every court's cases up front, so they're all gathered here)
+    jobs, remaining = [], {}
+    for key,run in court_runs.items():
+        court_jobs = [(case_size(case), key, case) for case in run['cases']]
+        remaining[key] = len(court_jobs)
+        jobs.extend(court_jobs)
+    jobs.sort(key=lambda job: -job[0])
+    print(f"\nScheduling {len(jobs):,} cases from {len(court_runs):,} courts across {n_workers} workers, longest dockets first")
+    for key,n in remaining.items():
+        if not n:
+            on_court_done(key)
+
+    Executor = ProcessPoolExecutor if engine == 'process' else ThreadPoolExecutor
+    with Executor(max_workers=n_workers, initializer=_init_scheduled_worker, initargs=(worker_runs,)) as executor:
+        futures = [executor.submit(scheduled_case_runner, key, case, debug, member_df) for _,key,case in jobs]
+        del jobs
+        for future in as_completed(futures):
+            key, case_count, unknown_roles = future.result()
+            for k,v in case_count.items():
+                court_runs[key]['count'][k] += v
+            get_party_context().add_unknown_roles(unknown_roles)
+            remaining[key] -= 1
+            if not remaining[key]:
+                on_court_done(key)
 
 
 def parse(input_dir, output_dir, summaries_dir, court=None, all_courts=False, debug=False,
-    force_rerun=False, force_ucids=None, n_workers=16, log_parsed=False, recap_file=None):
+    force_rerun=False, force_ucids=None, n_workers=16, log_parsed=False, recap_file=None, engine='thread', backend='bs4', incremental=False, output_format='json',
+    merge_updates=False, time_stages=False, stream_threshold=None, resume=False, retry_failed=False, validate=False, compact_shards=False,
+    journal_path=None, manifest_path=None):
+
+    # The journal of the run's case outcomes goes in the output directory (the parent of the court directories in all-court mode)
+    if journal_path:
+        journal_path = Path(journal_path).resolve()
+    elif all_courts:
+        journal_path = Path(output_dir or input_dir).resolve()/JOURNAL_FNAME
+    else:
+        journal_path = (Path(output_dir).resolve() if output_dir else (Path(input_dir).resolve().parent/'json'))/JOURNAL_FNAME
+    journal_path.parent.mkdir(parents=True, exist_ok=True)
+    journal = ParseJournal(journal_path)
+    if not (resume or retry_failed):
+        journal.reset()
 
-    if all_courts:
-        print('\nAll-court mode enabled')
-    for current_court in COURTS_94 if all_courts else [court]:
-        if all_courts:
-            print(f'\nRunning on {current_court}...')
+    member_cases = read_member_lead_df()
 
+    def _prepare_court(current_court):
+        ''' Gather a court's cases and set up its outputs, returns the court's settings and cases (or None if there's nothing to do) '''
         court_input_dir = Path(f'{input_dir}/{current_court}/html' if all_courts else input_dir).resolve()
         court_output_dir = Path(f'{output_dir}/{current_court}/json' if all_courts else output_dir).resolve() if output_dir else (
             court_input_dir.parent/'json').resolve()
         court_summ_dir = Path(f'{summaries_dir}/{current_court}/summaries' if all_courts else summaries_dir).resolve() if summaries_dir else (
             court_input_dir.parent/'summaries').resolve()
 
-        hpaths = Path(court_input_dir).glob('*/*.html')
-        spaths = Path(court_summ_dir).glob('*/*.html')
-        recap_df = None # Recap is deprecated
-
+        court_force_rerun, use_ucids, done_ucids = force_rerun, None, None
         if force_ucids:
-            force_rerun = True
-            force_ucid_series = pd.read_csv(force_ucids, usecols=('ucid',), squeeze=True) # Filter cases by ucids of interest
+            court_force_rerun = True
+            use_ucids = pd.read_csv(force_ucids, usecols=('ucid',), squeeze=True) # Filter cases by ucids of interest
             if all_courts:
-                force_ucid_series = [x for x in list(force_ucid_series) if x.split(';;')[0]==current_court] # confine to ucids in current court
-            cases = dtools.group_dockets(hpaths, court=current_court, use_ucids=force_ucid_series, summary_fpaths=spaths, recap_df=recap_df)
-        else:
-            cases = dtools.group_dockets(hpaths, court=current_court, summary_fpaths=spaths, recap_df=recap_df)
-
-        count = {'skipped':0, 'parsed': 0}
-
-        member_cases = read_member_lead_df()
-
+                use_ucids = [x for x in list(use_ucids) if x.split(';;')[0]==current_court] # confine to ucids in current court
+
+        journal_court = current_court or court_input_dir.parent.name
+        if retry_failed:
+            # Only reparse the cases that failed in the journalled run
+            failed_ucids = journal.ucids(journal_court, status=parse_journal.FAILED)
+            use_ucids = failed_ucids if use_ucids is None else failed_ucids.intersection(use_ucids)
+            if not use_ucids:
+                print(f"No failed cases to retry in {journal_court}")
+                return None
+            court_force_rerun = True
+        elif resume:
+            # Pick up where the journalled run stopped: skip finished courts, and cases that already have an outcome
+            if journal.is_finished(journal_court):
+                print(f"Already finished {journal_court} in the run being resumed, skipping")
+                return None
+            done_ucids = journal.ucids(journal_court)
+            if done_ucids:
+                print(f"Resuming {journal_court}: skipping the {len(done_ucids):,} cases already done")
+        journal.start(journal_court)
+
+        # The cases are found and grouped a year directory at a time as they're needed (Recap input is deprecated, see dtools.group_dockets)
+        cases = dtools.iter_case_groups(court_input_dir, court=current_court, summaries_dir=court_summ_dir, use_ucids=use_ucids)
+        if done_ucids:
+            cases = (case for case in cases if case['ucid'] not in done_ucids)
+
+        logpath = None
         if log_parsed:
             # Inititate the file (will overwrite file with same name) and write the headers
             if all_courts:
@@ -978,20 +1669,92 @@ def parse(input_dir, output_dir, summaries_dir, court=None, all_courts=False, de
             with open(logpath, 'w') as wfile:
                 csv.writer(wfile).writerow(['ucid', 'fpath'])
 
-        if debug:
-            for case in cases:
-                case_runner(case, court_output_dir, current_court, debug, force_rerun, count, member_cases, log_parsed)
-        else:
-            asyncio.run(parse_async(n_workers, cases, court_output_dir, current_court, debug, force_rerun, count, member_cases, log_parsed))
-
-        n = sum(count.values())
-        print(f"\nProcessed {n:,} cases in {Path(court_output_dir)}:")
-        print(f" - Parsed: {count['parsed']:,}")
+        runner_kwargs = {'backend': backend, 'journal': journal}
+        if stream_threshold is not None:
+            runner_kwargs['stream_min_bytes'] = int(stream_threshold * 1e6)
+        if incremental or merge_updates:
+            court_output_dir.mkdir(parents=True, exist_ok=True)
+            court_manifest_path = Path(manifest_path).resolve() if manifest_path else court_output_dir/MANIFEST_FNAME
+            court_manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            runner_kwargs['manifest'] = ParseManifest(court_manifest_path, PARSER_VERSION)
+            runner_kwargs['merge_updates'] = merge_updates
+        if output_format != 'json':
+            runner_kwargs['sink'] = ShardSink(court_output_dir, current_court)
+        if time_stages:
+            # The sidecar goes next to the --log-parsed log (or in the log directory, named for the court)
+            timings_path = logpath.with_name(f'{logpath.stem}_timings.csv') if log_parsed else LOG_DIR/f'stage_timings_{journal_court}.csv'
+            timings_path.parent.mkdir(parents=True, exist_ok=True)
+            stage_timing.init_timings_file(timings_path)
+            runner_kwargs['timings_path'] = timings_path
+        if validate:
+            # Violations are listed in the output directory (kept from the interrupted run when resuming or retrying)
+            violations_path = court_output_dir/schema_validation.VIOLATIONS_FNAME
+            court_output_dir.mkdir(parents=True, exist_ok=True)
+            if not ((resume or retry_failed) and violations_path.exists()):
+                schema_validation.init_violations_file(violations_path)
+            runner_kwargs['violations_path'] = violations_path
+
+        return {'court': current_court, 'journal_court': journal_court, 'output_dir': court_output_dir, 'cases': cases,
+            'force_rerun': court_force_rerun, 'logpath': logpath, 'log_parsed': logpath.name if logpath else log_parsed,
+            'runner_kwargs': runner_kwargs, 'count': dict.fromkeys(COUNT_KEYS, 0)}
+
+    def _report_court(run):
+        ''' Print a court's tally and finish off its outputs '''
+        count, runner_kwargs = run['count'], run['runner_kwargs']
+        n = count['parsed'] + count['skipped'] + count['failed']
+        print(f"\nProcessed {n:,} cases in {Path(run['output_dir'])}:")
+        print(f" - Parsed: {count['parsed']:,} (written {count['written']:,}, unchanged {count['unchanged']:,})")
         print(f" - Skipped: {count['skipped']:,}")
-        if log_parsed:
-            print(f"Table of successfully parsed cases at: {logpath.resolve()}")
+        print(f" - Failed: {count['failed']:,}")
+        if count['failed']:
+            error_counts = journal.failures(run['journal_court'])['error_type'].fillna('unknown').value_counts()
+            print('   ' + ', '.join(f"{error_type} {n:,}" for error_type, n in error_counts.items()))
+            print(f"   (listed in {journal.db_path}; rerun with --retry-failed to reparse just these)")
+        journal.finish(run['journal_court'])
+        if run['logpath']:
+            print(f"Table of successfully parsed cases at: {run['logpath'].resolve()}")
+        if compact_shards and 'sink' in runner_kwargs:
+            print(f"Shards compacted: {runner_kwargs['sink'].compact()}")
+        if output_format == 'parquet':
+            parquet_path = runner_kwargs['sink'].write_parquet()
+            print(f"Flat case-level fields written to: {parquet_path}" if parquet_path else "No cases in the shards, so no Parquet table written")
+        if 'timings_path' in runner_kwargs:
+            stage_timing.summarise_timings(runner_kwargs['timings_path'], parquet=(output_format == 'parquet'))
+        if 'violations_path' in runner_kwargs:
+            schema_validation.summarise_violations(runner_kwargs['violations_path'], count['parsed'])
+
+    if all_courts and not debug:
+        # Queue up the cases of every court and run them through one pool of workers
+        print('\nAll-court mode enabled')
+        court_runs = {}
+        for current_court in COURTS_94:
+            run = _prepare_court(current_court)
+            if run:
+                court_runs[run['journal_court']] = run
+        parse_scheduled(n_workers, engine, court_runs, member_cases, debug, on_court_done=lambda key: _report_court(court_runs[key]))
+
+    else:
+        if all_courts:
+            print('\nAll-court mode enabled')
+        for current_court in COURTS_94 if all_courts else [court]:
+            if all_courts:
+                print(f'\nRunning on {current_court}...')
+            run = _prepare_court(current_court)
+            if not run:
+                continue
+
+            run_args = (run['output_dir'], current_court, debug, run['force_rerun'], run['count'], member_cases, run['log_parsed'])
+            if debug:
+                for case in run['cases']:
+                    case_runner(case, *run_args, **run['runner_kwargs'])
+            elif engine == 'process':
+                parse_multiprocess(n_workers, run['cases'], *run_args, **run['runner_kwargs'])
+            else:
+                asyncio.run(parse_async(n_workers, run['cases'], *run_args, **run['runner_kwargs']))
+            _report_court(run)
+
+    report_unknown_roles(get_party_context().pop_unknown_roles())
 
-        tidy_member_cases_df()
 
 
 @click.command()
@@ -1012,12 +1775,49 @@ def parse(input_dir, output_dir, summaries_dir, court=None, all_courts=False, de
                 help='A list of ucids to force rerun on, expects a csv with a "ucid" column')
 @click.option('--n-workers', '-nw', default=16, type=int, show_default=True,
                 help='No. of simultaneous workers to run')
+@click.option('--engine', default='thread', type=click.Choice(['thread', 'process']), show_default=True,
+                help='Run workers as threads, or as processes (faster on multi-core machines, since parsing is CPU-bound)')
+@click.option('--backend', default='bs4', type=click.Choice(['bs4', 'lxml']), show_default=True,
+                help='Library used to build the tree for the party and docket tables (lxml is faster on long dockets)')
+@click.option('--incremental', '-i', default=False, is_flag=True,
+                help='Only reparse cases whose input files or parser version have changed since they were last parsed (tracked in OUTPUT_DIR/parse_manifest.db)')
+@click.option('--merge-updates', default=False, is_flag=True,
+                help='With --incremental (implied): when the only change to a case is new docket update htmls, parse just those '\
+                'and merge their docket rows into the existing json, rather than reparsing the whole case history')
+@click.option('--manifest', 'manifest_path', default=None,
+                help='With --incremental: the sqlite file for the manifest of every court (default: one parse_manifest.db in each '\
+                'court\'s output directory), e.g. on a local disk if the output directory is on a network filesystem')
+@click.option('--output-format', default='json', type=click.Choice(['json', 'jsonl', 'parquet']), show_default=True,
+                help='json: one file per case; jsonl: append cases to gzipped per-year shards in OUTPUT_DIR/shards (indexed by ucid); '\
+                'parquet: as jsonl, plus a Parquet table of the flat case-level fields')
+@click.option('--compact-shards', default=False, is_flag=True,
+                help='With --output-format jsonl/parquet: at the end of each court, rewrite its shards with just the latest copy of each case')
+@click.option('--stream-threshold', default=None, type=float,
+                help='Parse the docket table of any docket html of at least this many MB a row at a time, straight from the file, '\
+                'to keep memory bounded on giant dockets (0 streams every docket)')
+@click.option('--resume', default=False, is_flag=True,
+                help='Continue an interrupted run where it stopped, skipping the courts it finished and the cases it already '\
+                'parsed, skipped or failed (as recorded in the run journal, OUTPUT_DIR/parse_journal.db)')
+@click.option('--retry-failed', default=False, is_flag=True,
+                help='Reparse only the cases that failed in the last run (as recorded in the run journal)')
+@click.option('--journal', 'journal_path', default=None,
+                help='The sqlite file for the run journal (default: OUTPUT_DIR/parse_journal.db), e.g. on a local disk if the output directory is on a network filesystem')
 @click.option('--log-parsed', default=None,
                 help='Name of file to log parsed in /parsers/log/{log-parsed} as csv with columns ucid, fpath')
+@click.option('--time-stages', default=False, is_flag=True,
+                help='Record how long each stage of each parsed case takes, in a csv next to the --log-parsed log, and list the slowest cases at the end')
+@click.option('--validate', default=False, is_flag=True,
+                help='Check each parsed case against the case schemas (parsers/schemas), listing any violations in '\
+                'OUTPUT_DIR/schema_violations.csv and tallying them by field at the end')
 @click.option('--recap-file', default=None, show_default=True,
                 help='Path to csv with recap cases, with columns for ucid and fpath (relative path to recap file)')
 def parser(**kwargs ):
     ''' Parses .html casefiles in INPUT_DIR and puts .json files into the output directory'''
+    if kwargs['resume'] and kwargs['retry_failed']:
+        raise click.UsageError('--resume and --retry-failed cannot be used together')
+    # (checked before parsing starts, rather than failing when the first court's table is written)
+    if kwargs['output_format'] == 'parquet' and not shard_store.parquet_engine():
+        raise click.UsageError('--output-format parquet needs pyarrow or fastparquet installed (pip install pyarrow)')
     parse(**kwargs)
 
 if __name__ == '__main__':
@@ -0,0 +1,199 @@
+'''
+File: schema_validation.py
+Description: Validation of parsed cases against the JSON schemas in parsers/schemas (case_cv_v1, case_cr_v1 and the
+docket entry and party schemas they refer to), for parse_pacer.py's --validate option and tasks/validate_cases.py.
+
+The validation itself is done by jsonschema: a validator is built once per process for each case schema (with the other
+schemas in the directory available to it by their $id) and reused for every case. Before the validators are built the
+schemas are adjusted in two ways, deliberate departures from the letter of JSON Schema:
+    - null is accepted for every field (the schemas give a field's type when it has a value, and the parser writes null
+      for anything it couldn't find), by adding null to every type and enum; pass allow_null=False to be strict
+    - a $ref to a schema that isn't in the schema directory (e.g. the case summary schemas) accepts anything, and is
+      listed in CaseValidator.unresolved_refs
+A violation is reported as a (field, message) pair, where the field is the path to the value with list indices left
+out, e.g. 'parties[].counsel[].phone', so that violations can be tallied by field across cases (a missing required
+field is reported at the field itself, not the object it's missing from).
+'''
+
+import re
+import csv
+import copy
+import threading
+from pathlib import Path
+
+import pandas as pd
+import jsonschema
+
+from support import case_json
+
+SCHEMA_DIR = Path(__file__).resolve().parent / 'schemas'
+CASE_SCHEMAS = {'cv': 'case_cv_v1.schema.json', 'cr': 'case_cr_v1.schema.json'}
+VIOLATIONS_FNAME = 'schema_violations.csv'
+COLUMNS = ['ucid', 'field', 'message']
+
+re_required = re.compile(r"^'(?P<name>.+)' is a required property$")
+
+_write_lock = threading.Lock()
+
+
+def _adjust(node, documents, doc_id, allow_null, unresolved_refs):
+    ''' Adjust a (copy of a) schema in place, as described in the module docstring '''
+    if isinstance(node, list):
+        for item in node:
+            _adjust(item, documents, doc_id, allow_null, unresolved_refs)
+        return
+    if not isinstance(node, dict):
+        return
+
+    if isinstance(node.get('$ref'), str):
+        url = node['$ref'].partition('#')[0] or doc_id
+        if url not in documents:
+            unresolved_refs.add(node['$ref'])
+            del node['$ref']
+    if allow_null:
+        if isinstance(node.get('type'), str) and node['type'] != 'null':
+            node['type'] = [node['type'], 'null']
+        elif isinstance(node.get('type'), list) and 'null' not in node['type']:
+            node['type'] = [*node['type'], 'null']
+        if isinstance(node.get('enum'), list) and None not in node['enum']:
+            node['enum'] = [*node['enum'], None]
+
+    for key, value in node.items():
+        # (enum and const values are data, not schemas)
+        if key not in ('enum', 'const'):
+            _adjust(value, documents, doc_id, allow_null, unresolved_refs)
+
+
+def load_schemas(schema_dir=SCHEMA_DIR, allow_null=True):
+    '''
+    Load the schemas in a directory, adjusted as described in the module docstring
+    Inputs:
+        - schema_dir (str or Path): the directory of *.schema.json files (refs between them are resolved by their $id)
+        - allow_null (bool): whether null passes for every field, whatever its schema
+    Outputs:
+        - documents (dict): the adjusted schemas by $id
+        - fnames (dict): the $id of each schema by file name
+        - unresolved_refs (set): the $refs to schemas that aren't in the directory
+    '''
+    documents, fnames = {}, {}
+    for fpath in sorted(Path(schema_dir).glob('*.schema.json')):
+        document = case_json.load(fpath)
+        documents[document.get('$id', fpath.name)] = document
+        fnames[fpath.name] = document.get('$id', fpath.name)
+
+    unresolved_refs = set()
+    documents = {doc_id: copy.deepcopy(document) for doc_id, document in documents.items()}
+    for doc_id, document in documents.items():
+        _adjust(document, documents, doc_id, allow_null, unresolved_refs)
+    return documents, fnames, unresolved_refs
+
+
+def _json_type(value):
+    ''' The JSON type of a value, for violation messages '''
+    for json_type, py_types in (('null', type(None)), ('boolean', bool), ('number', (int, float)), ('string', str),
+            ('array', list), ('object', dict)):
+        if isinstance(value, py_types):
+            return json_type
+    return type(value).__name__
+
+
+def _violation(error):
+    ''' The (field, message) pair for a jsonschema ValidationError '''
+    field = ''.join('[]' if isinstance(part, int) else (f".{part}" if i else str(part)) for i, part in enumerate(error.absolute_path))
+    field = field.replace('.[]', '[]')
+    message = error.message
+    if error.validator == 'type':
+        types = error.validator_value if isinstance(error.validator_value, list) else [error.validator_value]
+        expected = [t for t in types if t != 'null'] or ['null']
+        message = f"expected {' or '.join(expected)}, got {_json_type(error.instance)}"
+    elif error.validator == 'required':
+        match = re_required.match(message)
+        if match:
+            field, message = (f"{field}.{match['name']}" if field else match['name']), 'missing required field'
+    return field, message
+
+
+class CaseValidator:
+    ''' Validates parsed cases against the civil or criminal case schema (by case_type), with the validators built once '''
+
+    def __init__(self, schema_dir=SCHEMA_DIR, allow_null=True):
+        '''
+        Inputs:
+            - schema_dir (str or Path): the directory of schemas
+            - allow_null (bool): whether null passes for every field, see load_schemas
+        '''
+        documents, fnames, self.unresolved_refs = load_schemas(schema_dir, allow_null=allow_null)
+        self.validators = {}
+        for case_type, fname in CASE_SCHEMAS.items():
+            schema = documents[fnames[fname]]
+            resolver = jsonschema.RefResolver.from_schema(schema, store=documents)
+            validator_cls = jsonschema.validators.validator_for(schema)
+            validator_cls.check_schema(schema)
+            self.validators[case_type] = validator_cls(schema, resolver=resolver)
+
+    def validate(self, case):
+        '''
+        Validate a parsed case
+        Inputs:
+            - case (dict): the case data, as written by parse_pacer.py
+        Output:
+            (list) of (field, message) violations, empty if the case is valid
+        '''
+        validator = self.validators['cr' if case.get('case_type') == 'cr' else 'cv']
+        return [_violation(error) for error in validator.iter_errors(case)]
+
+
+_validator = None
+_validator_lock = threading.Lock()
+
+def get_validator():
+    ''' The CaseValidator for this process (built the first time it's needed) '''
+    global _validator
+    if _validator is None:
+        with _validator_lock:
+            if _validator is None:
+                _validator = CaseValidator()
+    return _validator
+
+
+def init_violations_file(fpath):
+    ''' Create (or overwrite) a violations csv and write its header '''
+    with open(fpath, 'w', newline='') as wfile:
+        csv.writer(wfile).writerow(COLUMNS)
+
+
+def append_violations(fpath, ucid, violations):
+    '''
+    Add a case's violations to a violations csv
+    Inputs:
+        - fpath (str or Path): the csv
+        - ucid (str): the case's ucid
+        - violations (list): (field, message) pairs from CaseValidator.validate
+    '''
+    if not violations:
+        return
+    with _write_lock, open(fpath, 'a', newline='', encoding='utf-8') as wfile:
+        csv.writer(wfile).writerows([ucid, field, message] for field, message in violations)
+
+
+def summarise_violations(violations, n_cases, n_fields=20):
+    '''
+    Print the no. of violations and of cases with violations for each field
+    Inputs:
+        - violations (DataFrame or str/Path): the violations (ucid, field and message columns), or a violations csv
+        - n_cases (int): the no. of cases validated
+        - n_fields (int): no. of fields to list (the most violated first)
+    '''
+    df = violations if isinstance(violations, pd.DataFrame) else pd.read_csv(violations)
+    if not len(df):
+        print(f"\nSchema validation: all {n_cases:,} cases valid")
+        return
+    n_invalid = df.ucid.nunique()
+    print(f"\nSchema validation: {n_invalid:,} of {n_cases:,} cases with violations ({len(df):,} in total)"
+        + ('' if isinstance(violations, pd.DataFrame) else f", listed in {Path(violations).resolve()}"))
+    by_field = df.groupby('field').agg(n_violations=('ucid', 'size'), n_cases=('ucid', 'nunique'), example=('message', 'first'))
+    for field, row in by_field.sort_values('n_cases', ascending=False).head(n_fields).iterrows():
+        print(f" - {field}: {row.n_violations:,} violations in {row.n_cases:,} cases (e.g. {row.example})")
+    if len(by_field) > n_fields:
+        print(f"   ...and {len(by_field) - n_fields:,} more fields")
+
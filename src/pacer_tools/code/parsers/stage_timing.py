@@ -0,0 +1,103 @@
+'''
+File: stage_timing.py
+Description: Optional per-stage timing of parse_pacer.py (enabled with --time-stages), to see which part of the parse
+(reading/soup building, header fields, parties, docket, member cases, summary, validation...) is responsible when a court slows down.
+Each parsed case gets a row in a csv sidecar next to the --log-parsed log, and parse() prints the slowest cases at the end.
+'''
+
+import csv
+import sys
+import time
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from support import shard_store
+
+STAGES = ('read', 'header', 'parties', 'docket', 'members', 'other', 'summary', 'validate', 'write')
+COLUMNS = ['ucid', 'input_bytes', 'n_docket_entries', *STAGES, 'total']
+
+_write_lock = threading.Lock()
+
+
+class StageTimer:
+    '''
+    Accumulates the time spent in each stage of a case's parse into a dict: each call to lap(stage) adds the time since
+    the previous lap (or since the timer was started) to that stage, so repeated stages (e.g. one per docket update) add up
+    '''
+    def __init__(self, timings):
+        '''
+        Inputs:
+            - timings (dict): the dict to accumulate stage times (in seconds) into
+        '''
+        self.timings = timings
+        self.last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + now - self.last
+        self.last = now
+
+
+class NullTimer:
+    ''' A StageTimer stand-in for when timing is switched off '''
+    def lap(self, stage):
+        pass
+
+NULL_TIMER = NullTimer()
+
+
+def stage_timer(timings):
+    ''' A StageTimer accumulating into timings, or the no-op timer if timings is None '''
+    return NULL_TIMER if timings is None else StageTimer(timings)
+
+
+def init_timings_file(fpath):
+    ''' Create (or overwrite) a timings sidecar and write its header '''
+    with open(fpath, 'w', newline='') as wfile:
+        csv.writer(wfile).writerow(COLUMNS)
+
+
+def append_timings(fpath, ucid, timings):
+    '''
+    Add a case's row to a timings sidecar
+    Inputs:
+        - fpath (str or Path): the sidecar csv
+        - ucid (str): the case's ucid
+        - timings (dict): stage times from StageTimer, plus 'input_bytes' and 'n_docket_entries'
+    '''
+    stage_times = [round(timings.get(stage, 0.0), 6) for stage in STAGES]
+    row = [ucid, timings.get('input_bytes'), timings.get('n_docket_entries'), *stage_times, round(sum(stage_times), 6)]
+    with _write_lock, open(fpath, 'a', newline='') as wfile:
+        csv.writer(wfile).writerow(row)
+
+
+def summarise_timings(fpath, n_slowest=10, parquet=False):
+    '''
+    Print the total time per stage and the slowest cases from a timings sidecar
+    Inputs:
+        - fpath (Path): the sidecar csv
+        - n_slowest (int): no. of slowest cases to list
+        - parquet (bool): whether to also write the timings to a .parquet file alongside the csv (requires pyarrow or
+            fastparquet, if neither is installed only the csv is kept)
+    '''
+    df = pd.read_csv(fpath)
+    if not len(df):
+        return
+    if parquet:
+        if shard_store.parquet_engine():
+            df.to_parquet(fpath.with_suffix('.parquet'), index=False)
+        else:
+            print("(no Parquet engine installed, the timings are only in the csv)")
+
+    totals = df[list(STAGES)].sum()
+    print(f"\nStage timings for {len(df):,} cases ({totals.sum():,.1f}s in total) at: {fpath.resolve()}")
+    print('   ' + ', '.join(f"{stage} {secs:,.1f}s ({secs/totals.sum():.0%})" for stage, secs in totals.items() if secs))
+
+    print(f"Slowest {min(n_slowest, len(df))} cases:")
+    for row in df.nlargest(n_slowest, 'total').itertuples():
+        slowest_stage = max(STAGES, key=lambda stage: getattr(row, stage))
+        print(f" - {row.ucid}: {row.total:.2f}s (mostly {slowest_stage}, {getattr(row, slowest_stage):.2f}s), "
+            f"{row.input_bytes:,} bytes, {row.n_docket_entries:,} docket entries")
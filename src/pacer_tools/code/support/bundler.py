@@ -14,6 +14,7 @@ from tqdm.autonotebook import tqdm
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 from support import settings
 from support import data_tools as dtools
+from support import fhandle_tools as ftools
 
 def index_style(additional=''):
     '''
@@ -83,7 +84,7 @@ def bundler(indf, name, notes=None, overwrite=False, anno_col=None):
         if 'pacer' in abs_path.parts and anno_col and row[anno_col]:
             # Load the html text and json data to make the annotated docket
             hpath = dtools.get_pacer_html(abs_path)
-            html_text = open(hpath, 'r', encoding='utf-8').read()
+            html_text, _ = ftools.read_html_text(hpath)
             json_data = dtools.load_case(row.fpath)
             new_html = make_annotated_docket(html_text, json_data, row[anno_col])
 
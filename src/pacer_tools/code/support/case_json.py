@@ -0,0 +1,195 @@
+'''
+File: case_json.py
+Description: The JSON serializer for case files, so that every read and write of a case (parse_pacer.py, data_tools.load_case,
+the shard store, fjc_functions, make_graph_data_pacer...) goes through the same, fastest available, backend.
+
+The backend is the first of orjson, ujson and the standard library json that can be imported, or can be chosen with the
+PACER_JSON_BACKEND environment variable (or set_backend). All three read and write the same data:
+    - orjson and ujson write compact UTF-8 (no spaces after separators, non-ascii characters left unescaped), the
+      standard library writes ascii with escapes; files written by any of them can be read by any of them
+    - text the fast backend can't decode (e.g. the NaN that json.dump writes for a float nan) is handed to the standard
+      library instead, and objects it can't encode (e.g. ints beyond 64 bits) likewise
+    - the one difference: orjson reads ints beyond 64 bits as floats (case files have no such ints)
+Run tasks/verify_case_json.py to check that a set of case files round-trips identically through every installed backend.
+'''
+
+import os
+import json
+import math
+import threading
+
+BACKENDS = ('orjson', 'ujson', 'json')
+ENV_VAR = 'PACER_JSON_BACKEND'
+
+
+class _Backend:
+    ''' The loads/dumps of one backend, normalised to loads(str or bytes) and dumps(obj, indent) -> bytes '''
+    def __init__(self, name):
+        self.name = name
+        if name == 'orjson':
+            import orjson
+            self._loads = orjson.loads
+            # (datetimes and dataclasses are passed through to the standard library, which can't encode them either)
+            options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+            self._dumps = lambda obj, indent: orjson.dumps(obj, option=options | (orjson.OPT_INDENT_2 if indent else 0))
+            self.decode_errors = (orjson.JSONDecodeError,)
+            self.encode_errors = (orjson.JSONEncodeError,)
+        elif name == 'ujson':
+            import ujson
+            self._loads = ujson.loads
+            self._dumps = lambda obj, indent: ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False,
+                indent=indent or 0).encode('utf-8')
+            self.decode_errors = (ValueError,)
+            self.encode_errors = (TypeError, OverflowError)
+        elif name == 'json':
+            self._loads = json.loads
+            self._dumps = lambda obj, indent: json.dumps(obj, indent=indent).encode('utf-8')
+            self.decode_errors = self.encode_errors = ()
+        else:
+            raise ValueError(f"Unknown JSON backend '{name}', expected one of {BACKENDS}")
+
+    def loads(self, text):
+        try:
+            return self._loads(text)
+        except self.decode_errors:
+            return json.loads(text)
+
+    def dumps(self, obj, indent=None):
+        try:
+            return self._dumps(obj, indent)
+        except self.encode_errors:
+            return json.dumps(obj, indent=indent).encode('utf-8')
+
+
+def available_backends():
+    ''' The names of the backends that can be imported here, fastest first '''
+    names = []
+    for name in BACKENDS:
+        try:
+            _Backend(name)
+            names.append(name)
+        except ImportError:
+            continue
+    return names
+
+
+def set_backend(name=None):
+    '''
+    Choose the backend for this process
+    Inputs:
+        - name (str): one of BACKENDS, or None for the PACER_JSON_BACKEND environment variable (if set) or else the fastest available
+    Output:
+        (str) the name of the backend in use
+    '''
+    global _backend
+    name = name or os.environ.get(ENV_VAR)
+    _backend = _Backend(name) if name else _Backend(available_backends()[0])
+    return _backend.name
+
+def get_backend():
+    ''' The name of the backend in use '''
+    return _backend.name
+
+_backend = None
+set_backend()
+
+
+def _nan_to_none(obj):
+    ''' Replace float nans/infs with None throughout a (json-like) object '''
+    if isinstance(obj, float):
+        return None if not math.isfinite(obj) else obj
+    elif isinstance(obj, dict):
+        return {k: _nan_to_none(v) for k,v in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [_nan_to_none(v) for v in obj]
+    return obj
+
+
+def loads(text):
+    '''
+    Decode JSON
+    Inputs:
+        - text (str or bytes): the JSON text (bytes are decoded as UTF-8)
+    Output:
+        the decoded object
+    '''
+    return _backend.loads(text)
+
+def dumpb(obj, indent=None, ignore_nan=False):
+    '''
+    Encode an object as UTF-8 JSON
+    Inputs:
+        - obj: the object to encode
+        - indent (int): pretty-print with this indent (orjson only supports an indent of 2, so any indent is 2 with orjson)
+        - ignore_nan (bool): write float nans/infs as null rather than NaN/Infinity (orjson always writes them as null)
+    Output:
+        (bytes)
+    '''
+    if ignore_nan and _backend.name != 'orjson':
+        obj = _nan_to_none(obj)
+    return _backend.dumps(obj, indent=indent)
+
+def dumps(obj, indent=None, ignore_nan=False):
+    ''' Encode an object as JSON, as a str (same inputs as dumpb) '''
+    return dumpb(obj, indent=indent, ignore_nan=ignore_nan).decode('utf-8')
+
+def load(fpath):
+    '''
+    Read a JSON file
+    Inputs:
+        - fpath (str or Path): the file (read as UTF-8)
+    Output:
+        the decoded object
+    '''
+    with open(fpath, 'rb') as rfile:
+        return loads(rfile.read())
+
+def _has_contents(fpath, data):
+    ''' Whether a file already holds exactly these bytes (the size is checked first, so most changed files aren't read) '''
+    try:
+        if os.stat(fpath).st_size != len(data):
+            return False
+        with open(fpath, 'rb') as rfile:
+            return rfile.read() == data
+    except OSError:
+        return False
+
+def write_atomic(data, fpath):
+    '''
+    Write bytes to a file via a temporary file alongside it that is renamed into place, so that the file is never left
+    half-written (a crash leaves either the old file or the new one, plus at worst a stray .tmp file)
+    Inputs:
+        - data (bytes): the contents
+        - fpath (str or Path): the file to (over)write
+    '''
+    fpath = str(fpath)
+    tmp_path = f"{fpath}.{os.getpid()}-{threading.get_ident()}.tmp" # (unique to the writer, so concurrent writers don't collide)
+    try:
+        with open(tmp_path, 'wb') as wfile:
+            wfile.write(data)
+            wfile.flush()
+            os.fsync(wfile.fileno())
+        os.replace(tmp_path, fpath)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def dump(obj, fpath, indent=None, ignore_nan=False, skip_unchanged=False):
+    '''
+    Write an object to a JSON file, as UTF-8 (atomically, see write_atomic)
+    Inputs:
+        - obj: the object to write
+        - fpath (str or Path): the file to (over)write
+        - indent, ignore_nan: as for dumpb
+        - skip_unchanged (bool): leave the file alone (mtime included) if it already holds exactly this JSON
+    Output:
+        (bool) whether the file was written (False only if skip_unchanged and it was unchanged)
+    '''
+    data = dumpb(obj, indent=indent, ignore_nan=ignore_nan)
+    if skip_unchanged and _has_contents(fpath, data):
+        return False
+    write_atomic(data, fpath)
+    return True
@@ -1,4 +1,5 @@
 # Standard path imports
+import os
 import re
 import sys
 import json
@@ -12,6 +13,7 @@ import pandas as pd
 from pathlib import Path
 from datetime import datetime
 from itertools import chain, groupby
+from collections import defaultdict
 from tqdm.autonotebook import tqdm
 tqdm.pandas()
 
@@ -32,6 +34,8 @@ from support import fhandle_tools as ftools
 from support import lexicon
 from support import party_classification as pc
 from support import party_tagging as pt
+from support import case_json
+from support import shard_store
 
 
 
@@ -902,7 +906,7 @@ def remap_recap_data(recap_fpath=None, rjdata=None, parse_non_cv=False):
         if not rjdata:
             recap_fpath = std_path(recap_fpath)
             jpath = settings.PROJECT_ROOT / recap_fpath
-            rjdata = json.load(open(jpath))
+            rjdata = case_json.load(jpath)
     except Exception as e:
         print(f"Error loading file {recap_fpath}")
         return {}
@@ -1061,6 +1065,7 @@ def unique_filepaths_updater(table_file, update_iter, outfile=None, force=False)
 def convert_filepaths_list(infile=None, outfile=None, file_iter=None, nrows=None):
     '''
     Convert the list of unique filepaths into a DataFrame with metadata and exports to csv
+    The filepaths can be case jsons or docket htmls (htmls are read with the metadata scan, see parsers/metadata_scan.py)
 
     Inputs:
         - infile (str or Path) - the input file, relative to the project root, expects csv with an 'fpath' column
@@ -1092,11 +1097,18 @@ def convert_filepaths_list(infile=None, outfile=None, file_iter=None, nrows=None
     }
 
     properties = list(dmap.keys())
+    from parsers import metadata_scan
 
     def get_properties(fpath):
         ''' Get the year, court and type for the case'''
         try:
-            case = load_case(fpath, skip_scrubbing=True)
+            if Path(fpath).suffix == '.html':
+                hpath = std_path(fpath)
+                if settings.PROJECT_ROOT.name not in hpath.parts:
+                    hpath = settings.PROJECT_ROOT / hpath
+                case = metadata_scan.scan_docket_file(hpath)
+            else:
+                case = load_case(fpath, skip_scrubbing=True)
         except:
             print(f'LOAD_ERROR: error loading case {fpath}')
             return 'LOAD_ERROR'
@@ -1193,12 +1205,10 @@ def load_dockets(court_pull = 'all', year_pull = None):
     output:
         * dockets - list of jsons for case files
     '''
-    import json, sys
-
     paths = load_docket_filepaths_unique(court_pull, year_pull)
     dockets = []
     for fpath in paths:
-        jdata = json.load(open(settings.PROJECT_ROOT + fpath, encoding="utf-8"))
+        jdata = case_json.load(settings.PROJECT_ROOT / fpath)
         dockets.append(jdata)
     return dockets
 
@@ -1242,7 +1252,7 @@ def load_case(fpath=None, html=False, recap_orig=False, ucid=None, skip_scrubbin
         fpath (str or Path): a path relative to the project roots
         html (bool): whether to return the html (only works for Pacer, not Recap)
         recap_orig (bool): whether to return the original recap file, rather than the mapped
-        ucid (str): the ucid of the case to load
+        ucid (str): the ucid of the case to load (if there is no json file for it, looks it up in the parser's shards instead)
         mongo_db (pymongo.database.Database): a pymongo database instance, if provided
             will query the database (either the `cases` collection, or else `cases_html` if html=True)
 
@@ -1271,22 +1281,26 @@ def load_case(fpath=None, html=False, recap_orig=False, ucid=None, skip_scrubbin
     else:
         jpath = settings.PROJECT_ROOT / fpath
 
+    # If there's no json file for this ucid, check whether the parser wrote it to shards instead (see shard_store.py)
+    json_text = None
+    if ucid and not html and not jpath.exists():
+        json_text = shard_store.load_json_text(ucid)
+
     if html:
         hpath = get_pacer_html(jpath)
         if hpath:
-            try:
-                html_text = str( open(settings.PROJECT_ROOT / hpath, 'r', encoding='utf-8').read() )
-            except:
-                html_text = str( open(settings.PROJECT_ROOT / hpath, 'r', encoding='windows-1252').read() )
+            html_text, _ = ftools.read_html_text(settings.PROJECT_ROOT / hpath)
             return html_text if skip_scrubbing else remove_sensitive_info(html_text)
         else:
             raise FileNotFoundError('HTML file not found')
     else:
-        if skip_scrubbing:
-            jdata = json.load(open(jpath, encoding="utf-8"))
+        if json_text is not None:
+            jdata = case_json.loads(json_text if skip_scrubbing else remove_sensitive_info(json_text))
+        elif skip_scrubbing:
+            jdata = case_json.load(jpath)
         else:
             json_text = open(jpath, encoding="utf-8").read()
-            jdata = json.loads(remove_sensitive_info(json_text))
+            jdata = case_json.loads(remove_sensitive_info(json_text))
         jdata['case_id'] = ftools.clean_case_id(jdata['case_id'])
 
         if recap_orig:
@@ -1294,10 +1308,10 @@ def load_case(fpath=None, html=False, recap_orig=False, ucid=None, skip_scrubbin
                 try:
                     recap_id = jdata['recap_id']
                     if skip_scrubbing:
-                        return json.load(open(settings.RECAP_PATH/f"{recap_id}.json", encoding="utf-8"))
+                        return case_json.load(settings.RECAP_PATH/f"{recap_id}.json")
                     else:
                         json_text = open(settings.RECAP_PATH/f"{recap_id}.json", encoding="utf-8").read()
-                        return json.loads(remove_sensitive_info(json_text))
+                        return case_json.loads(remove_sensitive_info(json_text))
                 except:
                     print('Cannot load recap original, returning parsed json instead')
 
@@ -1516,6 +1530,60 @@ def group_dockets(docket_fpaths, court=None, use_ucids=None, summary_fpaths=None
 
     return cases
 
+def _html_names(dir_path):
+    ''' The .html filenames in a directory (same matches as glob('*.html')), in sorted order '''
+    with os.scandir(dir_path) as entries:
+        return sorted(entry.name for entry in entries if entry.name.endswith('.html') and not entry.name.startswith('.') and entry.is_file())
+
+def iter_case_groups(html_dir, court=None, summaries_dir=None, use_ucids=None):
+    '''
+    Stream the cases in a court's html directory, grouped by ucid (as with group_dockets), one subdirectory (year) at a time,
+    so that only one year's filenames are held in memory and the first cases are available straight away
+
+    Inputs:
+        - html_dir (str or Path): the court's html directory, with the docket htmls in subdirectories by year
+        - court (str): the court abbreviation, if none will infer from directory structure
+        - summaries_dir (str or Path): the court's summaries directory, with the summary htmls in the same year subdirectories
+        - use_ucids (list-like): a list of ucids to include. If supplied, any ucids that are not in it are skipped
+    Outputs:
+        - a generator of dicts (in ucid order within each year) with
+            - 'ucid': the case's ucid
+            - 'docket_paths': tuple of paths (in filename order, so updates come after the original docket)
+            - 'summary_path': a single Path (float('nan') if no summary)
+    '''
+    html_dir = Path(html_dir).resolve()
+    if court is None:
+        court = html_dir.parent.name
+    use_ucids = set(use_ucids) if use_ucids is not None else None
+
+    try:
+        with os.scandir(html_dir) as entries:
+            subdirs = sorted(entry.name for entry in entries if entry.is_dir() and not entry.name.startswith('.'))
+    except FileNotFoundError:
+        return
+
+    for subdir in subdirs:
+        docket_names = defaultdict(list)
+        for name in _html_names(html_dir/subdir):
+            case_ucid = ftools.filename_to_ucid(name, court=court)
+            if use_ucids is None or case_ucid in use_ucids:
+                docket_names[case_ucid].append(name)
+        if not docket_names:
+            continue
+
+        summary_paths = {}
+        summ_subdir = Path(summaries_dir).resolve()/subdir if summaries_dir else None
+        if summ_subdir and summ_subdir.is_dir():
+            for name in _html_names(summ_subdir):
+                summary_paths.setdefault(ftools.filename_to_ucid(name, court=court), summ_subdir/name) # (assumes no duplication of summaries)
+
+        for case_ucid in sorted(docket_names):
+            yield {
+                'ucid': case_ucid,
+                'docket_paths': tuple(html_dir/subdir/name for name in docket_names[case_ucid]),
+                'summary_path': summary_paths.get(case_ucid, np.nan)
+            }
+
 # n.b.: compress_data and decompress_data may no longer be needed after updates to parse_pacer.py (11/2/20)
 def compress_data(data):
     '''Compress complex data into a JSON-serializable format (written to generate the 'member_cases' field in JSONs from parse_pacer.py)'''
@@ -1667,7 +1735,7 @@ def gen_recap_id_file(file=None):
     def _get_id_ucid():
         ''' Get the (recap_id, ucid) pairs '''
         for fpath in settings.RECAP_PATH.glob('*.json'):
-            jdata = json.load(open(fpath))
+            jdata = case_json.load(fpath)
             recap_id = fpath.stem
             ucid = ucid(jdata['court'], jdata['docket_number'])
             yield (recap_id, ucid)
@@ -1711,20 +1779,30 @@ def gen_recap_id_file(file=None):
 def jload_n_hash(jpath):
     ''' Load a json file with a '_hash' key that is a python hash (int) of the file string '''
 
-    jstring = open(jpath).read()
+    jstring = open(jpath, encoding='utf-8').read()
     _hash = hash(jstring)
-    jdata = json.loads(jstring)
+    jdata = case_json.loads(jstring)
     jdata['_hash'] = _hash
     return jdata
 
-def get_latest_docket_date(ucid):
+def get_latest_docket_date(ucid, from_htmls=False):
     '''
     Get the filed date of latest docket entry for a single case
     Inputs:
         - ucid (str): case ucid
+        - from_htmls (bool): read the case's docket htmls (the original and any updates) with the metadata scan instead of
+            the case json, for when the json may not have been brought up to date with the latest download (falls back
+            to the json if there's no docket html)
     Output:
         latest_date (str) - returns None if no dates found in docket or case doesn't exist
     '''
+    if from_htmls:
+        hpath = ftools.get_expected_path(ucid=ucid, subdir='html')
+        if hpath.exists():
+            from parsers import metadata_scan
+            case = {'ucid': ucid, 'docket_paths': [hpath, *sorted(hpath.parent.glob(f"{hpath.stem}_*.html"))]}
+            return metadata_scan.scan_case(case, court=parse_ucid(ucid)['court'])['latest_docket_date']
+
     jpath = ftools.get_expected_path(ucid=ucid)
 
     # If no json file then leave blank (will get all docket lines)
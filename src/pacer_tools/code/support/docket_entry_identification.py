@@ -11,10 +11,13 @@ from support import court_functions as cfunc
 from support import fhandle_tools as ftools
 
 re_header_case_id = re.compile('DOCKET FOR CASE #: [A-Za-z0-9 :\-]{1,100}')
+re_flag_line = re.compile(r'''<table.+?<td align="right">.+?</table>''', re.DOTALL)
 
 # Import the nature of suit Spreadsheet
 df_nos = pd.read_csv(settings.NATURE_SUIT)
 df_nos['composite'] = df_nos.name + ' ' + df_nos.major_type
+# Rows keyed by code, for the lookups in nos_matcher (codes that appear more than once don't match, as before)
+nos_rows_by_number = {row['number']: row for row in df_nos.drop_duplicates('number', keep=False).to_dict('records')}
 
 re_mdl = r"MDL\s*(no.|[-_])?\s*(?P<code>\d{2,5})"
 
@@ -436,9 +439,8 @@ def nos_matcher(nos, short_hand=False):
 
     if code.isdigit():
         code = int(code) # not sure why this cast newly became necessary (new nos file?), but it seems to do the trick!
-        result = df_nos.query('number == @code')
-        if len(result) == 1:
-            win_row = result.iloc[0].to_dict()
+        if code in nos_rows_by_number:
+            win_row = dict(nos_rows_by_number[code])
             return nos_repr(win_row) if short_hand else win_row
         else:
             return None
@@ -484,8 +486,18 @@ def get_case_flags(html_string):
     output:
         an comma-delimited string of the case flags e.g. 'CLOSED,SEALED'
     '''
-    re_flag_line = r'''<table.+?<td align="right">.+?</table>'''
-    flag_line = re.search(re_flag_line, html_string, re.DOTALL)
+    return case_flags_from_line(re_flag_line.search(html_string))
+
+def case_flags_from_line(flag_line):
+    '''
+    Get the case flags from the flag line found by re_flag_line (split out from get_case_flags so that
+    the parser's header scanner can supply the match)
+
+    inputs:
+        flag_line: the re_flag_line match object (or None)
+    output:
+        an comma-delimited string of the case flags e.g. 'CLOSED,SEALED'
+    '''
     if flag_line:
         results = re.findall(r'''<span.*?>([\w\d\s\-()]+)</span>''',flag_line.group())
         if results:
@@ -5,6 +5,7 @@ import re
 import sys
 from hashlib import md5
 from pathlib import Path
+from collections import Counter
 from datetime import datetime, timedelta
 
 import pytz
@@ -27,6 +28,11 @@ FMT_TIME = '%Y-%m-%d-%H:%M:%S'
 FMT_TIME_FNAME ='%y%m%d'
 FMT_PACERDATE = '%m/%d/%Y'
 
+# Encodings tried (in order) when reading scraped htmls
+HTML_ENCODINGS = ('utf-8', 'windows-1252')
+
+DOCKET_KEY_PREFIX = 20 # no. of chars of docket text in the key used to match up the rows of a case's docket reports
+
 SUBDIR_EXTENSIONS = {
     'json': 'json',
     'html': 'html',
@@ -321,6 +327,38 @@ def build_empty_docket_table(soup):
 
     return dtable
 
+def read_html_text(fpath, encodings=HTML_ENCODINGS):
+    '''
+    Read a scraped html file: its bytes are read once and decoded with the first of the encodings that works (rather than
+    reopening and rereading the file for each encoding), and newlines are normalised as when reading in text mode
+    Inputs:
+        - fpath (str or Path): the html file
+        - encodings (tuple): the encodings to try, in order
+    Outputs:
+        - text (str): the decoded text
+        - encoding (str): the encoding that was used
+    '''
+    with open(fpath, 'rb') as rfile:
+        data = rfile.read()
+    for i, encoding in enumerate(encodings):
+        try:
+            text = data.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            if i == len(encodings) - 1:
+                raise
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text, encoding
+
+def docket_row_key(date_filed, ind, docket_text):
+    '''
+    The key used to match up the rows of a case's docket reports, so that the rows a docket update repeats from an earlier
+    report are only kept once (by the docket aggregator, and when merging a docket update into an already-parsed case):
+    date + # + the start of the docket text, as cleaned by the parser
+    '''
+    return (date_filed or None, ind or None, (docket_text or '')[:DOCKET_KEY_PREFIX])
+
 def docket_aggregator(fpaths, outfile=None):
     '''
     Build a docket report from multiple dockets for same case, outputs new html(dl)
@@ -331,33 +369,29 @@ def docket_aggregator(fpaths, outfile=None):
         - outfile (str or Path): output html file path
     Output:
         - soup (bs4 object) - the aggregated html as a soup object
-        - extra (dict): a dictionary of extra data
+        - extra (dict): a dictionary of extra data (including 'html_encodings', the encoding of each html read)
     '''
     from bs4 import BeautifulSoup
 
-    def _hash_row(tr):
-        ''' Create a hash from the text of: date + # + docket_text[:20]'''
-        val = ''
-        for cell in tr.select('td'):
-            val+= cell.text[:20]
-        return hash(row)
+    def _row_key(tr):
+        ''' The docket_row_key of a docket table row (or the text of all its cells, for a row that isn't date, # and text) '''
+        cells = [dtools.line_cleaner(cell.text.strip()) for cell in tr.find_all('td')]
+        return docket_row_key(*cells) if len(cells) == 3 else tuple(cells)
 
-    rows = []
+    tables_rows = [] # the rows of each docket table, in order
 
     # Extra data to be returned (from non-htmls)
     extra = {
         'recap_docket': [],
-
+        'html_encodings': [],
     }
 
     for fpath in fpaths:
         fpath = Path(fpath)
         if fpath.suffix == '.html':
 
-            try:
-                hdata = open(fpath, 'r', encoding='utf-8').read()
-            except:
-                hdata = open(fpath, 'r', encoding='windows-1252').read()
+            hdata, encoding = read_html_text(fpath)
+            extra['html_encodings'].append(encoding)
             soup = BeautifulSoup(hdata, "html.parser")
 
             tables = soup.select('table')
@@ -368,7 +402,7 @@ def docket_aggregator(fpaths, outfile=None):
                     new_rows = docket_table.select('tr')[1:]
                     if 'BACKWARDS_DOCKET' in hdata:
                         new_rows.reverse()
-                    rows.extend(new_rows)
+                    tables_rows.append(new_rows)
 
         # Assuming json implies recap
         elif fpath.suffix == '.json':
@@ -411,13 +445,19 @@ def docket_aggregator(fpaths, outfile=None):
     docket_table.clear()
     docket_table.append(header_row)
 
-    hashes = []
-
-    for row in rows:
-        rhash = _hash_row(row)
-        if rhash not in hashes:
-            docket_table.append(row)
-            hashes.append(rhash)
+    # A row is dropped if it matches a row kept from an earlier table. Rows are matched as a multiset, so that e.g. two
+    # unnumbered minute entries on the same day with the same opening text are only both dropped if both were already
+    # kept, and repeated rows within one table are all kept (as merge_docket_rows in parse_pacer.py does)
+    kept_keys = Counter()
+    for new_rows in tables_rows:
+        unmatched = kept_keys.copy()
+        for row in new_rows:
+            key = _row_key(row)
+            if unmatched[key]:
+                unmatched[key] -= 1
+            else:
+                docket_table.append(row)
+                kept_keys[key] += 1
 
     if outfile:
         with open(outfile, 'w', encoding="utf-8") as wfile:
@@ -1,7 +1,6 @@
 import re
 import sys
 import json
-import simplejson
 import csv
 import numpy as np
 from pathlib import Path
@@ -14,6 +13,7 @@ sys.path.append(str(Path(__file__).resolve().parents[1]))
 from support import settings
 from support import court_functions as cf
 from support import data_tools as dtools
+from support import case_json
 
 # District codes
 with open(settings.DATAPATH/'annotation'/'fjc_district_codes.json', 'r') as rfile:
@@ -433,8 +433,7 @@ def _update_case_(row, indent):
         case = dtools.load_case(row.fpath)
         case['idb_data'] = extract_recap_idb_data(row, row.case_type)
 
-    with open(settings.PROJECT_ROOT/row.fpath, 'w+', encoding='utf-8') as wfile:
-        simplejson.dump(case, wfile, ignore_nan=True, indent=indent)
+    case_json.dump(case, settings.PROJECT_ROOT/row.fpath, indent=indent, ignore_nan=True)
 
 def execute_idb_merge(merged_df):
     '''
@@ -0,0 +1,164 @@
+'''
+File: member_links.py
+Description: A SQLite store of member/lead case links, shared by the parser (which finds the member lists on lead case
+dockets) and the docket scraper (which records the cases it has seen listed as members, so it can avoid re-pulling member lists)
+
+Replaces the member_lead_links.jsonl and member_cases.csv files: writes are transactional upserts (so parser threads
+and processes can add links concurrently), the unique (member, lead) constraint does the deduplication that used to need
+a rewrite of the whole file, and both lead->members and member->lead lookups are indexed.
+'''
+
+import sys
+import json
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from support import settings
+from support import sqlite_tools
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS links (
+        member TEXT NOT NULL,
+        member_id TEXT,
+        court TEXT,
+        lead TEXT NOT NULL,
+        lead_case_id TEXT,
+        UNIQUE (member, lead)
+    );
+    CREATE INDEX IF NOT EXISTS links_lead ON links (lead);
+    CREATE INDEX IF NOT EXISTS links_member ON links (member);
+
+    CREATE TABLE IF NOT EXISTS scraped_members (
+        court TEXT NOT NULL,
+        case_no TEXT NOT NULL,
+        PRIMARY KEY (court, case_no)
+    );
+'''
+
+UPSERT_LINK = '''
+    INSERT INTO links (member, member_id, court, lead, lead_case_id) VALUES (?,?,?,?,?)
+    ON CONFLICT (member, lead) DO UPDATE SET
+        member_id = COALESCE(excluded.member_id, member_id),
+        court = COALESCE(excluded.court, court),
+        lead_case_id = COALESCE(excluded.lead_case_id, lead_case_id)
+'''
+
+
+class MemberLinkStore:
+    '''
+    The member/lead links, keyed by ucid. Supports `lead in store` (has this lead's member list been stored?) so it can
+    be passed to parse_pacer.process_html_file as member_cases.
+    Safe to share between threads (each thread gets its own connection) and to pass to worker processes.
+    '''
+    def __init__(self, db_path=settings.MEMBER_LEAD_DB, import_legacy=True):
+        '''
+        Inputs:
+            - db_path (str or Path): the sqlite file for the store
+            - import_legacy (bool): when the store is first created, load any links from the old
+                member_lead_links.jsonl (settings.MEMBER_LEAD_LINKS) and member_cases.csv (settings.MEM_DF) files
+        '''
+        self.db_path = str(db_path)
+        self._local = threading.local()
+
+        is_new = not Path(self.db_path).exists()
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+        if is_new and import_legacy:
+            self.import_legacy_files()
+
+    def __getstate__(self):
+        return {'db_path': self.db_path}
+
+    def __setstate__(self, state):
+        self.__init__(**state, import_legacy=False)
+
+    def _connect(self):
+        return sqlite_tools.connect(self.db_path)
+
+    @property
+    def conn(self):
+        ''' The connection for the current thread '''
+        if getattr(self._local, 'conn', None) is None:
+            self._local.conn = self._connect()
+        return self._local.conn
+
+    def __contains__(self, lead):
+        return self.conn.execute('SELECT 1 FROM links WHERE lead=? LIMIT 1', (lead,)).fetchone() is not None
+
+    def __len__(self):
+        ''' The no. of lead cases in the store '''
+        return self.conn.execute('SELECT COUNT(DISTINCT lead) FROM links').fetchone()[0]
+
+    def add_links(self, lead, lead_case_id, members, court):
+        '''
+        Add (or update) the links between a lead case and its members, in a single transaction
+        Inputs:
+            - lead (str): ucid of the lead case
+            - lead_case_id (str): pacer id of the lead case
+            - members (list): dicts with 'member' (ucid) and 'member_id' (pacer id), as from parse_pacer.get_member_cases
+            - court (str): the court abbreviation
+        '''
+        rows = [(mem['member'], mem.get('member_id'), court, lead, lead_case_id) for mem in members]
+        with self.conn:
+            self.conn.executemany(UPSERT_LINK, rows)
+
+    def members_of(self, lead):
+        ''' The member ucids of a lead case (in the order they were added) '''
+        return [row[0] for row in self.conn.execute('SELECT member FROM links WHERE lead=? ORDER BY rowid', (lead,))]
+
+    def leads_of(self, member):
+        ''' The lead ucids that a case has been listed as a member of '''
+        return [row[0] for row in self.conn.execute('SELECT lead FROM links WHERE member=? ORDER BY rowid', (member,))]
+
+    def add_scraped_members(self, court, case_nos):
+        '''
+        Record case numbers that the docket scraper has seen listed as member cases
+        Inputs:
+            - court (str): the court abbreviation
+            - case_nos (iterable of str): the (cleaned) case numbers
+        '''
+        with self.conn:
+            self.conn.executemany('INSERT OR IGNORE INTO scraped_members (court, case_no) VALUES (?,?)',
+                ((court, case_no) for case_no in case_nos))
+
+    def member_case_nos(self, court):
+        '''
+        All of the case numbers in a court that are known to be member cases, whether seen by the scraper or the parser
+        Output:
+            (list) of case numbers (without the court prefix)
+        '''
+        query = '''
+            SELECT case_no FROM scraped_members WHERE court=:court
+            UNION
+            SELECT substr(member, length(:court) + 3) FROM links WHERE member LIKE :court || ';;%'
+        '''
+        return [row[0] for row in self.conn.execute(query, {'court': court})]
+
+    def to_dataframe(self):
+        ''' All of the links, as a dataframe with the same columns as the old member_lead_links.jsonl '''
+        return pd.read_sql_query('SELECT member, member_id, court, lead, lead_case_id FROM links ORDER BY rowid', self.conn)
+
+    def import_legacy_files(self, links_file=settings.MEMBER_LEAD_LINKS, scraped_file=settings.MEM_DF):
+        '''
+        Load the links from the old flat files into the store
+        Inputs:
+            - links_file (str or Path): a member_lead_links.jsonl file (rows of member, member_id, court, lead, lead_case_id)
+            - scraped_file (str or Path): a member_cases.csv file (rows of court, case_no)
+        '''
+        if Path(links_file).exists():
+            with open(links_file, 'r', encoding='utf-8') as rfile:
+                rows = [json.loads(line) for line in rfile if line.strip()]
+            with self.conn:
+                self.conn.executemany(UPSERT_LINK, (
+                    (row['member'], row.get('member_id') or None, row.get('court') or None, row['lead'], row.get('lead_case_id') or None)
+                    for row in rows
+                ))
+
+        if Path(scraped_file).exists():
+            df = pd.read_csv(scraped_file, usecols=('court', 'case_no'), dtype=str).dropna()
+            with self.conn:
+                self.conn.executemany('INSERT OR IGNORE INTO scraped_members (court, case_no) VALUES (?,?)',
+                    df.itertuples(index=False, name=None))
@@ -29,7 +29,8 @@ EXCLUDE_CASES = DATAPATH / 'exclude.csv'
 UNIQUE_FILES_TABLE = DATAPATH / 'unique_docket_filepaths_table.csv' # generate using generate_unique_filepaths in data_tools.py
 FJC =  DATAPATH / 'fjc' # generate using fjc.gov/research/idb and fjc_functions.py
 
-MEMBER_LEAD_LINKS = ANNO_PATH / 'member_lead_links.jsonl'
+MEMBER_LEAD_LINKS = ANNO_PATH / 'member_lead_links.jsonl' # legacy, imported into MEMBER_LEAD_DB when it is first created
+MEMBER_LEAD_DB = ANNO_PATH / 'member_lead_links.db' # see support/member_links.py
 ROLE_MAPPINGS = ANNO_PATH / 'role_mappings.json'
 JEL_JSONL = ANNO_PATH / 'judge_disambiguation' / 'JEL.jsonl' # generate using the Research-Materials repo
 ONTOLOGY_LABELS = ANNO_PATH / 'ontology' / 'labels.csv' # generate using the scales-nlp repo
@@ -0,0 +1,257 @@
+'''
+File: shard_store.py
+Description: Sharded storage for parsed cases, as an alternative to one .json file per case.
+Cases are appended to per-court, per-year gzipped JSONL shards, and a SQLite index of (shard, offset, length)
+lets any single case be read back without scanning its shard.
+
+Each record is written as its own gzip member, so a shard is still a valid .jsonl.gz file (zcat, pd.read_json etc. all work)
+but any one record can also be decompressed on its own.
+
+Shards are append-only: a case that is parsed again is appended again and the old copy is left where it was (only the
+index moves on to the new one), so a court that is reparsed often grows its shards by the size of every rerun.
+ShardSink.compact rewrites a court's shards with just the indexed copy of each case.
+'''
+
+import os
+import sys
+import gzip
+import time
+import hashlib
+import importlib
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from support import settings
+from support import case_json
+from support import sqlite_tools
+
+SHARD_DIRNAME = 'shards'
+INDEX_FNAME = 'index.db'
+PARQUET_FNAME = 'cases.parquet'
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS cases (
+        ucid TEXT PRIMARY KEY,
+        shard TEXT NOT NULL,
+        byte_offset INTEGER NOT NULL,
+        length INTEGER NOT NULL,
+        digest TEXT
+    )
+'''
+
+
+def _ucid_court_year(ucid):
+    ''' Get the court and 2-digit year from a ucid e.g. 'ilnd;;1:16-cv-00001' -> ('ilnd', '16') '''
+    court, case_no = ucid.split(';;')
+    return court, case_no.split(':')[1][0:2]
+
+
+def parquet_engine():
+    ''' The library pandas will write Parquet files with ('pyarrow' or 'fastparquet'), or None if neither is installed '''
+    for engine in ('pyarrow', 'fastparquet'):
+        try:
+            importlib.import_module(engine)
+            return engine
+        except ImportError:
+            continue
+    return None
+
+
+def default_shard_dir(court):
+    ''' Where the shards for a court live when using the standard PACER_PATH directory structure '''
+    return settings.PACER_PATH / court / 'json' / SHARD_DIRNAME
+
+
+class ShardSink:
+    '''
+    Appends parsed cases to gzipped JSONL shards under {court_output_dir}/shards/{year}/, and indexes them by ucid.
+    Each process writes to its own shard files (the pid is in the filename), and threads within a process share
+    them behind a lock, so the sink can be used with both the thread and process engines of the parser.
+    A case that is written again is appended again and the index is pointed at the new copy (unless it's unchanged and
+    written with skip_unchanged, which compares it against the digest of the indexed copy).
+    '''
+    def __init__(self, court_output_dir, court):
+        '''
+        Inputs:
+            - court_output_dir (str or Path): the court's output directory (the shards go in a 'shards' subdirectory)
+            - court (str): court abbreviation
+        '''
+        self.court_output_dir = Path(court_output_dir)
+        self.court = court
+        self.shard_dir = self.court_output_dir / SHARD_DIRNAME
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(SCHEMA)
+            if 'digest' not in [row[1] for row in conn.execute('PRAGMA table_info(cases)')]: # (an index from before digests)
+                conn.execute('ALTER TABLE cases ADD COLUMN digest TEXT')
+
+    def __getstate__(self):
+        return {'court_output_dir': self.court_output_dir, 'court': self.court}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _connect(self):
+        # (the index stays with the shards, where load_case finds it, so it isn't moved to a local disk like the journal and
+        # manifest can be, but as for them WAL is only used on a local disk)
+        return sqlite_tools.connect(self.shard_dir / INDEX_FNAME)
+
+    @property
+    def conn(self):
+        ''' The index connection for the current thread '''
+        if getattr(self._local, 'conn', None) is None:
+            self._local.conn = self._connect()
+        return self._local.conn
+
+    def shard_path(self, year):
+        ''' The shard that this process appends to for a given year '''
+        return self.shard_dir / year / f"{self.court}-{year}-{os.getpid()}.jsonl.gz"
+
+    def contains(self, ucid):
+        ''' Whether a case is already in the shards '''
+        return self.conn.execute('SELECT 1 FROM cases WHERE ucid=?', (ucid,)).fetchone() is not None
+
+    def write(self, ucid, case_data, skip_unchanged=False):
+        '''
+        Append a case to its shard and index it
+        Inputs:
+            - ucid (str): the case ucid
+            - case_data (dict): the parsed case
+            - skip_unchanged (bool): don't append the case if the indexed copy of it has exactly the same JSON
+        Output:
+            (Path) the shard the case is in
+            (bool) whether it was written (False only if skip_unchanged and it was unchanged)
+        '''
+        data = case_json.dumpb(case_data)
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        if skip_unchanged:
+            row = self.conn.execute('SELECT shard, digest FROM cases WHERE ucid=?', (ucid,)).fetchone()
+            if row and row[1] == digest:
+                return self.shard_dir / row[0], False
+
+        record = gzip.compress(data + b'\n')
+        _, year = _ucid_court_year(ucid)
+        path = self.shard_path(year)
+
+        with self._lock:
+            path.parent.mkdir(exist_ok=True)
+            with open(path, 'ab') as wfile:
+                offset = wfile.seek(0, os.SEEK_END)
+                wfile.write(record)
+
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO cases (ucid, shard, byte_offset, length, digest) VALUES (?,?,?,?,?)',
+                (ucid, str(path.relative_to(self.shard_dir)), offset, len(record), digest))
+        return path, True
+
+    def compact(self):
+        '''
+        Rewrite each year's shards as a single shard holding only the indexed copy of each case, and delete the old
+        shards (the superseded copies of cases that have been written more than once, and the files of earlier processes).
+        Nothing else should be writing to (or reading from) the court's shards while this runs.
+        Output:
+            (dict) the no. of cases kept, and the total size of the shards before and after (bytes)
+        '''
+        result = {'cases': 0, 'bytes_before': 0, 'bytes_after': 0}
+        rows = self.conn.execute('SELECT ucid, shard, byte_offset, length FROM cases ORDER BY shard, byte_offset').fetchall()
+        by_year = {}
+        for ucid, shard, offset, length in rows:
+            by_year.setdefault(Path(shard).parent.name, []).append((ucid, shard, offset, length))
+
+        for year_dir in sorted(p for p in self.shard_dir.iterdir() if p.is_dir()):
+            old_shards = list(year_dir.glob('*.jsonl.gz'))
+            result['bytes_before'] += sum(p.stat().st_size for p in old_shards)
+            records = by_year.get(year_dir.name, [])
+            if not records:
+                for old_shard in old_shards:
+                    old_shard.unlink()
+                continue
+
+            # Copy the indexed records (still compressed) into a new shard, then point the index at it
+            new_shard = year_dir / f"{self.court}-{year_dir.name}-compact{time.strftime('%Y%m%d%H%M%S')}.jsonl.gz"
+            tmp_shard = new_shard.with_name(new_shard.name + '.tmp')
+            index_rows = []
+            with open(tmp_shard, 'wb') as wfile:
+                for ucid, shard, offset, length in records:
+                    with open(self.shard_dir / shard, 'rb') as rfile:
+                        rfile.seek(offset)
+                        index_rows.append((str(new_shard.relative_to(self.shard_dir)), wfile.tell(), ucid))
+                        wfile.write(rfile.read(length))
+            tmp_shard.replace(new_shard)
+            with self.conn:
+                self.conn.executemany('UPDATE cases SET shard=?, byte_offset=? WHERE ucid=?', index_rows)
+            for old_shard in old_shards:
+                if old_shard != new_shard:
+                    old_shard.unlink()
+
+            result['cases'] += len(records)
+            result['bytes_after'] += new_shard.stat().st_size
+        return result
+
+    def write_parquet(self, outfile=None):
+        '''
+        Write the flat (scalar-valued) case-level fields of every indexed case to a single Parquet file
+        (requires pyarrow or fastparquet)
+        Inputs:
+            - outfile (str or Path): defaults to {shard_dir}/cases.parquet
+        Output:
+            (Path) the Parquet file, or None if there are no cases in the shards
+        '''
+        import pandas as pd
+
+        rows = []
+        for ucid, shard, offset, length in self.conn.execute('SELECT ucid, shard, byte_offset, length FROM cases ORDER BY shard, byte_offset'):
+            case_data = case_json.loads(read_record(self.shard_dir / shard, offset, length))
+            if case_data:
+                rows.append({k:v for k,v in case_data.items() if v is None or isinstance(v, (str, int, float, bool))})
+
+        if not rows:
+            return None
+        outfile = Path(outfile or self.shard_dir / PARQUET_FNAME)
+        pd.DataFrame(rows).set_index('ucid').to_parquet(outfile)
+        return outfile
+
+
+def read_record(shard_path, offset, length):
+    ''' Read and decompress a single record from a shard, returns the JSON text '''
+    with open(shard_path, 'rb') as rfile:
+        rfile.seek(offset)
+        return gzip.decompress(rfile.read(length)).decode('utf-8')
+
+
+_index_conns = {}
+
+def _index_conn(shard_dir):
+    ''' A (cached) connection to the index of a shard directory, or None if there is no index there yet '''
+    if shard_dir not in _index_conns:
+        index_path = Path(shard_dir) / INDEX_FNAME
+        if not index_path.exists():
+            return None
+        _index_conns[shard_dir] = sqlite_tools.connect(index_path, check_same_thread=False)
+    return _index_conns[shard_dir]
+
+
+def load_json_text(ucid, shard_dir=None):
+    '''
+    Look up a case in the shard index and read its JSON text
+    Inputs:
+        - ucid (str): the case ucid
+        - shard_dir (str or Path): the court's shard directory, defaults to the standard location under PACER_PATH
+    Output:
+        (str) the case JSON text, or None if the case isn't in the shards
+    '''
+    court, _ = _ucid_court_year(ucid)
+    shard_dir = Path(shard_dir or default_shard_dir(court))
+    conn = _index_conn(str(shard_dir))
+    if conn is None:
+        return None
+
+    row = conn.execute('SELECT shard, byte_offset, length FROM cases WHERE ucid=?', (ucid,)).fetchone()
+    if row is None:
+        return None
+    shard, offset, length = row
+    return read_record(shard_dir / shard, offset, length)
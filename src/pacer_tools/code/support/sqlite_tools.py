@@ -0,0 +1,71 @@
+'''
+File: sqlite_tools.py
+Description: Opening the SQLite files kept alongside the data (the parser's run journal, parse manifest and shard index,
+the scrapers' work queue and download ledger, the member/lead links), which is often a shared datastore on a network
+filesystem.
+
+SQLite's WAL mode needs shared memory between every process using the database, so it only works when they're all on
+the same host and the file is on a local disk; on NFS, SMB etc. the WAL index isn't shared and the database can be
+corrupted. connect uses WAL on local disks (readers don't block the writer) and the default rollback journal on network
+filesystems. Most of these files can also be put somewhere else with an option (e.g. the parser's --journal, the
+scraper's --ledger), for a local disk when the data is on a network filesystem.
+'''
+
+import os
+import sqlite3
+from pathlib import Path
+
+# Filesystem types (as in /proc/mounts) that are on another host
+NETWORK_FS_TYPES = {'nfs', 'nfs4', 'cifs', 'smbfs', 'smb3', 'ncpfs', 'afs', '9p', 'lustre', 'gpfs', 'ceph', 'glusterfs',
+    'fuse.sshfs', 'fuse.glusterfs', 'fuse.ceph', 'fuse.s3fs', 'fuse.gcsfuse', 'beegfs'}
+
+MOUNTS_FILE = '/proc/mounts'
+
+
+def _unescape_mount_point(mount_point):
+    ''' Undo the octal escapes of /proc/mounts (e.g. \\040 for a space) '''
+    return mount_point.encode().decode('unicode_escape')
+
+
+def filesystem_type(path):
+    '''
+    The type of the filesystem a path is on, from the longest mount point that contains it
+    Inputs:
+        - path (str or Path): a file or directory (it doesn't need to exist yet)
+    Output:
+        (str) the filesystem type e.g. 'ext4', 'nfs4', or None if it can't be told (e.g. not on Linux)
+    '''
+    if not os.path.exists(MOUNTS_FILE):
+        return None
+    path = os.path.abspath(path)
+    best, best_type = '', None
+    with open(MOUNTS_FILE) as rfile:
+        for line in rfile:
+            parts = line.split()
+            if len(parts) < 3:
+                continue
+            mount_point, fs_type = _unescape_mount_point(parts[1]), parts[2]
+            prefix = mount_point.rstrip('/') + '/'
+            if (path == mount_point or path.startswith(prefix)) and len(mount_point) >= len(best):
+                best, best_type = mount_point, fs_type
+    return best_type
+
+
+def is_network_path(path):
+    ''' Whether a path is on a network filesystem (see NETWORK_FS_TYPES) '''
+    return filesystem_type(path) in NETWORK_FS_TYPES
+
+
+def connect(db_path, timeout=60, **kwargs):
+    '''
+    Open a SQLite database, in WAL mode if it's on a local disk (see the module docstring)
+    Inputs:
+        - db_path (str or Path): the sqlite file
+        - timeout (float), kwargs: passed to sqlite3.connect
+    Output:
+        (sqlite3.Connection)
+    '''
+    conn = sqlite3.connect(db_path, timeout=timeout, **kwargs)
+    # (the journal mode is stored in the file, so a database that was in WAL mode is switched back on a network filesystem)
+    conn.execute('PRAGMA journal_mode=DELETE' if is_network_path(Path(db_path).parent) else 'PRAGMA journal_mode=WAL')
+    return conn
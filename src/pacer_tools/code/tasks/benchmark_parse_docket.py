@@ -0,0 +1,48 @@
+import sys
+import copy
+import json
+import time
+from pathlib import Path
+
+import click
+from bs4 import BeautifulSoup as bs
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from parsers import parse_pacer
+from parsers import lxml_backend
+from tasks.synthetic_dockets import make_docket_table
+
+
+def time_parse(parse_fn, table, repeats, **kwargs):
+    ''' Best-of-n time for parse_fn on copies of the table (parse_docket modifies the table in place) '''
+    best, out = None, None
+    for _ in range(repeats):
+        table_copy = copy.deepcopy(table)
+        start = time.perf_counter()
+        out = parse_fn(table_copy, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out
+
+
+@click.command()
+@click.option('--n-entries', default=2000, show_default=True, help='No. of docket entries')
+@click.option('--max-attachments', default=40, show_default=True, help='Max no. of attachments per entry')
+@click.option('--repeats', default=3, show_default=True, help='No. of runs per method (the best is reported)')
+def main(n_entries, max_attachments, repeats):
+    ''' Benchmark parse_docket's sentinel split against the ###..### link encoding on an MDL-sized synthetic docket '''
+    html = make_docket_table(n_entries, max_attachments)
+    tables = {
+        'bs4': (parse_pacer.parse_docket, bs(html, 'html.parser').select_one('table')),
+        'lxml': (parse_pacer.parse_docket_lxml, lxml_backend.build_tree(html).find('.//table')),
+    }
+
+    for backend, (parse_fn, table) in tables.items():
+        t_encoded, out_encoded = time_parse(parse_fn, table, repeats, encode_links=True)
+        t_split, out_split = time_parse(parse_fn, table, repeats)
+        same = json.dumps(out_encoded) == json.dumps(out_split)
+        print(f"{backend}: {n_entries:,} entries, ###..### encoding {t_encoded:.3f}s, sentinel split {t_split:.3f}s "
+            f"({t_encoded/t_split:.2f}x), identical output: {same}")
+
+if __name__ == '__main__':
+    main()
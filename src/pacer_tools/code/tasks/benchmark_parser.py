@@ -0,0 +1,206 @@
+import io
+import sys
+import json
+import time
+import tempfile
+import contextlib
+from pathlib import Path
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+import psutil
+import pandas as pd
+from bs4 import BeautifulSoup as bs
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from support import data_tools as dtools
+from support import docket_entry_identification as dei
+from support import fhandle_tools as ftools
+from support.member_links import MemberLinkStore
+from parsers import parse_pacer
+from parsers import lxml_backend
+from parsers.parse_summary import SummaryPipeline
+from tasks.synthetic_dockets import write_corpus
+
+STAGES = ('process_html_file', 'parse_docket', 'process_parties_and_counts', 'SummaryPipeline.process')
+
+
+def read_html(fpath):
+    ''' Read an html file the same way parse_pacer.process_html_file does '''
+    return ftools.read_html_text(fpath)[0]
+
+
+def stage_calls(stage, case, court, backend, member_cases):
+    '''
+    Build the calls to time for one case in one stage (any html reading and soup building that isn't part of the stage
+    itself is done here, outside of the timing)
+    Inputs:
+        - stage (str): one of STAGES
+        - case (dict): a case as grouped by dtools.group_dockets
+        - court (str): court abbreviation
+        - backend (str): the parser backend, 'bs4' or 'lxml'
+        - member_cases (MemberLinkStore): the (scratch) member link store for process_html_file
+    Output:
+        (list) of zero-argument functions, one per call (parse_docket is timed on each of a case's dockets)
+    '''
+    if stage == 'process_html_file':
+        return [lambda: parse_pacer.process_html_file(case, member_cases, court=court, backend=backend)]
+
+    elif stage == 'parse_docket':
+        calls = []
+        for fpath in case['docket_paths']:
+            html_text = read_html(fpath)
+            if backend == 'lxml':
+                table = lxml_backend.identify_docket_table(lxml_backend.build_tree(html_text), ftools.re_no_docket)
+                calls.append(lambda table=table: parse_pacer.parse_docket_lxml(table))
+            else:
+                table = dei.identify_docket_table(bs(html_text, 'html.parser'))
+                calls.append(lambda table=table: parse_pacer.parse_docket(table))
+        return calls
+
+    elif stage == 'process_parties_and_counts':
+        html_text = read_html(case['docket_paths'][0])
+        is_cr = ftools.decompose_caseno(ftools.colonize(Path(case['docket_paths'][0]).stem))['case_type'] == 'cr'
+        tables = bs(html_text, 'html.parser').select('div > table[cellspacing="5"]')
+        if len(tables) < 2:
+            return []
+        party_table = ''.join([str(x) for x in tables[1:]]) if is_cr else str(tables[1])
+        return [lambda: parse_pacer.process_parties_and_counts(party_table, is_cr)]
+
+    elif stage == 'SummaryPipeline.process':
+        if pd.isna(case['summary_path']):
+            return []
+        summary_html = read_html(case['summary_path'])
+        return [lambda: SummaryPipeline.process(summary_html, {})]
+
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def peak_rss_mb():
+    '''
+    The peak resident set size of this process so far, in MB. psutil gives the peak directly on Windows (peak_wset); on
+    Linux and macOS it only gives the current RSS, so the peak comes from getrusage (ru_maxrss is in KB on Linux, bytes on
+    macOS), and is at least the current RSS from psutil
+    '''
+    memory_info = psutil.Process().memory_info()
+    if hasattr(memory_info, 'peak_wset'):
+        return memory_info.peak_wset / 1024**2
+    import resource # (not available on Windows)
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    return max(maxrss, memory_info.rss) / 1024**2
+
+
+def run_stage(stage, court_dir, court, backend, repeats):
+    '''
+    Time one stage over every case in a corpus. Meant to be run in a fresh process, so that the peak RSS is the stage's own
+    Inputs:
+        - stage (str): one of STAGES
+        - court_dir (str or Path): the court directory of the corpus (with html/ and summaries/ subdirectories)
+        - court (str): court abbreviation
+        - backend (str): the parser backend, 'bs4' or 'lxml'
+        - repeats (int): no. of times to time each call
+    Output:
+        (dict) the stage's results: no. of cases and calls, total seconds, cases/sec, peak RSS and the slowest case
+    '''
+    court_dir = Path(court_dir)
+    cases = dtools.group_dockets(list(court_dir.glob('html/*/*.html')), court=court, summary_fpaths=list(court_dir.glob('summaries/*/*.html')))
+
+    n_cases, n_calls, total, slowest = 0, 0, 0.0, (0.0, None)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        member_cases = MemberLinkStore(Path(tmp_dir)/'member_lead_links.db', import_legacy=False)
+        for case in cases:
+            calls = stage_calls(stage, case, court, backend, member_cases)
+            if not calls:
+                continue
+            n_cases += 1
+            case_time = 0.0
+            for _ in range(repeats):
+                for call in calls:
+                    with contextlib.redirect_stdout(io.StringIO()): # (the parser prints warnings and progress)
+                        start = time.perf_counter()
+                        call()
+                        case_time += time.perf_counter() - start
+                    n_calls += 1
+            total += case_time
+            slowest = max(slowest, (case_time/repeats, case['ucid']), key=lambda x: x[0])
+
+    return {'stage': stage, 'n_cases': n_cases, 'n_calls': n_calls, 'seconds': total,
+        'cases_per_sec': n_cases*repeats/total if total else None, 'peak_rss_mb': peak_rss_mb(),
+        'slowest_case': slowest[1], 'slowest_seconds': slowest[0]}
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    '''
+    Compare throughput against a previous run
+    Inputs:
+        - results, baseline (list of dicts): outputs of run_stage
+        - tolerance (float): the fractional drop in cases/sec that counts as a regression
+    Output:
+        (list) the stages that have regressed
+    '''
+    baseline = {row['stage']: row for row in baseline}
+    regressed = []
+    for row in results:
+        base = baseline.get(row['stage'])
+        if not base or not base['cases_per_sec'] or not row['cases_per_sec']:
+            continue
+        change = row['cases_per_sec']/base['cases_per_sec'] - 1
+        flag = ''
+        if change < -tolerance:
+            regressed.append(row['stage'])
+            flag = '  <-- REGRESSION'
+        print(f" - {row['stage']}: {base['cases_per_sec']:,.2f} -> {row['cases_per_sec']:,.2f} cases/sec ({change:+.1%}), "
+            f"peak RSS {base['peak_rss_mb']:,.0f} -> {row['peak_rss_mb']:,.0f} MB{flag}")
+    return regressed
+
+
+@click.command()
+@click.option('--corpus-dir', default=None, type=click.Path(exists=True, file_okay=False),
+                help='An existing court directory to benchmark on (e.g. from tasks/synthetic_dockets.py), instead of generating one')
+@click.option('--court', default='ilnd', show_default=True, help='Court abbreviation')
+@click.option('--n-cases', default=30, show_default=True, help='No. of synthetic cases to generate')
+@click.option('--max-entries', default=20000, show_default=True, help='Max no. of docket entries per synthetic case')
+@click.option('--seed', default=0, show_default=True, help='Random seed for the synthetic corpus')
+@click.option('--stage', 'stages', multiple=True, type=click.Choice(STAGES), help='Stage(s) to run (default: all)')
+@click.option('--backend', default='bs4', show_default=True, type=click.Choice(['bs4', 'lxml']), help='Parser backend')
+@click.option('--repeats', default=1, show_default=True, help='No. of times to time each call')
+@click.option('--save', default=None, type=click.Path(dir_okay=False), help='Write the results to this json file (to use as a baseline later)')
+@click.option('--baseline', default=None, type=click.Path(exists=True, dir_okay=False), help='Results json from a previous run to compare against')
+@click.option('--tolerance', default=0.2, show_default=True, help='Fractional drop in cases/sec (vs. the baseline) that counts as a regression')
+def main(corpus_dir, court, n_cases, max_entries, seed, stages, backend, repeats, save, baseline, tolerance):
+    '''
+    Benchmark the stages of the docket parser on a synthetic corpus (civil and criminal dockets, varied party counts,
+    10 to max-entries docket entries, member case lists, docket updates and summaries), reporting cases/sec and peak RSS.
+    Each stage runs in its own fresh process. Exits with status 1 if any stage has regressed against --baseline.
+    '''
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if corpus_dir:
+            court_dir = Path(corpus_dir).resolve()
+        else:
+            court_dir = write_corpus(tmp_dir, n_cases, max_entries=max_entries, court=court, seed=seed)
+            print(f"Generated {n_cases:,} synthetic cases (up to {max_entries:,} docket entries) in {court_dir}")
+
+        results = []
+        for stage in stages or STAGES:
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+                row = executor.submit(run_stage, stage, court_dir, court, backend, repeats).result()
+            results.append(row)
+            print(f"{stage}: {row['n_cases']:,} cases ({row['n_calls']:,} calls) in {row['seconds']:.2f}s, "
+                f"{row['cases_per_sec'] or 0:,.2f} cases/sec, peak RSS {row['peak_rss_mb']:,.0f} MB, "
+                f"slowest {row['slowest_case']} ({row['slowest_seconds']:.2f}s)")
+
+    if save:
+        with open(save, 'w') as wfile:
+            json.dump(results, wfile, indent=2)
+        print(f"Results written to {save}")
+
+    if baseline:
+        print(f"\nCompared to {baseline}:")
+        regressed = compare_to_baseline(results, json.load(open(baseline)), tolerance)
+        if regressed:
+            print(f"Regressed by more than {tolerance:.0%}: {', '.join(regressed)}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import sys
+import json
+from pathlib import Path
+
+import click
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from support import data_tools as dtools
+from parsers import parse_pacer
+
+
+class AllLeadsSeen(dict):
+    ''' A member_cases stand-in that claims to have seen every lead case, so the comparison doesn't write to the member link store '''
+    def __contains__(self, key):
+        return True
+
+
+def compare_case(case, court):
+    '''
+    Parse a single case with both parser backends
+    Output:
+        (list) the top-level keys whose serialized values differ (empty if the JSON is byte-identical)
+    '''
+    outputs = {}
+    for backend in ('bs4', 'lxml'):
+        outputs[backend] = parse_pacer.process_html_file(case, AllLeadsSeen(), court=court, backend=backend)
+
+    if json.dumps(outputs['bs4']) == json.dumps(outputs['lxml']):
+        return []
+    elif outputs['bs4'] is None or outputs['lxml'] is None:
+        return ['<whole case>']
+    else:
+        keys = set(outputs['bs4']) | set(outputs['lxml'])
+        return sorted(k for k in keys if json.dumps(outputs['bs4'].get(k)) != json.dumps(outputs['lxml'].get(k)))
+
+
+@click.command()
+@click.argument('input-dir')
+@click.option('--court', '-c', default=None, help="Court abbrv, if none given infers from directory")
+@click.option('--max-diffs', default=20, show_default=True, help='No. of differing cases to list at the end')
+def main(input_dir, court, max_diffs):
+    ''' Check that the bs4 and lxml parser backends give byte-identical JSON for the golden corpus of .html casefiles in INPUT_DIR '''
+
+    hpaths = Path(input_dir).resolve().glob('*/*.html')
+    cases = dtools.group_dockets(hpaths, court=court)
+
+    diffs = {}
+    for case in cases:
+        case.setdefault('summary_path', None)
+        diff_keys = compare_case(case, court)
+        if diff_keys:
+            diffs[case['ucid']] = diff_keys
+
+    print(f"\nCompared {len(cases):,} cases: {len(cases)-len(diffs):,} identical, {len(diffs):,} different")
+    for ucid, diff_keys in list(diffs.items())[:max_diffs]:
+        print(f" - {ucid}: {', '.join(diff_keys)}")
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,5 @@
 import os
 import glob
-import json
 import spacy
 import click
 import pandas as pd
@@ -8,6 +7,7 @@ import pandas as pd
 import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parents[1]))
+from support import case_json
 from support import data_tools as dtools
 nlp = spacy.load("en_core_web_trf")
 
@@ -21,11 +21,11 @@ def _redact_file(fpath, outdir_replacement_target, outdir_replacement_text):
     try:
         data_redacted = dtools.redact_private_individual_names(data, is_html=is_html, elective_nlp=nlp)
         os.makedirs(os.path.dirname(fpath_new), exist_ok=True)
-        with open(fpath_new, 'w') as f:
-            if is_html:
+        if is_html:
+            with open(fpath_new, 'w') as f:
                 f.write(data_redacted)
-            else:
-                json.dump(data_redacted, f)
+        else:
+            case_json.dump(data_redacted, fpath_new)
         
         print(f'Created {fpath_new}')
     except Exception as e:
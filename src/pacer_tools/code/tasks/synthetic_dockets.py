@@ -0,0 +1,292 @@
+'''
+File: synthetic_dockets.py
+Description: Generates synthetic PACER docket and case summary htmls, laid out in the same way as a scraped court
+directory (<court>/html/<year>/*.html and <court>/summaries/<year>/*.html), for benchmarking the parser without real data
+(see tasks/benchmark_parser.py)
+
+The htmls follow the structure of real CM/ECF pages closely enough to go through every stage of parse_pacer.py
+(header fields, party tables and criminal counts, member case lists, docket tables with attachments, docket updates
+and summaries), but all of the names, numbers and text are made up.
+'''
+
+import sys
+import math
+import random
+from pathlib import Path
+
+import click
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from support import fhandle_tools as ftools
+
+YEAR = '16'
+CITIES = {'ilnd': 'Chicago', 'nyed': 'Brooklyn', 'cand': 'San Francisco', 'txsd': 'Houston'}
+CV_ROLES = ['Plaintiff', 'Defendant', 'Intervenor', 'Third Party Defendant', 'Counter Claimant', 'Interested Party']
+SURNAMES = ['Smith', 'Jones', 'Garcia', 'Nguyen', 'Okafor', 'Kowalski', 'Haddad', 'Brown', 'Tanaka', 'Silva', 'Murphy', 'Rossi']
+FORENAMES = ['John', 'Maria', 'Wei', 'Amara', 'Piotr', 'Leila', 'James', 'Yuki', 'Ana', 'Sean', 'Luca', 'Grace']
+OFFENSES = ['18:371 CONSPIRACY TO DEFRAUD THE UNITED STATES', '21:846=CD.F CONSPIRACY TO DISTRIBUTE CONTROLLED SUBSTANCE',
+    '18:1343.F WIRE FRAUD', '18:922G.F UNLAWFUL TRANSPORT OF FIREARMS, ETC.', '18:1028A.F AGGRAVATED IDENTITY THEFT']
+
+RECEIPT = '''<br><hr><center><table border="1" bgcolor="white" width="400"><tr><th colspan="4"><font size="+1" color="DARKRED">PACER Service Center </font></th></tr>
+<tr><th colspan="4"><font color="DARKBLUE">Transaction Receipt </font></th></tr><tr></tr><tr></tr>
+<tr><td colspan="4" align="CENTER"><font size="-1" color="DARKBLUE">01/01/2020 10:00:00</font></td></tr>
+<tr><th align="LEFT"><font size="-1" color="DARKBLUE"> PACER Login: </font></th><td align="LEFT"><font size="-1" color="DARKBLUE"> user123 </font></td><th align="LEFT"><font size="-1" color="DARKBLUE"> Client Code: </font></th><td align="LEFT"><font size="-1" color="DARKBLUE"></font></td></tr>
+<tr><th align="LEFT"><font size="-1" color="DARKBLUE"> Description: </font></th><td align="LEFT"><font size="-1" color="DARKBLUE"> {description} </font></td><th align="LEFT"><font size="-1" color="DARKBLUE"> Search Criteria: </font></th><td align="LEFT"><font size="-1" color="DARKBLUE"> {case_no} </font></td></tr>
+<tr><th align="LEFT"><font size="-1" color="DARKBLUE"> Billable Pages: </font></th><td align="LEFT"><font size="-1" color="DARKBLUE"> {pages} </font></td><th align="LEFT"><font size="-1" color="DARKBLUE"> Cost: </font></th><td align="LEFT"><font size="-1" color="DARKBLUE"> {cost:.2f} </font></td></tr></table></center>'''
+
+
+def make_docket_table(n_entries, max_attachments, seed=0, first_entry=1, court='ilnd'):
+    '''
+    Make the html for a synthetic docket table, shaped like an MDL docket (lots of entries, many with long lists of attachments)
+    Inputs:
+        - n_entries (int): no. of docket entries
+        - max_attachments (int): max no. of attachments per entry
+        - seed (int): random seed
+        - first_entry (int): the no. of the first entry (for docket updates, which continue on from the original docket)
+        - court (str): court abbreviation, for the document urls
+    Output:
+        (str) the html of the docket table
+    '''
+    rng = random.Random(seed)
+    base = f'https://ecf.{court}.uscourts.gov/doc1/'
+    rows = ['<table align="center" width="99%" border="1" rules="all" cellpadding="5" cellspacing="0">',
+        '<tr><td style="font-weight:bold; width=94; white-space:nowrap">Date Filed</td><th>#</th><td style="font-weight:bold">Docket Text</td></tr>']
+    for i in range(first_entry, first_entry+n_entries):
+        n_atts = rng.randint(0, max_attachments)
+        atts = ''.join(f', # <a href="{base}{i:06d}{j:04d}">{j}</a> Exhibit {j}' for j in range(1, n_atts+1))
+        refs = ''.join(f' re <a href="{base}{k:06d}0000">{k}</a>' for k in rng.sample(range(1, i+1), min(i, rng.randint(0,3))))
+        ext = ' see <a href="http://example.com/order">here</a>' if i%7==0 else ''
+        odd = f' (<a href="{base}{i:06d}9999#page=2">9999</a>)' if i%50==0 else '' # url that takes the fallback path
+        rows.append(f'<tr><td width="94" nowrap>0{1+i%9}/1{i%9}/2016</td>'
+            f'<td style="white-space:nowrap" align="right"><a href="{base}{i:06d}0000">{i}</a>&nbsp;</td>'
+            f'<td>MOTION &amp; Memorandum  filed by Plaintiffs{refs}{ext}{odd}; (Attachments{atts})(Lawyer, Jane) (Entered: 01/01/2016)</td></tr>')
+    rows.append('</table>')
+    return '\n'.join(rows)
+
+
+def _name(rng):
+    return f'{rng.choice(FORENAMES)} {rng.choice(SURNAMES)}'
+
+
+def _lawyer_cell(rng, n_lawyers):
+    lawyers = []
+    for _ in range(n_lawyers):
+        name = _name(rng)
+        lawyers.append(f'<b>{name}</b><br>{name.split()[1]} &amp; Partners LLP<br>{rng.randint(1,999)} Main St<br>Chicago, IL 60601<br>'
+            f'(312) 555-{rng.randint(1000,9999)}<br>Email: {name.split()[0].lower()}@example.com<br><i>LEAD ATTORNEY</i><br><i>ATTORNEY TO BE NOTICED</i>')
+    return '<br><br>'.join(lawyers)
+
+
+def _party_row(rng, name, n_lawyers, terminated=False):
+    term = '<br><i>TERMINATED: 01/02/2016</i>' if terminated else ''
+    if not n_lawyers:
+        return f'<tr><td valign="top" width="40%"><b>{name}</b>{term}</td></tr>'
+    return (f'<tr><td valign="top" width="40%"><b>{name}</b>{term}</td><td valign="top" width="20%" align="right">represented&nbsp;by</td>'
+        f'<td valign="top" width="40%">{_lawyer_cell(rng, n_lawyers)}</td></tr>')
+
+
+def _counts_rows(rng, heading, n_counts):
+    rows = [f'<tr><td valign="top"><br><u>{heading}</u></td><td>&nbsp;</td><td valign="top"><br><u>Disposition</u></td></tr>']
+    for k in range(1, n_counts+1):
+        rows.append(f'<tr><td valign="top" width="40%">{rng.choice(OFFENSES)}<br>({k})</td><td>&nbsp;</td>'
+            f'<td valign="top" width="40%">Imprisonment for a term of {rng.randint(6,120)} months</td></tr>')
+    if not n_counts:
+        rows.append('<tr><td valign="top" width="40%">None</td></tr>')
+    return rows
+
+
+def make_party_tables(rng, n_parties, is_cr):
+    '''
+    Make the party table(s) for a docket
+    Inputs:
+        - rng (random.Random)
+        - n_parties (int): no. of parties (for criminal cases, no. of defendants, each with their own table and counts)
+        - is_cr (bool): whether this is a criminal case
+    Output:
+        (str) the html of the party table(s)
+    '''
+    if is_cr:
+        tables = []
+        for d in range(1, n_parties+1):
+            rows = [f'<tr><td><b><u>Defendant ({d})</u></b></td></tr>', _party_row(rng, _name(rng), rng.randint(1,2), terminated=rng.random()<0.3)]
+            rows += _counts_rows(rng, 'Pending Counts', rng.randint(0,4))
+            rows += ['<tr><td valign="top"><br><u>Highest Offense Level (Opening)</u></td></tr>', '<tr><td valign="top" width="40%">Felony</td></tr>']
+            rows += _counts_rows(rng, 'Terminated Counts', rng.randint(0,2))
+            rows += ['<tr><td valign="top"><br><u>Highest Offense Level (Terminated)</u></td></tr>', '<tr><td valign="top" width="40%">None</td></tr>']
+            rows += ['<tr><td valign="top"><br><u>Complaints</u></td><td>&nbsp;</td><td valign="top" width="40%"><br><u>Disposition</u></td></tr>',
+                '<tr><td valign="top" width="40%">None</td><td>&nbsp;</td><td valign="top" width="60%">&nbsp;</td></tr>']
+            tables.append('<table width="100%" border="0" cellspacing="5">' + '\n'.join(rows) + '</table>')
+        plaintiff = ('<table width="100%" border="0" cellspacing="5"><tr><td><b><u>Plaintiff</u></b></td></tr>'
+            + _party_row(rng, 'USA', 1) + '</table>')
+        return '\n'.join(tables + [plaintiff])
+
+    # Civil: at least one plaintiff and one defendant, the rest spread over the other roles
+    roles = ['Plaintiff', 'Defendant'] + [rng.choice(CV_ROLES) for _ in range(max(0, n_parties-2))]
+    rows = []
+    for role in CV_ROLES:
+        n_role = roles.count(role)
+        if not n_role:
+            continue
+        if role == 'Defendant':
+            rows.append('<tr><td><br></td></tr><tr><td valign="top" width="40%"><br><b>V.</b><br></td></tr>')
+        rows.append(f'<tr><td><b><u>{role}</u></b></td></tr>')
+        rows += [_party_row(rng, _name(rng), rng.randint(0,3), terminated=rng.random()<0.2) for _ in range(n_role)]
+    return '<table width="100%" border="0" cellspacing="5">' + '\n'.join(rows) + '</table>'
+
+
+def make_member_block(court, lead_no, n_members):
+    ''' Make a "Member cases:" block listing n_members member cases of a lead case '''
+    office, year = lead_no.split(':')[0], lead_no.split(':')[1][:2]
+    links = ''.join(f'<tr><td><a href="/cgi-bin/DktRpt.pl?{700000+k}">{office}:{year}-cv-{90000+k:05d}</a></td></tr>' for k in range(n_members))
+    return f'<table><tr><td>Member cases: <table class="members">{links}</table></td></tr></table>'
+
+
+def make_docket_html(case_no, n_entries, n_parties, court='ilnd', members=0, first_entry=1, max_attachments=8, seed=0):
+    '''
+    Make a full synthetic docket html
+    Inputs:
+        - case_no (str): the case no. e.g. '1:16-cv-00001' (the case type decides between a civil and criminal docket)
+        - n_entries (int): no. of docket entries
+        - n_parties (int): no. of parties (defendants for criminal cases)
+        - court (str): court abbreviation
+        - members (int): no. of member cases to list (0 for no member case block)
+        - first_entry (int): the no. of the first docket entry (> 1 for a docket update)
+        - max_attachments (int): max no. of attachments per docket entry
+        - seed (int): random seed
+    Output:
+        (str) the docket html
+    '''
+    rng = random.Random(seed)
+    is_cr = ftools.decompose_caseno(case_no)['case_type'] == 'cr'
+    title = f'USA v. {rng.choice(SURNAMES)} et al' if is_cr else f'{rng.choice(SURNAMES)} v. {rng.choice(SURNAMES)} et al'
+    flags = ','.join(f'<span>{flag}</span>' for flag in rng.sample(['CLOSED', 'MDL', 'PROTO', 'JURY', 'APPEAL'], rng.randint(0,3)))
+
+    parts = ['<html><head><title>CM/ECF - U.S. District Court</title></head><body>',
+        '<div id="cmecfMainContent"><input type="hidden" id="cmecfMainContentScroll" value="0">',
+        f'<table border="0" cellspacing="0" width="100%"><tr><td align="right">{flags}</td></tr></table>',
+        f'<h3 align="center">United States District Court<br>\nDistrict Court - CM/ECF LIVE, Ver 6.3.3 ({CITIES.get(court, "Springfield")})<br>\n'
+        f'{"CRIMINAL" if is_cr else "CIVIL"} DOCKET FOR CASE #: {case_no}{" All Defendants" if is_cr else ""}</h3>']
+    if is_cr:
+        parts.append(f'<table width="100%" border="0" cellspacing="5"><tr>\n<td valign="top" width="60%"><br>Case title: {title}<br>'
+            'Magistrate judge case number: 1:16-mj-00123</td>\n<td valign="top" width="40%"><br>Date Filed: 01/01/2016<br>'
+            'Date Terminated: 02/02/2016</td>\n</tr></table>')
+    else:
+        parts.append(f'<table width="100%" border="0" cellspacing="5"><tr>\n<td valign="top" width="60%"><br>{title}<br>'
+            'Assigned to: Honorable John Doe<br>Referred to: Magistrate Judge Ann Roe<br>Cause: 28:1332 Diversity-Breach of Contract</td>\n'
+            '<td valign="top" width="40%"><br>Date Filed: 01/01/2016<br>Date Terminated: 02/02/2016<br>Jury Demand: None<br>'
+            'Nature of Suit: 190 Contract: Other<br>Jurisdiction: Diversity<br>Demand: $75,000</td>\n</tr></table>')
+    if members:
+        parts.append(make_member_block(court, case_no, members))
+    parts.append(make_party_tables(rng, n_parties, is_cr))
+    parts.append('<br>')
+    parts.append(make_docket_table(n_entries, max_attachments, seed=seed, first_entry=first_entry, court=court))
+    parts.append(RECEIPT.format(description='Docket Report', case_no=case_no, pages=max(1, n_entries//30), cost=min(3.0, 0.1*max(1, n_entries//30))))
+    parts.append('</div></body></html>')
+    parts.append(f'<!-- {{"user": "x", "download_url": "https://ecf.{court}.uscourts.gov/cgi-bin/DktRpt.pl?{seed}", "pacer_id": "{seed}", "slabels": ""}} -->')
+    return '\n'.join(parts)
+
+
+def make_summary_html(case_no, n_parties, seed=0):
+    '''
+    Make a synthetic case summary html
+    Inputs:
+        - case_no (str): the case no. (the case type decides between a civil and criminal summary)
+        - n_parties (int): no. of parties (defendants for criminal cases)
+        - seed (int): random seed
+    Output:
+        (str) the summary html
+    '''
+    rng = random.Random(seed)
+    is_cr = ftools.decompose_caseno(case_no)['case_type'] == 'cr'
+    title = f'USA v. {rng.choice(SURNAMES)} et al' if is_cr else f'{rng.choice(SURNAMES)} v. {rng.choice(SURNAMES)} et al'
+
+    def _party(role):
+        return (f'<tr><td><b>{role}:</b> {_name(rng)}</td><td>represented by</td><td>{_name(rng)}</td>'
+            f'<td><b>Phone:</b> (312) 555-{rng.randint(1000,9999)}</td></tr>')
+
+    parts = ['<html><head><title>CM/ECF - U.S. District Court</title></head><body><div id="cmecfMainContent">',
+        f'<center><b>{case_no}</b><br>{title}<br>John Doe, presiding<br>Ann Roe, referral<br><b>Date filed:</b> 01/01/2016<br>'
+        '<b>Date terminated:</b> 02/02/2016<br><b>Date of last filing:</b> 03/03/2016</center>']
+    if is_cr:
+        for d in range(1, n_parties+1):
+            rows = [f'<tr><td>{_name(rng)} ({d})</td></tr>']
+            for k in range(1, rng.randint(1,4)+1):
+                rows.append(f'<tr><td><b>Count:</b> {k}</td><td><b>Citation:</b> 18:371</td><td><b>Offense Level:</b> 4</td></tr>')
+                rows.append(f'<tr><td>{rng.choice(OFFENSES)}</td></tr>')
+            rows.append('<tr><td><b>Office:</b> Chicago</td><td><b>Filed:</b> 01/01/2016</td></tr>')
+            rows.append('<tr><td><b>Flags:</b> CLOSED</td><td><b>Terminated:</b> 02/02/2016</td></tr>')
+            parts.append('<table>' + ''.join(rows) + '</table>')
+            parts.append('<table>' + _party('Plaintiff') + '</table>')
+    else:
+        parts.append('<table><tr><td><b>Office:</b> Chicago</td><td><b>Filed:</b> 01/01/2016</td></tr>'
+            '<tr><td><b>Jury Demand:</b> None</td><td><b>Demand:</b> $75,000</td></tr>'
+            '<tr><td><b>Nature of Suit:</b> 190</td><td><b>Cause:</b> 28:1332</td></tr></table>')
+        parts.append('<table>' + ''.join(_party(rng.choice(['Plaintiff', 'Defendant'])) for _ in range(n_parties)) + '</table>')
+    parts.append(RECEIPT.format(description='Case Summary', case_no=case_no, pages=1, cost=0.1))
+    parts.append('</div></body></html>')
+    return '\n'.join(parts)
+
+
+def write_corpus(output_dir, n_cases, min_entries=10, max_entries=20000, court='ilnd', seed=0):
+    '''
+    Write a synthetic corpus for one court: a mix of civil and criminal dockets with varied party counts and docket
+    lengths (log-uniform between min_entries and max_entries, always including both extremes), some with member case
+    lists, some with docket updates and some with case summaries
+    Inputs:
+        - output_dir (str or Path): the directory to write the court directory into
+        - n_cases (int): no. of cases
+        - min_entries, max_entries (int): the range of docket lengths
+        - court (str): court abbreviation
+        - seed (int): random seed
+    Output:
+        (Path) the court directory, containing html/ and summaries/ subdirectories
+    '''
+    rng = random.Random(seed)
+    court_dir = Path(output_dir) / court
+    html_dir, summ_dir = court_dir / 'html' / YEAR, court_dir / 'summaries' / YEAR
+    html_dir.mkdir(parents=True, exist_ok=True)
+    summ_dir.mkdir(parents=True, exist_ok=True)
+
+    for i in range(n_cases):
+        if i == 0:
+            n_entries = max_entries
+        elif i == 1:
+            n_entries = min_entries
+        else:
+            n_entries = round(math.exp(rng.uniform(math.log(min_entries), math.log(max_entries))))
+        is_cr = i%3 == 2
+        case_no = f'1:{YEAR}-{"cr" if is_cr else "cv"}-{i+1:05d}'
+        n_parties = rng.randint(1, 6) if is_cr else rng.choice([2, 3, 5, 10, 40])
+        members = rng.randint(2, 200) if (i%5 == 4 and not is_cr) else 0
+        case_seed = seed*100000 + i
+
+        fname = ftools.generate_docket_filename(case_no)
+        (html_dir/fname).write_text(make_docket_html(case_no, n_entries, n_parties, court, members, seed=case_seed), encoding='utf-8')
+
+        # Docket updates carry the latest few entries again, as well as the new ones
+        if i%4 == 3:
+            n_new = max(1, n_entries//10)
+            first_entry = max(1, n_entries-2)
+            update_html = make_docket_html(case_no, n_entries-first_entry+1+n_new, n_parties, court, members, first_entry=first_entry, seed=case_seed)
+            (html_dir/ftools.generate_docket_filename(case_no, ind=1)).write_text(update_html, encoding='utf-8')
+
+        if i%2 == 0:
+            (summ_dir/fname).write_text(make_summary_html(case_no, n_parties, seed=case_seed), encoding='utf-8')
+
+    return court_dir
+
+
+@click.command()
+@click.argument('output-dir')
+@click.option('--n-cases', default=50, show_default=True, help='No. of cases to generate')
+@click.option('--min-entries', default=10, show_default=True, help='Min no. of docket entries per case')
+@click.option('--max-entries', default=20000, show_default=True, help='Max no. of docket entries per case')
+@click.option('--court', default='ilnd', show_default=True, help='Court abbreviation')
+@click.option('--seed', default=0, show_default=True, help='Random seed')
+def main(output_dir, n_cases, min_entries, max_entries, court, seed):
+    ''' Write a synthetic corpus of docket and summary htmls to OUTPUT_DIR/<court>/html and OUTPUT_DIR/<court>/summaries '''
+    court_dir = write_corpus(output_dir, n_cases, min_entries, max_entries, court, seed)
+    print(f"Wrote {n_cases:,} synthetic cases to {court_dir.resolve()}")
+
+if __name__ == '__main__':
+    main()
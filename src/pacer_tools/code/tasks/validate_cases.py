@@ -0,0 +1,92 @@
+import sys
+import time
+import itertools
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import click
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from support import case_json
+from parsers import schema_validation
+from parsers.schema_validation import CaseValidator
+
+MAX_PENDING_PER_WORKER = 4
+
+_validator = None
+
+def _init_worker(allow_null):
+    ''' Compile the schemas once in each worker process '''
+    global _validator
+    _validator = CaseValidator(allow_null=allow_null)
+
+
+def validate_chunk(fpaths):
+    '''
+    Validate a chunk of case files (in a worker process)
+    Inputs:
+        - fpaths (list): paths of case jsons
+    Output:
+        n_cases (int): the no. of cases validated
+        rows (list): [ucid, field, message] for each violation (a file that can't be read counts as one violation, on field '(file)')
+    '''
+    rows = []
+    for fpath in fpaths:
+        try:
+            case = case_json.load(fpath)
+        except (OSError, ValueError) as e:
+            rows.append([str(fpath), '(file)', f"couldn't be read ({type(e).__name__}: {e})"])
+            continue
+        ucid = case.get('ucid', str(fpath))
+        rows.extend([ucid, field, message] for field, message in _validator.validate(case))
+    return len(fpaths), rows
+
+
+@click.command()
+@click.argument('input-dir')
+@click.option('--outfile', default=None, type=click.Path(dir_okay=False), help='Write every violation (ucid, field, message) to this csv')
+@click.option('--n-workers', '-nw', default=4, show_default=True, help='No. of worker processes')
+@click.option('--chunk-size', default=200, show_default=True, help='No. of files given to a worker at a time')
+@click.option('--strict', default=False, is_flag=True, help="Don't let null pass for fields whose schema doesn't allow it")
+@click.option('--n-fields', default=20, show_default=True, help='No. of fields to list in the summary')
+def main(input_dir, outfile, n_workers, chunk_size, strict, n_fields):
+    '''
+    Validate every .json case file in INPUT_DIR (searched recursively) against the case schemas in parsers/schemas,
+    across a pool of processes, and tally the violations by field (see parsers/schema_validation.py).
+    Exits with status 1 if any case has violations.
+    '''
+    fpaths = Path(input_dir).resolve().rglob('*.json')
+    unresolved = CaseValidator().unresolved_refs
+    if unresolved:
+        print(f"Not checked (schemas not in {schema_validation.SCHEMA_DIR}): {', '.join(sorted(unresolved))}")
+
+    start = time.perf_counter()
+    n_cases, rows = 0, []
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(not strict,)) as executor:
+        pending = set()
+        chunks = iter(lambda: list(itertools.islice(fpaths, chunk_size)), [])
+        for chunk in chunks:
+            if len(pending) >= n_workers * MAX_PENDING_PER_WORKER:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    n, chunk_rows = future.result()
+                    n_cases += n
+                    rows.extend(chunk_rows)
+            pending.add(executor.submit(validate_chunk, chunk))
+        for future in pending:
+            n, chunk_rows = future.result()
+            n_cases += n
+            rows.extend(chunk_rows)
+
+    df = pd.DataFrame(rows, columns=schema_validation.COLUMNS)
+    print(f"Validated {n_cases:,} cases in {time.perf_counter() - start:.1f}s")
+    schema_validation.summarise_violations(df, n_cases, n_fields=n_fields)
+    if outfile:
+        df.to_csv(outfile, index=False)
+        print(f"Violations written to {outfile}")
+    if len(df):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import sys
+import json
+import time
+from pathlib import Path
+
+import click
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from support import case_json
+
+# Awkward values that case files can contain, checked on top of the files in INPUT_DIR
+EDGE_CASES = {
+    'edge_cases': {
+        'non_ascii': 'Muñoz — “quoted” § 1983 – café 中文 \U0001f600',
+        'escapes': 'tab\there, newline\nthere, quote " backslash \\ slash / nul \x00 bell \x07',
+        'html': '<a href="https://ecf.ilnd.uscourts.gov/doc1/067123?caseid=1&amp;de_seq_num=2">1</a>',
+        'ints': [0, -1, 2**31, 2**53 + 1, -2**63, 2**64 - 1],
+        'floats': [0.1, -2.5, 1e-7, 1.7976931348623157e308, 5e-324],
+        'empty': ['', [], {}, None, True, False],
+        'int_keys': {1: 'a', 2: 'b'},
+        'nested': [[[{'a': [{'b': None}]}]]],
+    },
+}
+
+
+def canonical(obj):
+    ''' A string form of a decoded object to compare on (the standard library's encoding, which keeps key order) '''
+    return json.dumps(obj)
+
+
+def check_object(obj, backends):
+    '''
+    Check that an object decoded from a case file round-trips through every backend
+    Inputs:
+        - obj: the object as decoded by the standard library
+        - backends (list): backend names
+    Output:
+        (list) of descriptions of the checks that failed
+    '''
+    problems = []
+    expected = canonical(json.loads(json.dumps(obj)))
+    encoded = {}
+    for name in backends:
+        case_json.set_backend(name)
+        encoded[name] = case_json.dumpb(obj)
+        if canonical(case_json.loads(encoded[name])) != expected:
+            problems.append(f"{name} round trip")
+    # What each backend writes has to read back the same with every other backend
+    for writer, data in encoded.items():
+        for reader in backends:
+            case_json.set_backend(reader)
+            if canonical(case_json.loads(data)) != expected:
+                problems.append(f"written by {writer}, read by {reader}")
+    return problems
+
+
+def time_backend(name, texts, objs):
+    ''' The seconds taken to decode all the texts and to encode all the objects with a backend '''
+    case_json.set_backend(name)
+    start = time.perf_counter()
+    for text in texts:
+        case_json.loads(text)
+    decode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for obj in objs:
+        case_json.dumpb(obj)
+    encode_time = time.perf_counter() - start
+    return decode_time, encode_time
+
+
+@click.command()
+@click.argument('input-dir')
+@click.option('--max-diffs', default=20, show_default=True, help='No. of failing files to list at the end')
+def main(input_dir, max_diffs):
+    '''
+    Check that every .json case file in INPUT_DIR (searched recursively) decodes to the same data with each installed
+    JSON backend as with the standard library, and that what each backend writes reads back identically with every
+    backend (see support/case_json.py). Also times decoding and encoding the files with each backend.
+    Exits with status 1 if any file fails.
+    '''
+    backends = case_json.available_backends()
+    default_backend = case_json.get_backend()
+    texts = {fpath: fpath.read_bytes() for fpath in sorted(Path(input_dir).resolve().glob('**/*.json'))}
+    objs = {fpath: json.loads(text) for fpath, text in texts.items()}
+    objs.update(EDGE_CASES)
+
+    diffs = {}
+    for key, obj in objs.items():
+        for name in backends:
+            if key in texts:
+                case_json.set_backend(name)
+                if canonical(case_json.loads(texts[key])) != canonical(obj):
+                    diffs.setdefault(key, []).append(f"{name} decode")
+        problems = check_object(obj, backends)
+        if problems:
+            diffs.setdefault(key, []).extend(problems)
+
+    print(f"\nChecked {len(texts):,} files (and the edge cases) with {', '.join(backends)} "
+        f"({default_backend} is the default here): {len(objs)-len(diffs):,} identical, {len(diffs):,} different")
+    n_bytes = sum(len(text) for text in texts.values())
+    for name in backends:
+        decode_time, encode_time = time_backend(name, list(texts.values()), [objs[fpath] for fpath in texts])
+        print(f" - {name}: decode {decode_time:.3f}s ({n_bytes/2**20/decode_time if decode_time else 0:,.1f} MB/s), "
+            f"encode {encode_time:.3f}s")
+    for key, problems in list(diffs.items())[:max_diffs]:
+        print(f" - {key}: {', '.join(problems)}")
+    if diffs:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import sys
+import time
+from pathlib import Path
+
+import click
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from support import fhandle_tools as ftools
+from parsers import parse_pacer
+
+
+def read_header(fpath):
+    ''' Read a docket html and cut it down to the header, the same way parse_pacer.process_html_file does '''
+    html_text, _ = ftools.read_html_text(fpath)
+    return html_text.split('Docket Text')[0] if 'Docket Text' in html_text else html_text
+
+
+@click.command()
+@click.argument('input-dir')
+@click.option('--max-diffs', default=20, show_default=True, help='No. of differing files to list at the end')
+def main(input_dir, max_diffs):
+    '''
+    Check that the single-pass header scanner (parse_pacer.HEADER_SCANNER) finds the same matches as running
+    each of the per-field header regexes, for every .html docket in INPUT_DIR (searched recursively)
+    '''
+    headers = {fpath: read_header(fpath) for fpath in Path(input_dir).resolve().glob('**/*.html')}
+
+    diffs = {}
+    for fpath, header in headers.items():
+        mismatches = parse_pacer.HEADER_SCANNER.verify(header)
+        if mismatches:
+            diffs[fpath] = mismatches
+
+    # Time both approaches
+    fields = parse_pacer.HEADER_SCANNER.fields
+    start = time.perf_counter()
+    for header in headers.values():
+        [field.pattern.search(header) for field in fields]
+    per_field_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for header in headers.values():
+        parse_pacer.HEADER_SCANNER.scan(header)
+    scanner_time = time.perf_counter() - start
+
+    print(f"\nChecked {len(headers):,} files: {len(headers)-len(diffs):,} identical, {len(diffs):,} different")
+    print(f"Per-field regexes: {per_field_time:.3f}s, header scanner: {scanner_time:.3f}s")
+    for fpath, mismatches in list(diffs.items())[:max_diffs]:
+        print(f" - {fpath}: {', '.join(mismatches)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+import sys
+import time
+import tempfile
+import threading
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import click
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from support import fhandle_tools as ftools
+from support.docket_entry_identification import extract_court_caseno
+from downloader import http_docket
+from downloader import scraper_tools as stools
+from downloader import scrapers
+from tasks.synthetic_dockets import make_docket_html
+
+COURT = 'ilnd'
+COOKIE = ('NextGenCSO', 'mock-session')
+LONGTIME_CASE = '1:16-cv-00777' # a case the mock server answers with the "may take a long time" page
+WRONG_CASE = '1:16-cv-00888' # a case the mock server answers with the docket of another case
+
+DOCKET_FORM = '''<html><body><div id="cmecfMainContent"><h3>Docket Sheet</h3>
+<form method="POST" action="../cgi-bin/DktRpt.pl?{token}-L_1_0-1" enctype="multipart/form-data">
+<input type="hidden" name="all_case_ids" value="0">
+<input type="text" name="case_num" id="case_number_text_area_0" value="">
+<input type="radio" name="date_range_type" value="Filed" checked> <input type="radio" name="date_range_type" value="Entered">
+<input type="text" name="date_from" value=""> <input type="text" name="date_to" value="">
+<input type="text" name="documents_numbered_from_" value=""> <input type="text" name="documents_numbered_to_" value="">
+<input type="checkbox" name="list_of_parties_and_counsel" id="list_of_parties_and_counsel">
+<input type="checkbox" name="terminated_parties" id="terminated_parties">
+<input type="checkbox" name="list_of_member_cases" id="list_of_member_cases">
+<input type="checkbox" name="pdf_header" id="pdf_header" value="1" checked>
+<input type="checkbox" name="view_multi_docs" id="view_multi_docs">
+<input type="radio" name="output_format" value="html" checked> <input type="radio" name="output_format" value="pdf">
+<select name="sort1"><option value="oldest date first" selected>Oldest date first</option>
+<option value="most recent date first">Most recent date first</option><option value="document number">Document number</option></select>
+<input type="button" value="Run Report" onclick="ProcessForm()"> <input type="reset" value="Clear">
+</form></div></body></html>'''
+LOGIN_PAGE = '<html><body><div id="cmecfMainContent"><form><input type="text" name="login"><input type="password"></form></div></body></html>'
+LONGTIME_PAGE = ('<html><body><div id="cmecfMainContent">This report may take a long time to run because this case has many docket '
+    'entries.<form><input type="radio" name="date_from"></form></div></body></html>')
+
+
+def pacer_id(case_no):
+    ''' The (made up) PACER id of a case on the mock server '''
+    return 100000 + int(case_no.split('-')[-1])
+
+
+def docket_page(case_no):
+    ''' A docket report for a case, with the court in the header as on a real report '''
+    html = make_docket_html(case_no, n_entries=25, n_parties=3, court=COURT, seed=pacer_id(case_no))
+    return html.replace('District Court - CM/ECF LIVE', 'Northern District of Illinois - CM/ECF LIVE')
+
+
+class MockPacer(BaseHTTPRequestHandler):
+    ''' Just enough of PACER for a docket report: the possible case numbers lookup, the report form and the report itself '''
+    posted = [] # the form values of every report request
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, content_type='text/html'):
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _logged_in(self):
+        return f"{COOKIE[0]}={COOKIE[1]}" in self.headers.get('Cookie', '')
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/cgi-bin/possible_case_numbers.pl':
+            if not self._logged_in():
+                return self._send('Not logged in', 'text/xml')
+            case_no = url.query
+            return self._send(f'<request number="{case_no}"><case number="{case_no}" id="{pacer_id(case_no)}" '
+                f'title="{case_no} Doe v. Roe" defendant="0"/></request>', 'text/xml')
+        elif url.path == '/cgi-bin/DktRpt.pl':
+            return self._send(DOCKET_FORM.format(token=time.time_ns()) if self._logged_in() else LOGIN_PAGE)
+        self.send_error(404)
+
+    def do_POST(self):
+        if not self._logged_in():
+            return self._send(LOGIN_PAGE)
+        values = {k: v[0] for k, v in parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode()).items()}
+        MockPacer.posted.append(values)
+        case_no = next(no for no in [LONGTIME_CASE, WRONG_CASE, *self.server.case_nos] if str(pacer_id(no)) == values.get('all_case_ids'))
+        if case_no == LONGTIME_CASE:
+            return self._send(LONGTIME_PAGE)
+        return self._send(docket_page(self.server.case_nos[0] if case_no == WRONG_CASE else case_no))
+
+
+class FakeBrowser:
+    ''' Stands in for the logged-in Selenium browser, which is only needed for its cookies '''
+    def get_cookies(self):
+        return [{'name': COOKIE[0], 'value': COOKIE[1], 'domain': '127.0.0.1', 'path': '/'}]
+
+    def execute_script(self, script):
+        return 'Mozilla/5.0 (mock)'
+
+
+@click.command()
+@click.option('--n-cases', default=50, show_default=True, help='No. of docket reports to time')
+def main(n_cases):
+    '''
+    Check the HTTP docket path of the Docket Scraper (--docket-http, see downloader/http_docket.py) against a local mock
+    PACER server: docket reports are requested, checked and written as by the browser, and anything else is handed back
+    to the browser. Exits with status 1 if any check fails.
+    '''
+    case_nos = [f"1:16-cv-{i:05d}" for i in range(1, n_cases+1)]
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockPacer)
+    server.case_nos = case_nos
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    # Point every PACER url at the mock server
+    get_pacer_url = stools.get_pacer_url
+    stools.get_pacer_url = lambda court, page: base_url + get_pacer_url(court, page).split('.gov/', 1)[1]
+
+    failures = []
+    def check(name, ok):
+        print(f"{'ok  ' if ok else 'FAIL'} {name}")
+        if not ok:
+            failures.append(name)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        auth_path = Path(tmp_dir)/'auth.json'
+        auth_path.write_text('{"user": "mock", "pass": "mock"}')
+        court_dir = scrapers.PacerCourtDir(Path(tmp_dir)/COURT, COURT)
+        core_args = {'court_dir': court_dir, 'court': COURT, 'auth_path': auth_path, 'headless': True, 'verbose': False}
+        DktS = scrapers.DocketScraper(core_args, docket_input=tmp_dir, use_http=True)
+        DktS.browser = FakeBrowser()
+        DktS.http = http_docket.HttpDocketFetcher(COURT)
+
+        # No cookies yet: the form comes back as the login page
+        fill_values = {'case_no': case_nos[0], 'sort_by': 'oldest date first', 'include_parties': True, 'include_terminated': True}
+        kind, _, _ = DktS.http.fetch_docket(fill_values, pacer_id(case_nos[0]))
+        check('a session without the login cookies gets the login page', kind == http_docket.NOT_LOGGED_IN)
+        DktS.http.sync_cookies(DktS.browser)
+
+        # A docket report, filled in as the browser would fill it in
+        fill_values.update({'date_from': '02/01/2016', 'include_terminated': False, 'include_list_member_cases': True})
+        kind, url, html = DktS.http.fetch_docket(fill_values, pacer_id(case_nos[0]))
+        posted = MockPacer.posted[-1]
+        check('the docket report comes back', kind == http_docket.DOCKET_REPORT and extract_court_caseno(html) == (COURT, case_nos[0]))
+        check('the download url is the form action', '-L_1_0-1' in url)
+        check('the form is filled in as the browser fills it in', posted.get('date_from') == '02/01/2016' and
+            posted.get('list_of_parties_and_counsel') == 'on' and 'terminated_parties' not in posted and
+            posted.get('list_of_member_cases') == 'on' and posted.get('pdf_header') == '1' and posted.get('date_range_type') == 'Filed'
+            and posted.get('sort1') == 'oldest date first' and posted.get('all_case_ids') == str(pacer_id(case_nos[0])))
+
+        # Through the scraper: the pacer id lookup, the request and the written docket
+        case = {'case_no': case_nos[1], 'ucid': f"{COURT};;{case_nos[1]}"}
+        outpath, cost = DktS.pull_case_http(case, {'case_no': case_nos[1]}, {'ucid': case['ucid']}, [])
+        written = ftools.read_html_text(outpath)[0]
+        check('the scraper writes the docket with its stamp', written.startswith(docket_page(case_nos[1]).replace('\r', '')) and
+            f"pacer_id:{pacer_id(case_nos[1])}" in written)
+        check('the cost is read from the receipt', cost == float(ftools.parse_transaction_history(written)['cost']))
+
+        # Anything else is handed back to the browser
+        case = {'case_no': LONGTIME_CASE, 'ucid': f"{COURT};;{LONGTIME_CASE}"}
+        check('the long time page goes to the browser', DktS.pull_case_http(case, {'case_no': LONGTIME_CASE}, {}, []) is None)
+        case = {'case_no': WRONG_CASE, 'ucid': f"{COURT};;{WRONG_CASE}"}
+        check('a docket for the wrong case is caught', DktS.pull_case_http(case, {'case_no': WRONG_CASE}, {}, []) == scrapers.PACER_ERROR_WRONG_CASE)
+
+        # Timing
+        start = time.perf_counter()
+        for case_no in case_nos:
+            case = {'case_no': case_no, 'ucid': f"{COURT};;{case_no}", 'previously_downloaded': True}
+            DktS.pull_case_http(case, {'case_no': case_no, 'sort_by': 'oldest date first'}, {}, [])
+        elapsed = time.perf_counter() - start
+        print(f"\n{n_cases} dockets pulled over HTTP in {elapsed:.2f}s ({n_cases/elapsed:.1f}/sec, against a local server)")
+        print(f"Responses: {dict(DktS.http.outcomes)}")
+
+    server.shutdown()
+    stools.get_pacer_url = get_pacer_url
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
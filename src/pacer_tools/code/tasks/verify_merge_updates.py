@@ -0,0 +1,68 @@
+import io
+import sys
+import tempfile
+import contextlib
+from pathlib import Path
+
+import click
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from support import data_tools as dtools
+from support.member_links import MemberLinkStore
+from parsers import parse_pacer
+from tasks.synthetic_dockets import write_corpus
+
+
+def diff_fields(merged, full):
+    ''' The fields that differ between a merged case and a full parse of it (for the docket, the first row that differs) '''
+    diffs = []
+    for key in sorted(set(merged) | set(full)):
+        if merged.get(key) == full.get(key):
+            continue
+        if key == 'docket':
+            rows = list(zip(merged['docket'], full['docket']))
+            first = next((i for i, (a, b) in enumerate(rows) if a != b), len(rows))
+            diffs.append(f"docket ({len(merged['docket'])} vs {len(full['docket'])} rows, first difference at row {first})")
+        else:
+            diffs.append(f"{key} ({merged.get(key)!r} vs {full.get(key)!r})")
+    return diffs
+
+
+@click.command()
+@click.argument('input-dir', required=False)
+@click.option('--court', '-c', default='ilnd', show_default=True, help='Court abbreviation')
+@click.option('--n-cases', default=40, show_default=True, help='No. of synthetic cases to generate (without INPUT_DIR)')
+@click.option('--max-entries', default=400, show_default=True, help='Max no. of docket entries per synthetic case (without INPUT_DIR)')
+@click.option('--backend', default='bs4', type=click.Choice(['bs4', 'lxml']), show_default=True)
+def main(input_dir, court, n_cases, max_entries, backend):
+    '''
+    Check that merging docket updates into an already-parsed case (parse --merge-updates) gives the same case data as a
+    full parse of all of its docket reports (through the docket aggregator), for every case with docket updates in
+    INPUT_DIR (a court's html directory), or in a synthetic corpus if not given. Exits with status 1 if any case differs.
+    '''
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        html_dir = Path(input_dir).resolve() if input_dir else write_corpus(tmp_dir, n_cases, max_entries=max_entries, court=court)/'html'
+        cases = [case for case in dtools.iter_case_groups(html_dir, court=court) if len(case['docket_paths']) > 1]
+        member_cases = MemberLinkStore(Path(tmp_dir)/'member_lead_links.db', import_legacy=False)
+
+        diffs = {}
+        with contextlib.redirect_stdout(io.StringIO()): # (the parser prints warnings and progress)
+            for case in cases:
+                full = parse_pacer.process_html_file(case, member_cases, court=court, backend=backend)
+                # The first docket on its own, then the updates merged in one at a time (as in a run of --merge-updates)
+                prior = parse_pacer.process_html_file({**case, 'docket_paths': case['docket_paths'][:1]}, member_cases, court=court,
+                    backend=backend)
+                merged = parse_pacer.process_docket_updates(case, case['docket_paths'][1:], prior, member_cases, court=court,
+                    backend=backend)
+                mismatches = diff_fields(merged, full)
+                if mismatches:
+                    diffs[case['ucid']] = mismatches
+
+    print(f"\nChecked {len(cases):,} cases with docket updates: {len(cases)-len(diffs):,} identical, {len(diffs):,} different")
+    for ucid, mismatches in diffs.items():
+        print(f" - {ucid}: {', '.join(mismatches)}")
+    if diffs or not cases:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import io
+import sys
+import time
+import tempfile
+import contextlib
+from pathlib import Path
+
+import click
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from support import data_tools as dtools
+from support import fhandle_tools as ftools
+from support.member_links import MemberLinkStore
+from parsers import parse_pacer
+from parsers import metadata_scan
+
+
+def latest_docket_date(docket):
+    ''' The latest date_filed in a parsed docket, as MM/DD/YYYY (the same as dtools.get_latest_docket_date) '''
+    dates = [row['date_filed'] for row in docket if row.get('date_filed')]
+    return pd.to_datetime(dates).max().strftime(ftools.FMT_PACERDATE) if dates else None
+
+
+@click.command()
+@click.argument('input-dir')
+@click.option('--court', '-c', default=None, help='Court abbreviation, if none infers from the directory')
+@click.option('--max-diffs', default=20, show_default=True, help='No. of differing cases to list at the end')
+def main(input_dir, court, max_diffs):
+    '''
+    Check that the metadata scan (parsers/metadata_scan.py) gives the same case-level fields as a full parse, for every
+    case in INPUT_DIR (a court's html directory), and compare how long the two take
+    '''
+    cases = list(dtools.iter_case_groups(Path(input_dir).resolve(), court=court))
+
+    start = time.perf_counter()
+    scans = [metadata_scan.scan_case(case, court=court) for case in cases]
+    scan_time = time.perf_counter() - start
+
+    diffs = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        member_cases = MemberLinkStore(Path(tmp_dir)/'member_lead_links.db', import_legacy=False)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()): # (the parser prints warnings and progress)
+            parsed = [parse_pacer.process_html_file(case, member_cases, court=court) for case in cases]
+        parse_time = time.perf_counter() - start
+
+    for case, scan, case_data in zip(cases, scans, parsed):
+        if case_data is None:
+            continue
+        case_data['latest_docket_date'] = latest_docket_date(case_data['docket'])
+        mismatches = [key for key in scan if key in case_data and scan[key] != case_data[key]]
+        if mismatches:
+            diffs[case['ucid']] = [f"{key} ({scan[key]!r} vs {case_data[key]!r})" for key in mismatches]
+
+    n_files = sum(len(case['docket_paths']) for case in cases)
+    print(f"\nChecked {len(cases):,} cases ({n_files:,} files): {len(cases)-len(diffs):,} identical, {len(diffs):,} different")
+    print(f"Metadata scan: {scan_time:.3f}s ({n_files/scan_time if scan_time else 0:,.0f} files/sec), full parse: {parse_time:.3f}s")
+    for ucid, mismatches in list(diffs.items())[:max_diffs]:
+        print(f" - {ucid}: {', '.join(mismatches)}")
+
+if __name__ == '__main__':
+    main()